@@ -1,24 +1,26 @@
 from rich import print
-from langchain.chat_models import init_chat_model
 from langchain.agents import create_agent
 from langgraph.pregel.main import BaseCheckpointSaver
 from guardrails_security import GuardrailsSecurity
 from langchain.agents.middleware import ModelRequest, dynamic_prompt
 from langchain.agents.middleware import ModelCallLimitMiddleware
+from langchain.tools import ToolRuntime
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, ToolMessage
+from middlewares import HistoryCompactionMiddleware, ToolCallControlMiddleware
 # from rags.singleton_training import RagSingletonTraining
-from dtos import MainContext, ResponseSchema
+from dtos import MainContext, ResponseSchema, DEFAULT_DATASET_ID
+from observability import span, tracing_callbacks
+from structured_logging import log_event
 from utils import get_prompt
-from tools import (
-    dataframe_informations_tool,
-    statistical_summary_tool,
-    graph_generator_tool,
-    dataframe_python_tool,
-    multimodal_inputs_tool,
-    graph_tool,
-    rag_tool
-)
+from providers import chat_model
+import threading
+import logging
+import uuid
 
 
+# Início das mensagens de erro devolvidas (em vez de exceções) pelas ferramentas de dados.
+TOOL_ERROR_PREFIX = "Não foi possível"
+
 @dynamic_prompt
 def agent_system_prompt(request: ModelRequest) -> str:
     """
@@ -59,10 +61,14 @@ class Agent:
 
     __instance: "Agent" = None
     __checkpointer: BaseCheckpointSaver = None
+    __lock = threading.Lock()
 
-    def __init__(self) -> None:
+    def __init__(self, checkpointer: BaseCheckpointSaver | None = None) -> None:
         """
         Inicializa o histórico da sessão.
+
+        Args:
+            checkpointer: Checkpointer em que o agente é compilado (persistência das conversas).
         """
 
         if self.__instance is not None:
@@ -71,9 +77,17 @@ class Agent:
         print("Inicializando agente")
 
         self.__guardrails = GuardrailsSecurity()
-        self.__llm = init_chat_model(model="google_genai:gemini-2.5-flash-lite")
+        self.__llm = chat_model("google_genai:gemini-2.5-flash-lite", role="agent")
         self.__session_id: str = None
+        self.__checkpointer = checkpointer
+        self.__tools = {}
         self.__chain = self.__build_tool_agent()
+
+        # Importados aqui, como as ferramentas: o roteador carrega numpy e não entra no cold start.
+        from intent_router import IntentRouter
+        from sentiment import SentimentDetector
+        self.__router = IntentRouter()
+        self.__sentiment = SentimentDetector()
         # RagSingletonTraining()
 
     @staticmethod
@@ -82,20 +96,43 @@ class Agent:
         Inicializa o agente, configurando o pipeline de RAG e o histórico de mensagens.
         """
 
-        if Agent.__instance is None:
-            Agent.__instance = Agent()
-
-        print(f"Criando nova sessão de conversa com o agente '{session_id}'...")
+        Agent.build(checkpointer)
+        log_event("agent_session", session_id=session_id)
 
         Agent.__instance.__session_id = session_id
         Agent.__instance.__checkpointer = checkpointer
         return Agent.__instance
 
+    @staticmethod
+    def build(checkpointer: BaseCheckpointSaver) -> "Agent":
+        """
+        Cria o agente (clientes de LLM e ferramentas) sem selecionar uma sessão. Usado pelo
+        aquecimento, que roda em outra thread enquanto a API já recebe mensagens.
+        """
+
+        # O lock evita uma segunda construção quando o aquecimento e uma requisição chegam juntos.
+        with Agent.__lock:
+            if Agent.__instance is None:
+                Agent.__instance = Agent(checkpointer)
+
+        return Agent.__instance
+
     def __build_tool_agent(self):
         """
         Cria um agente com ferramentas do RAG e do agente de dados.
         """
 
+        # Importadas só ao criar o agente, para `import agent` (e a API) subir rápido.
+        from tools import (
+            dataframe_informations_tool,
+            statistical_summary_tool,
+            graph_generator_tool,
+            dataframe_python_tool,
+            multimodal_inputs_tool,
+            graph_tool,
+            rag_tool
+        )
+
         tools = [
             dataframe_informations_tool,
             statistical_summary_tool,
@@ -105,6 +142,7 @@ class Agent:
             graph_tool,
             rag_tool
         ]
+        self.__tools = {tool.name: tool for tool in tools}
 
         return create_agent(
             self.__llm,
@@ -112,31 +150,148 @@ class Agent:
             context_schema=MainContext,
             middleware=[
                 agent_system_prompt,
+                # Só o limite por execução: com o checkpointer persistente, um limite por thread
+                # contaria as chamadas de todos os turnos da sessão e encerraria as conversas longas.
                 ModelCallLimitMiddleware(
-                    thread_limit=15,     # Limite de 15 chamadas por thread para evitar loops infinitos.
-                    run_limit=20,         # Limite de 20 chamadas por execução do agente para evitar abusos.
+                    run_limit=20,         # Limite de 20 chamadas por execução do agente para evitar loops infinitos e abusos.
                     exit_behavior="end"  # Se os limites forem atingidos, o agente responderá com uma mensagem de encerramento e não fará mais chamadas ao modelo.
-                )
+                ),
+                # Resume os turnos antigos em segundo plano quando o histórico passa do orçamento de tokens.
+                HistoryCompactionMiddleware(),
+                # Chamadas de ferramentas do mesmo turno rodam em paralelo, com limite e tempo limite por ferramenta.
+                ToolCallControlMiddleware()
             ],
             response_format=ResponseSchema,
             checkpointer=self.__checkpointer
         )
 
-    async def invoke(self, question: str) -> str:
+    async def __invoke_routed_tool(self, tool_name: str, question: str, config: dict, context: MainContext) -> str | None:
         """
-        Executa o agente com ferramentas (RAG + análise de dados).
+        Chama direto a ferramenta escolhida pelo roteador, sem a chamada ao LLM que só a
+        escolheria, e grava o turno no histórico da sessão como se o agente tivesse feito a
+        chamada. A resposta final continua sendo redigida pelo modelo a partir do resultado
+        da ferramenta (com o tom do `agent_system_prompt`).
+
+        Returns:
+            A resposta do agente, ou None se a ferramenta falhar (a pergunta segue para o agente completo).
         """
 
-        self.__guardrails.validate_input(question)
-        response = await self.__chain.ainvoke(
-            {"messages": [{"role": "user", "content": question}]},
-            config={"configurable": {"thread_id": self.__session_id}},
-            context=MainContext(
-                session_id=self.__session_id,
-                sentiment="neutral",
-                checkpointer=self.__checkpointer
-            )
+        tool = self.__tools[tool_name]
+        tool_call = {"name": tool_name, "args": {"question": question}, "id": f"route_{uuid.uuid4().hex}", "type": "tool_call"}
+        runtime = ToolRuntime(
+            state={"messages": []},
+            context=context,
+            config=config,
+            stream_writer=lambda _: None,
+            tool_call_id=tool_call["id"],
+            store=None
         )
+
+        try:
+            result = await tool.ainvoke({"question": question, "runtime": runtime}, config=config)
+        except Exception as e:
+            log_event("intent_route_failed", level=logging.WARNING, tool=tool_name, error=str(e))
+            return None
+
+        # O rag_tool devolve a saída completa da cadeia (pergunta, contexto e resposta).
+        output = result["answer"] if isinstance(result, dict) else str(result)
+
+        # As ferramentas devolvem os erros como texto; o agente completo pode tentar outro caminho.
+        if output.startswith(TOOL_ERROR_PREFIX):
+            log_event("intent_route_failed", level=logging.WARNING, tool=tool_name, error=output[:200])
+            return None
+
+        # Grava o turno até o resultado da ferramenta como saída do nó de ferramentas: ao retomar,
+        # o grafo segue para o modelo, que redige a resposta estruturada a partir dele.
+        await self.__chain.aupdate_state(
+            config,
+            {"messages": [
+                HumanMessage(content=question),
+                AIMessage(content="", tool_calls=[tool_call]),
+                ToolMessage(content=output, tool_call_id=tool_call["id"], name=tool_name)
+            ]},
+            as_node="tools"
+        )
+        response = await self.__chain.ainvoke(None, config=config, context=context)
+        return self.__structured_answer(response)
+
+    @staticmethod
+    def __structured_answer(response: dict) -> str:
+        """
+        Resposta estruturada produzida nesta execução do agente.
+
+        O `structured_response` fica no estado da thread entre os turnos; se a execução terminar
+        sem responder (ex.: limite de chamadas ao modelo), ele ainda é o do turno anterior.
+
+        Raises:
+            RuntimeError: Se a execução não terminou com a resposta estruturada.
+        """
+
+        last_message = response["messages"][-1]
+        if not isinstance(last_message, ToolMessage) or last_message.name != ResponseSchema.__name__:
+            raise RuntimeError("O agente encerrou o turno sem produzir uma resposta.")
+
         structured_response: ResponseSchema = response["structured_response"]
-        self.__guardrails.validate_output(structured_response.answer)
         return structured_response.answer
+
+    @staticmethod
+    def __tools_called(messages: list[AnyMessage]) -> list[str]:
+        """
+        Ferramentas chamadas pelo agente no último turno (sem a de resposta estruturada).
+        """
+
+        called = []
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                break
+            if isinstance(message, AIMessage):
+                called[:0] = [call["name"] for call in message.tool_calls if call["name"] != ResponseSchema.__name__]
+
+        return called
+
+    async def invoke(self, question: str, dataset_id: str | None = None) -> str:
+        """
+        Executa o agente com ferramentas (RAG + análise de dados).
+
+        Perguntas óbvias (ex.: "plote ...", contas simples) são classificadas localmente pelo
+        `IntentRouter` e vão direto para a ferramenta; as demais seguem para o agente completo.
+
+        Args:
+            question: Pergunta do usuário.
+            dataset_id: Dataset do catálogo analisado pelas ferramentas de dados (padrão: dados_entregas).
+        """
+
+        # Lida antes de qualquer await: o singleton é compartilhado e outra requisição pode trocar a sessão.
+        session_id = self.__session_id
+        config = {"configurable": {"thread_id": session_id}, "callbacks": tracing_callbacks()}
+        # Tom e nível do usuário detectados localmente (léxico + média móvel por sessão), sem chamada ao LLM.
+        sentiment = self.__sentiment.update(session_id, question)
+        context = MainContext(
+            session_id=session_id,
+            sentiment=sentiment,
+            dataset_id=dataset_id or DEFAULT_DATASET_ID,
+            checkpointer=self.__checkpointer
+        )
+
+        # Span raiz da resposta: modelo, ferramentas, recuperação e guardrails ficam abaixo dele.
+        async with span("agent.invoke", kind="agent", session_id=session_id, sentiment=sentiment):
+            self.__guardrails.validate_input(question)
+
+            decision = self.__router.classify(question) if self.__router.enabled else None
+            answer = None
+            if decision is not None and decision.direct:
+                answer = await self.__invoke_routed_tool(decision.route, question, config, context)
+
+            if answer is None:
+                response = await self.__chain.ainvoke(
+                    {"messages": [{"role": "user", "content": question}]},
+                    config=config,
+                    context=context
+                )
+                answer = self.__structured_answer(response)
+
+                if decision is not None:
+                    self.__router.record_agent_choice(decision, self.__tools_called(response["messages"]))
+
+            self.__guardrails.validate_output(answer)
+            return answer
@@ -0,0 +1,216 @@
+from analytics.columnar import read_frame, numeric_columns, columnar_path
+from collections import OrderedDict
+from utils import get_env_var
+from pathlib import Path
+from structured_logging import log_event
+import pandas as pd
+import threading
+
+
+class DatasetCatalog:
+    """
+    Singleton com o catálogo de datasets disponíveis para as ferramentas de dados.
+
+    Cada dataset é registrado por um id e só é carregado no primeiro uso. Os DataFrames
+    carregados ficam em um cache LRU limitado por um orçamento total de memória
+    (`DATASETS_MEMORY_BUDGET_MB`) e por um número máximo de entradas (`DATASETS_MAX_ENTRIES`,
+    uma por dataset e projeção de colunas); ao estourar qualquer um dos dois, os menos usados
+    são descartados.
+
+    Com `DATASETS_ZERO_COPY` (padrão), os DataFrames apontam para o arquivo colunar mapeado em
+    memória: vários workers do uvicorn leem as mesmas páginas do page cache, e só o que é
+    copiado para o processo conta no orçamento. Como os mapeados não ocupam o orçamento, é o
+    limite de entradas que os tira do cache (e libera o mapeamento).
+
+    Os CSVs de `assets/` e da raiz de `DATASETS_DIR` são compartilhados. Os enviados pelos
+    usuários ficam em `DATASETS_DIR/<dono>/` e são registrados como `<dono>/<nome>`, visíveis
+    só para o dono (veja `resolve`). Arquivos novos são encontrados sob demanda: um id
+    desconhecido faz o catálogo reler os diretórios antes de recusar.
+    """
+
+    __instance: "DatasetCatalog" = None
+
+    def __new__(cls):
+        """
+        Implementação do padrão singleton para compartilhar o catálogo e o cache no processo.
+        """
+
+        if cls.__instance is None:
+            cls.__instance = super(DatasetCatalog, cls).__new__(cls)
+            cls.__instance.__setup()
+
+        return cls.__instance
+
+    def __setup(self) -> None:
+        self.__lock = threading.Lock()
+        self.__paths: dict[str, str] = {}
+        # Dono de cada dataset (None para os compartilhados).
+        self.__owners: dict[str, str | None] = {}
+        self.__frames: OrderedDict[tuple, pd.DataFrame] = OrderedDict()
+        self.__sizes: dict[tuple, int] = {}
+        self.__budget_bytes = int(float(get_env_var("DATASETS_MEMORY_BUDGET_MB", "1024")) * 1024 * 1024)
+        self.__max_entries = int(get_env_var("DATASETS_MAX_ENTRIES", "32"))
+        self.__zero_copy = str(get_env_var("DATASETS_ZERO_COPY", "true")).lower() in {"1", "true", "yes"}
+
+        self.__uploads_dir = get_env_var("DATASETS_DIR")
+
+        # Datasets que acompanham o projeto e os compartilhados da raiz de DATASETS_DIR.
+        self.register_directory("./assets")
+        if self.__uploads_dir:
+            self.register_directory(self.__uploads_dir)
+
+    def register(self, dataset_id: str, csv_path: str, owner: str | None = None) -> None:
+        """
+        Registra (ou substitui) um dataset no catálogo, sem carregá-lo.
+
+        Args:
+            dataset_id: Identificador do dataset (ex.: `<dono>/<nome>` para um upload).
+            csv_path: Caminho do CSV.
+            owner: Dono do dataset; None o torna visível para todos.
+        """
+
+        with self.__lock:
+            previous = self.__paths.get(dataset_id)
+            self.__paths[dataset_id] = csv_path
+            self.__owners[dataset_id] = owner
+            if previous is not None and previous != csv_path:
+                self.__evict_dataset(dataset_id)
+
+    def register_directory(self, directory: str, owner: str | None = None) -> None:
+        """
+        Registra todos os CSVs de um diretório, usando o nome do arquivo como id
+        (prefixado pelo dono, quando informado).
+        """
+
+        for csv_path in sorted(Path(directory).glob("*.csv")):
+            dataset_id = f"{owner}/{csv_path.stem}" if owner else csv_path.stem
+            self.register(dataset_id, str(csv_path), owner)
+
+    def datasets(self, owner: str | None = None) -> list[str]:
+        """
+        Ids visíveis para o dono: os compartilhados e os dele.
+        """
+
+        return sorted(dataset_id for dataset_id, dataset_owner in self.__owners.items() if dataset_owner in (None, owner))
+
+    def __rescan(self, owner: str | None) -> None:
+        self.register_directory("./assets")
+        if not self.__uploads_dir:
+            return
+
+        self.register_directory(self.__uploads_dir)
+        # O dono vira nome de diretório: ids com separadores não são aceitos.
+        if owner and Path(owner).name == owner and owner not in {".", ".."}:
+            owner_dir = Path(self.__uploads_dir) / owner
+            if owner_dir.is_dir():
+                self.register_directory(str(owner_dir), owner)
+
+    def resolve(self, dataset_id: str, owner: str | None = None) -> str:
+        """
+        Converte o id pedido pelo usuário no id registrado, respeitando o dono.
+
+        Um upload do próprio dono (`<dono>/<nome>`) tem precedência sobre um dataset
+        compartilhado de mesmo nome. Ids de outro dono não são encontrados. Se o id não
+        estiver registrado, os diretórios são relidos (arquivos enviados depois do start).
+
+        Args:
+            dataset_id: Nome pedido (ex.: "vendas" ou "<dono>/vendas").
+            owner: Quem pede (ex.: número do remetente).
+
+        Raises:
+            ValueError: quando o dataset não existe ou não é visível para o dono.
+        """
+
+        name = dataset_id.split("/", 1)[1] if owner and dataset_id.startswith(f"{owner}/") else dataset_id
+        candidates = ([f"{owner}/{name}"] if owner else []) + [name]
+
+        for attempt in range(2):
+            for candidate in candidates:
+                if candidate in self.__paths and self.__owners.get(candidate) in (None, owner):
+                    return candidate
+
+            if attempt == 0:
+                self.__rescan(owner)
+
+        raise ValueError(f"Dataset '{dataset_id}' não encontrado. Disponíveis: {', '.join(self.datasets(owner)) or 'nenhum'}.")
+
+    def path(self, dataset_id: str) -> str:
+        """
+        Caminho do CSV de um dataset registrado (id já resolvido por `resolve`).
+
+        Raises:
+            ValueError: quando o dataset não está registrado.
+        """
+
+        try:
+            return self.__paths[dataset_id]
+        except KeyError:
+            raise ValueError(f"Dataset '{dataset_id}' não encontrado. Disponíveis: {', '.join(self.datasets()) or 'nenhum'}.")
+
+    def numeric_columns(self, dataset_id: str) -> list[str]:
+        return numeric_columns(self.path(dataset_id))
+
+    def sample(self, dataset_id: str, rows: int) -> pd.DataFrame:
+        """
+        Primeiras linhas do dataset, lidas direto do arquivo colunar (sem passar pelo cache).
+        """
+
+        return read_frame(self.path(dataset_id), limit=rows)
+
+    def get_frame(self, dataset_id: str, columns: list[str] | None = None) -> pd.DataFrame:
+        """
+        Retorna o DataFrame do dataset, carregando-o na primeira vez.
+
+        Args:
+            dataset_id: Identificador do dataset.
+            columns: Colunas necessárias (todas, se None). Cada projeção é cacheada separadamente.
+
+        Returns:
+            DataFrame com as colunas solicitadas. Não deve ser modificado por quem chama.
+        """
+
+        csv_path = self.path(dataset_id)
+        key = (dataset_id, columnar_path(csv_path).name, tuple(columns) if columns else None)
+
+        with self.__lock:
+            if key in self.__frames:
+                self.__frames.move_to_end(key)
+                return self.__frames[key]
+
+        df = read_frame(csv_path, columns=columns, zero_copy=self.__zero_copy)
+        # Colunas mapeadas do arquivo não ocupam memória privada do processo.
+        size = 0 if self.__zero_copy else int(df.memory_usage(deep=True).sum())
+
+        with self.__lock:
+            # Versões antigas do mesmo dataset (CSV alterado) não serão mais usadas.
+            for stale in [cached for cached in self.__frames if cached[0] == dataset_id and cached[1] != key[1]]:
+                self.__drop(stale)
+
+            if size <= self.__budget_bytes:
+                self.__frames[key] = df
+                self.__sizes[key] = size
+                self.__evict_to_budget()
+
+        return df
+
+    @property
+    def memory_usage(self) -> int:
+        """
+        Total de bytes ocupados pelos DataFrames em cache.
+        """
+
+        return sum(self.__sizes.values())
+
+    def __drop(self, key: tuple) -> None:
+        self.__frames.pop(key, None)
+        self.__sizes.pop(key, None)
+
+    def __evict_dataset(self, dataset_id: str) -> None:
+        for key in [cached for cached in self.__frames if cached[0] == dataset_id]:
+            self.__drop(key)
+
+    def __evict_to_budget(self) -> None:
+        while self.__frames and (self.memory_usage > self.__budget_bytes or len(self.__frames) > self.__max_entries):
+            key, _ = self.__frames.popitem(last=False)
+            size = self.__sizes.pop(key, 0)
+            log_event("dataset_evicted", dataset_id=key[0], bytes=size)
@@ -0,0 +1,190 @@
+from utils import get_env_var, file_lock
+from typing import Iterator
+from pathlib import Path
+import pyarrow.dataset as ds
+import pyarrow.csv as pa_csv
+import pyarrow.fs as pa_fs
+import pyarrow as pa
+import pandas as pd
+import threading
+import hashlib
+import os
+
+
+# Sistema de arquivos local com memory map: leituras de arquivos Arrow IPC não copiam os buffers.
+_MMAP_FILESYSTEM = pa_fs.LocalFileSystem(use_mmap=True)
+
+_conversion_lock = threading.Lock()
+
+
+def _source_key(csv_path: str) -> str:
+    """
+    Chave do CSV no `COLUMNAR_DATA_DIR`: hash do caminho resolvido, para CSVs com o mesmo nome
+    em diretórios diferentes (ex.: uploads de remetentes distintos) não dividirem arquivos.
+    """
+
+    return hashlib.blake2b(os.path.realpath(csv_path).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def columnar_path(csv_path: str) -> Path:
+    """
+    Caminho do arquivo colunar correspondente à versão atual do CSV (caminho resolvido +
+    tamanho + data de modificação).
+
+    Args:
+        csv_path: Caminho do CSV de origem.
+
+    Returns:
+        Caminho do arquivo Arrow IPC.
+    """
+
+    stat = os.stat(csv_path)
+    columnar_dir = Path(get_env_var("COLUMNAR_DATA_DIR", "./.columnar_data"))
+    return columnar_dir / f"{_source_key(csv_path)}-{stat.st_mtime_ns}-{stat.st_size}.arrow"
+
+
+def _write_streaming(csv_path: str, target: Path) -> None:
+    """
+    Converte o CSV bloco a bloco, sem carregar o arquivo inteiro em memória.
+    Os tipos são inferidos pelo leitor CSV do Arrow (inteiros, floats, datas e strings).
+    """
+
+    reader = pa_csv.open_csv(csv_path, read_options=pa_csv.ReadOptions(block_size=64 * 1024 * 1024))
+    with pa.OSFile(str(target), "wb") as sink:
+        with pa.ipc.new_file(sink, reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+
+
+def _write_full(csv_path: str, target: Path) -> None:
+    """
+    Converte o CSV lendo o arquivo inteiro, para quando a inferência por bloco falha
+    (ex.: coluna que só tem valores não numéricos depois do primeiro bloco).
+    """
+
+    table = pa_csv.read_csv(csv_path)
+    with pa.OSFile(str(target), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def ensure_columnar(csv_path: str) -> str:
+    """
+    Garante que exista a versão colunar (Arrow IPC, sem compressão) do CSV e retorna seu caminho.
+
+    O formato Arrow IPC sem compressão pode ser mapeado em memória e lido sem cópia e sem
+    parse, e as páginas do arquivo ficam no page cache compartilhado entre processos.
+
+    Args:
+        csv_path: Caminho do CSV registrado.
+
+    Returns:
+        Caminho do arquivo Arrow IPC.
+    """
+
+    target = columnar_path(csv_path)
+    if target.exists():
+        return str(target)
+
+    # O lock de arquivo faz só um worker converter o CSV; os outros esperam e reaproveitam.
+    key = _source_key(csv_path)
+    with _conversion_lock, file_lock(target.parent / f".{key}.lock"):
+        if target.exists():
+            return str(target)
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            _write_streaming(csv_path, tmp_path)
+        except pa.ArrowInvalid:
+            _write_full(csv_path, tmp_path)
+
+        os.replace(tmp_path, target)
+
+        # Versões antigas do mesmo CSV (mesmo caminho) não são mais usadas.
+        for old in target.parent.glob(f"{key}-*.arrow"):
+            if old != target:
+                old.unlink(missing_ok=True)
+
+    return str(target)
+
+
+def open_dataset(csv_path: str) -> ds.Dataset:
+    """
+    Abre a versão colunar do CSV como um dataset Arrow com memory map.
+    """
+
+    return ds.dataset(ensure_columnar(csv_path), format="ipc", filesystem=_MMAP_FILESYSTEM)
+
+
+def read_schema(csv_path: str) -> pa.Schema:
+    """
+    Retorna o schema (colunas e tipos) sem ler nenhum dado.
+    """
+
+    return open_dataset(csv_path).schema
+
+
+def numeric_columns(csv_path: str) -> list[str]:
+    """
+    Retorna os nomes das colunas numéricas a partir do schema.
+    """
+
+    schema = read_schema(csv_path)
+    return [
+        field.name for field in schema
+        if pa.types.is_integer(field.type) or pa.types.is_floating(field.type) or pa.types.is_decimal(field.type)
+    ]
+
+
+def read_frame(
+    csv_path: str,
+    columns: list[str] | None = None,
+    filter: ds.Expression | None = None,
+    limit: int | None = None,
+    zero_copy: bool = False
+) -> pd.DataFrame:
+    """
+    Lê o dataset em formato colunar com projeção de colunas e, opcionalmente, filtro de linhas.
+
+    Args:
+        csv_path: Caminho do CSV registrado.
+        columns: Colunas a carregar (todas, se None).
+        filter: Expressão de filtro do Arrow (ex.: `ds.field("Tempo") > 30`), aplicada durante a leitura.
+        limit: Número máximo de linhas (ex.: amostras para prompts).
+        zero_copy: Mantém as colunas nos buffers Arrow do arquivo mapeado (dtypes `pd.ArrowDtype`),
+            em vez de copiá-las para numpy. As páginas ficam no page cache e são compartilhadas
+            por todos os processos que abrem o mesmo arquivo.
+
+    Returns:
+        DataFrame pandas com apenas os dados solicitados.
+    """
+
+    dataset = open_dataset(csv_path)
+    if limit is not None:
+        table = dataset.head(limit, columns=columns, filter=filter)
+    else:
+        table = dataset.to_table(columns=columns, filter=filter)
+
+    if zero_copy:
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+    return table.to_pandas()
+
+
+def iter_frames(csv_path: str, columns: list[str] | None = None, batch_rows: int = 250_000) -> Iterator[pd.DataFrame]:
+    """
+    Percorre o dataset em lotes, para processamento out-of-core.
+
+    Args:
+        csv_path: Caminho do CSV registrado.
+        columns: Colunas a carregar (todas, se None).
+        batch_rows: Número máximo de linhas por lote.
+
+    Yields:
+        DataFrames com no máximo `batch_rows` linhas.
+    """
+
+    for batch in open_dataset(csv_path).to_batches(columns=columns, batch_size=batch_rows):
+        if batch.num_rows:
+            yield batch.to_pandas()
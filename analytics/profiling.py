@@ -0,0 +1,322 @@
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from analytics.sketches import KLLSketch, HyperLogLog, RowHashCounter
+from analytics.columnar import iter_frames
+from dataclasses import dataclass, field
+from utils import get_env_var
+from typing import Iterable
+import pandas as pd
+import numpy as np
+import multiprocessing
+import threading
+import os
+
+
+# Pool de processos persistente, compartilhado entre as chamadas (criado no primeiro uso).
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+@dataclass
+class ColumnProfile:
+    """
+    Estatísticas de uma coluna calculadas em uma passada e mescláveis entre chunks.
+
+    Contagens, média, variância (Welford/Chan), mínimo, máximo e nulos são exatos;
+    quantis (KLL) e valores distintos (HyperLogLog) são aproximados.
+    """
+
+    name: str
+    dtype: str = ""
+    count: int = 0
+    nulls: int = 0
+    nan_strings: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    minimum: float = np.inf
+    maximum: float = -np.inf
+    numeric: bool = True
+    quantiles: KLLSketch = field(default_factory=KLLSketch)
+    distinct: HyperLogLog = field(default_factory=HyperLogLog)
+
+    def update(self, series: pd.Series) -> None:
+        nulls = int(series.isna().sum())
+        values = series.dropna()
+
+        self.nulls += nulls
+        self.distinct.update_hashes(pd.util.hash_pandas_object(values, index=False).to_numpy())
+
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            self.__update_numeric(values.to_numpy(dtype=np.float64))
+        else:
+            self.numeric = False
+            self.count += int(values.size)
+            self.nan_strings += int(values.astype(str).str.strip().str.lower().eq("nan").sum())
+
+        self.dtype = self.__merge_dtype(self.dtype, str(series.dtype))
+
+    def __update_numeric(self, values: np.ndarray) -> None:
+        if values.size == 0:
+            return
+
+        chunk_count = values.size
+        chunk_mean = float(values.mean())
+        chunk_m2 = float(((values - chunk_mean) ** 2).sum())
+        self.__combine(chunk_count, chunk_mean, chunk_m2, float(values.min()), float(values.max()))
+        self.quantiles.update(values)
+
+    def __combine(self, count: int, mean: float, m2: float, minimum: float, maximum: float) -> None:
+        # Fórmula de Chan para combinar médias e somas de quadrados de partições independentes.
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.minimum = min(self.minimum, minimum)
+        self.maximum = max(self.maximum, maximum)
+
+    @staticmethod
+    def __merge_dtype(current: str, new: str) -> str:
+        if not current or current == new:
+            return new
+
+        numeric = {"int64", "float64", "Int64", "Float64"}
+        if current in numeric and new in numeric:
+            return "float64"
+
+        return "object"
+
+    def merge(self, other: "ColumnProfile") -> None:
+        self.nulls += other.nulls
+        self.nan_strings += other.nan_strings
+        self.numeric = self.numeric and other.numeric
+        if other.count:
+            self.__combine(other.count, other.mean, other.m2, other.minimum, other.maximum)
+        self.quantiles.merge(other.quantiles)
+        self.distinct.merge(other.distinct)
+        self.dtype = self.__merge_dtype(self.dtype, other.dtype)
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else float("nan")
+
+
+@dataclass
+class DatasetProfile:
+    """
+    Perfil completo de um dataset, calculado por chunks e mesclado ao final.
+    """
+
+    rows: int = 0
+    columns: dict[str, ColumnProfile] = field(default_factory=dict)
+    row_hashes: RowHashCounter = field(default_factory=RowHashCounter)
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        self.rows += len(chunk)
+        for name in chunk.columns:
+            self.columns.setdefault(name, ColumnProfile(name=name)).update(chunk[name])
+
+        self.row_hashes.update_hashes(pd.util.hash_pandas_object(chunk, index=False).to_numpy())
+
+    def merge(self, other: "DatasetProfile") -> None:
+        self.rows += other.rows
+        for name, column in other.columns.items():
+            if name in self.columns:
+                self.columns[name].merge(column)
+            else:
+                self.columns[name] = column
+
+        self.row_hashes.merge(other.row_hashes)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return (self.rows, len(self.columns))
+
+    def dtypes(self) -> pd.Series:
+        return pd.Series({name: column.dtype for name, column in self.columns.items()}, dtype=object)
+
+    def nulls(self) -> pd.Series:
+        return pd.Series({name: column.nulls for name, column in self.columns.items()}, dtype="int64")
+
+    def nan_strings(self) -> pd.Series:
+        return pd.Series({name: column.nan_strings for name, column in self.columns.items()}, dtype="int64")
+
+    def distinct(self) -> pd.Series:
+        return pd.Series({name: column.distinct.estimate() for name, column in self.columns.items()}, dtype="int64")
+
+    def duplicates(self) -> int:
+        return self.row_hashes.duplicates()
+
+    def describe(self) -> pd.DataFrame:
+        """
+        Equivalente a `df.describe(include='number').transpose()`, com quantis aproximados.
+        """
+
+        rows = {}
+        for name, column in self.columns.items():
+            if not column.numeric:
+                continue
+
+            rows[name] = {
+                "count": float(column.count),
+                "mean": column.mean if column.count else float("nan"),
+                "std": column.std,
+                "min": column.minimum if column.count else float("nan"),
+                "25%": column.quantiles.quantile(0.25),
+                "50%": column.quantiles.quantile(0.50),
+                "75%": column.quantiles.quantile(0.75),
+                "max": column.maximum if column.count else float("nan"),
+            }
+
+        return pd.DataFrame.from_dict(rows, orient="index")
+
+
+def _profile_chunk(chunk: pd.DataFrame) -> DatasetProfile:
+    profile = DatasetProfile()
+    profile.update(chunk)
+    return profile
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Retorna o pool compartilhado, criando-o (ou recriando, se o número de workers mudou).
+
+    Usa "spawn", como o `tools/sandbox.py`: o processo da API tem threads (logger em fila,
+    executor das ferramentas) e um fork herdaria os locks delas.
+    """
+
+    global _pool, _pool_workers
+
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    global _pool
+
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pool() -> None:
+    """
+    Encerra o pool compartilhado (chamado no shutdown da API).
+    """
+
+    global _pool
+
+    with _pool_lock:
+        pool, _pool = _pool, None
+
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def profile_frames(frames: Iterable[pd.DataFrame], workers: int | None = None) -> DatasetProfile:
+    """
+    Calcula o perfil de uma sequência de DataFrames (chunks) sem mantê-los em memória.
+
+    Cada chunk é perfilado em um processo do pool compartilhado e os resultados parciais são
+    mesclados conforme ficam prontos. No máximo 2x `workers` chunks desta chamada ficam em
+    memória ao mesmo tempo.
+
+    Args:
+        frames: Chunks do dataset.
+        workers: Processos do pool (padrão: `PROFILE_WORKERS` ou número de CPUs).
+
+    Returns:
+        Perfil mesclado do dataset.
+    """
+
+    workers = workers or int(get_env_var("PROFILE_WORKERS", str(os.cpu_count() or 1)))
+
+    profile = DatasetProfile()
+    pending: list[Future] = []
+
+    executor = _get_pool(workers)
+
+    try:
+        for chunk in frames:
+            pending.append(executor.submit(_profile_chunk, chunk))
+
+            # Limita a quantidade de chunks em voo para manter a memória constante.
+            if len(pending) >= 2 * workers:
+                profile.merge(pending.pop(0).result())
+
+        for future in pending:
+            profile.merge(future.result())
+    except BrokenProcessPool:
+        # Um worker morreu (ex.: falta de memória): a próxima chamada cria um pool novo.
+        _discard_pool(executor)
+        raise
+    finally:
+        for future in pending:
+            future.cancel()
+
+    return profile
+
+
+def profile_csv(
+    csv_path: str,
+    usecols: list[str] | None = None,
+    chunksize: int | None = None,
+    workers: int | None = None
+) -> DatasetProfile:
+    """
+    Calcula o perfil de um CSV em streaming, fazendo o parse do texto em chunks.
+
+    Args:
+        csv_path: Caminho do CSV.
+        usecols: Colunas a perfilar (todas, se None).
+        chunksize: Linhas por chunk (padrão: `PROFILE_CHUNK_ROWS`).
+        workers: Processos do pool (padrão: `PROFILE_WORKERS` ou número de CPUs).
+
+    Returns:
+        Perfil mesclado do dataset.
+    """
+
+    chunksize = chunksize or int(get_env_var("PROFILE_CHUNK_ROWS", "250000"))
+    return profile_frames(pd.read_csv(csv_path, usecols=usecols, chunksize=chunksize), workers)
+
+
+def profile_dataset(
+    csv_path: str,
+    columns: list[str] | None = None,
+    chunksize: int | None = None,
+    workers: int | None = None
+) -> DatasetProfile:
+    """
+    Calcula o perfil em streaming a partir da versão colunar (memory map) do CSV,
+    lendo apenas as colunas necessárias e sem refazer o parse do texto.
+
+    Args:
+        csv_path: Caminho do CSV registrado.
+        columns: Colunas a perfilar (todas, se None).
+        chunksize: Linhas por chunk (padrão: `PROFILE_CHUNK_ROWS`).
+        workers: Processos do pool (padrão: `PROFILE_WORKERS` ou número de CPUs).
+
+    Returns:
+        Perfil mesclado do dataset.
+    """
+
+    chunksize = chunksize or int(get_env_var("PROFILE_CHUNK_ROWS", "250000"))
+    return profile_frames(iter_frames(csv_path, columns=columns, batch_rows=chunksize), workers)
+
+
+def should_stream(csv_path: str) -> bool:
+    """
+    Indica se o arquivo é grande o suficiente para usar o perfil em streaming
+    (limite configurável em `PROFILE_STREAMING_THRESHOLD_MB`).
+    """
+
+    threshold_mb = float(get_env_var("PROFILE_STREAMING_THRESHOLD_MB", "200"))
+    return os.path.getsize(csv_path) > threshold_mb * 1024 * 1024
@@ -1,32 +1,59 @@
 from __future__ import annotations
 from contextlib import asynccontextmanager
 
-from langgraph.checkpoint.memory import InMemorySaver
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel, Field
 import hashlib
+import asyncio
 import hmac
-import json
 import logging
 import time
 
 from agent import Agent
-from utils import load_environment_variables, get_env_var
+from observability import HTTP_DURATION, render_metrics
+from structured_logging import log_event
+from utils import db_checkpointer, load_environment_variables, get_env_var
+from warmup import Warmup
 
-app = FastAPI(title="Chatbot RAG (WhatsApp Simulado)")
 
-logger = logging.getLogger("chatbot_api")
-if not logger.handlers:
-    logging.basicConfig(level=logging.INFO, format="%(message)s")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Abre o checkpointer compartilhado e aquece a API em segundo plano.
+
+    O `/health` responde assim que o servidor sobe; o `/ready` só fica verdadeiro depois
+    do aquecimento (agente, RAG, datasets e MCP), para o balanceador não mandar tráfego antes.
+    """
+
+    load_environment_variables()
+
+    async with db_checkpointer() as checkpointer:
+        app.state.checkpointer = checkpointer
+        warmup = Warmup()
+        warmup_task = asyncio.create_task(warmup.run(checkpointer))
+        try:
+            yield
+        finally:
+            # Cancelar não interrompe o trabalho já em `to_thread` (agente, RAG, sandbox): espera o
+            # aquecimento terminar para não fechar os recursos enquanto ele ainda os cria.
+            await asyncio.shield(warmup_task)
+            await warmup.shutdown()
+
+
+app = FastAPI(title="Chatbot RAG (WhatsApp Simulado)", lifespan=lifespan)
 
 
 @app.middleware("http")
 async def request_logging_middleware(request: Request, call_next):
     start_time = time.perf_counter()
     response = await call_next(request)
-    duration_ms = int((time.perf_counter() - start_time) * 1000)
-    _log_event(
+    duration = time.perf_counter() - start_time
+    duration_ms = int(duration * 1000)
+    # Usa o template da rota (ex.: /whatsapp/webhook) para não criar uma série por URL.
+    route = request.scope.get("route")
+    HTTP_DURATION.observe(duration, request.method, getattr(route, "path", "unmatched"), response.status_code)
+    log_event(
         "http_request",
         method=request.method,
         path=str(request.url.path),
@@ -44,6 +71,7 @@ class WhatsAppMessage(BaseModel):
     from_number: str = Field(..., alias="from")
     text: str
     session_id: str | None = None
+    dataset_id: str | None = None
 
 
 class WhatsAppReply(BaseModel):
@@ -55,11 +83,6 @@ class WhatsAppReply(BaseModel):
     reply: str
 
 
-def _log_event(event: str, **fields: object) -> None:
-    payload = {"event": event, "ts": int(time.time()), **fields}
-    logger.info(json.dumps(payload, ensure_ascii=False))
-
-
 def _verify_whatsapp_signature(request_body: bytes, signature_header: str | None) -> None:
     """
     Valida assinatura do webhook usando HMAC SHA256 (X-Hub-Signature-256).
@@ -78,23 +101,32 @@ def _verify_whatsapp_signature(request_body: bytes, signature_header: str | None
         raise HTTPException(status_code=401, detail="Assinatura inválida")
 
 
-@asynccontextmanager
-async def lifespan(_: FastAPI):
+@app.get("/health")
+def health() -> dict[str, str]:
     """
-    Inicializa guardrails e pipeline RAG.
+    Healthcheck simples.
     """
 
-    load_environment_variables()
-    Agent()
+    return {"status": "ok"}
 
 
-@app.get("/health")
-def health() -> dict[str, str]:
+@app.get("/ready")
+def ready() -> JSONResponse:
     """
-    Healthcheck simples.
+    Readiness: 200 só depois do aquecimento, 503 enquanto ele roda ou se uma etapa obrigatória falhou.
     """
 
-    return {"status": "ok"}
+    report = Warmup().report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    """
+    Métricas do agente e da API no formato texto do Prometheus.
+    """
+
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/whatsapp/webhook", response_class=PlainTextResponse)
@@ -122,21 +154,28 @@ async def receive_message(request: Request, payload: WhatsAppMessage) -> WhatsAp
     Recebe a mensagem do WhatsApp e responde usando o RAG.
     """
 
-    chat = Agent.get_instance(session_id=payload.session_id or payload.from_number, checkpointer=InMemorySaver())
-
     raw_body = await request.body()
     _verify_whatsapp_signature(raw_body, request.headers.get("X-Hub-Signature-256"))
 
     session_id = payload.session_id or payload.from_number
-    _log_event("message_received", from_number=payload.from_number, session_id=session_id)
+    log_event("message_received", from_number=payload.from_number, session_id=session_id)
 
     try:
-        response: str = chat.invoke(payload.text)
-        _log_event("message_answered", from_number=payload.from_number, session_id=session_id)
+        dataset_id = None
+        if payload.dataset_id:
+            from analytics.catalog import DatasetCatalog
+
+            # Datasets enviados por um remetente só são visíveis para ele.
+            dataset_id = await asyncio.to_thread(DatasetCatalog().resolve, payload.dataset_id, payload.from_number)
+
+        # Sem await entre o get_instance e o invoke: a sessão do singleton é lida no início do invoke.
+        chat = Agent.get_instance(session_id=session_id, checkpointer=request.app.state.checkpointer)
+        response: str = await chat.invoke(payload.text, dataset_id=dataset_id)
+        log_event("message_answered", from_number=payload.from_number, session_id=session_id)
         return WhatsAppReply(to=payload.from_number, reply=response.strip())
     except ValueError as exc:
-        _log_event("message_rejected", from_number=payload.from_number, session_id=session_id, reason=str(exc))
+        log_event("message_rejected", level=logging.WARNING, from_number=payload.from_number, session_id=session_id, reason=str(exc))
         raise HTTPException(status_code=400, detail=str(exc))
     except Exception as exc:
-        _log_event("message_error", from_number=payload.from_number, session_id=session_id, reason=str(exc))
+        log_event("message_error", level=logging.ERROR, from_number=payload.from_number, session_id=session_id, reason=str(exc))
         raise HTTPException(status_code=500, detail=f"Erro ao processar mensagem: {exc}")
@@ -0,0 +1,178 @@
+"""
+Benchmark de carga ponta a ponta do `POST /whatsapp/webhook` com provedores falsos.
+
+Sobe o servidor MCP stub e a API (uvicorn) em subprocessos com `PROVIDERS_MODULE=benchmarks.fakes`,
+de modo que agente, ferramentas e API rodam de verdade, mas nenhuma chamada vai ao Gemini/Groq.
+Para cada nível de concorrência, reporta requisições por segundo, p50/p95/p99 e taxa de erro.
+
+Uso:
+
+    python -m benchmarks.api_load --concurrency 1 8 32 --requests 200 --llm-latency-ms 200
+    python -m benchmarks.api_load --agent-script graph_tool --math-script add_subtool,multiply_subtool
+    python -m benchmarks.api_load --url http://localhost:8001   # API já em execução
+"""
+
+from statistics import quantiles
+from rich import print
+from rich.table import Table
+import subprocess
+import tempfile
+import argparse
+import asyncio
+import httpx
+import time
+import sys
+import os
+
+
+QUESTIONS = [
+    "Quanto é 6 vezes 3?",
+    "Qual a média do tempo de entrega?",
+    "O que é RAG?",
+    "Quais colunas o dataset possui?",
+]
+
+
+def start_process(args: list[str], env: dict) -> subprocess.Popen:
+    # A saída de erro vai para um arquivo temporário: um pipe cheio travaria o servidor.
+    return subprocess.Popen([sys.executable, *args], env=env, stdout=subprocess.DEVNULL, stderr=tempfile.TemporaryFile())
+
+
+async def wait_until_ready(url: str, process: subprocess.Popen | None, timeout: float = 120.0) -> None:
+    """
+    Aguarda o `/ready` da API (fim do aquecimento) responder 200.
+    """
+
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process is not None and process.poll() is not None:
+                raise RuntimeError(f"A API terminou ao iniciar (código {process.returncode}).")
+            try:
+                if (await client.get(f"{url}/ready")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.5)
+
+    raise TimeoutError("A API não ficou pronta a tempo.")
+
+
+async def run_level(url: str, concurrency: int, requests: int, timeout: float) -> dict:
+    """
+    Envia `requests` mensagens com `concurrency` clientes simultâneos (cada cliente é uma sessão).
+    """
+
+    latencies: list[float] = []
+    errors: list[str] = []
+    counter = iter(range(requests))
+
+    async def client_loop(client_id: int, client: httpx.AsyncClient) -> None:
+        for index in counter:
+            payload = {"from": f"55119{client_id:08d}", "text": QUESTIONS[index % len(QUESTIONS)]}
+            start = time.perf_counter()
+            try:
+                response = await client.post(f"{url}/whatsapp/webhook", json=payload)
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors.append(f"HTTP {response.status_code}: {response.text[:200]}")
+            except httpx.HTTPError as e:
+                errors.append(repr(e))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[client_loop(client_id, client) for client_id in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+    percentiles = quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentiles[49] * 1000 if percentiles else 0.0,
+        "p95_ms": percentiles[94] * 1000 if percentiles else 0.0,
+        "p99_ms": percentiles[98] * 1000 if percentiles else 0.0,
+        "error_rate": len(errors) / requests if requests else 0.0,
+        "first_error": errors[0] if errors else "",
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de carga da API com provedores falsos.")
+    parser.add_argument("--url", default=None, help="API já em execução (não sobe subprocessos).")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--mcp-port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=100, help="Requisições por nível de concorrência.")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--mcp-latency-ms", type=float, default=5.0)
+    parser.add_argument("--agent-script", default="", help="Ferramentas chamadas pelo agente, ex.: graph_tool ou rag_tool+graph_tool (mesmo turno).")
+    parser.add_argument("--math-script", default="add_subtool", help="Ferramentas MCP chamadas pelo graph_tool.")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    processes: list[subprocess.Popen] = []
+    url = args.url
+    api_process = None
+
+    if url is None:
+        env = {
+            **os.environ,
+            "PROVIDERS_MODULE": "benchmarks.fakes",
+            "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms),
+            "FAKE_LLM_SCRIPT_AGENT": args.agent_script,
+            "FAKE_LLM_SCRIPT_MATH": args.math_script,
+            "MCP_MATH_URL": f"http://127.0.0.1:{args.mcp_port}/sse",
+            "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY", "fake"),
+            "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "fake"),
+            "GROQ_API_KEY": os.environ.get("GROQ_API_KEY", "fake"),
+        }
+        processes.append(start_process(
+            ["-m", "benchmarks.stub_mcp_server", "--port", str(args.mcp_port), "--latency-ms", str(args.mcp_latency_ms)],
+            env
+        ))
+        api_process = start_process(
+            ["-m", "uvicorn", "api.main:app", "--port", str(args.port), "--log-level", "warning"],
+            env
+        )
+        processes.append(api_process)
+        url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        await wait_until_ready(url, api_process)
+
+        # Aquecimento: a primeira requisição paga a criação do agente e das conexões.
+        await run_level(url, 1, 2, args.timeout)
+
+        table = Table(title=f"POST /whatsapp/webhook (LLM falso com {args.llm_latency_ms:.0f} ms)")
+        for column in ["concorrência", "requisições", "req/s", "p50 (ms)", "p95 (ms)", "p99 (ms)", "erros"]:
+            table.add_column(column)
+
+        first_error = ""
+        for concurrency in args.concurrency:
+            result = await run_level(url, concurrency, args.requests, args.timeout)
+            first_error = first_error or result["first_error"]
+            table.add_row(
+                str(result["concurrency"]),
+                str(result["requests"]),
+                f"{result['rps']:.1f}",
+                f"{result['p50_ms']:.1f}",
+                f"{result['p95_ms']:.1f}",
+                f"{result['p99_ms']:.1f}",
+                f"{result['error_rate']:.1%}",
+            )
+
+        print(table)
+        if first_error:
+            print(f"Primeiro erro: {first_error}")
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
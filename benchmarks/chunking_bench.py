@@ -0,0 +1,129 @@
+"""
+Benchmark do chunking do ETL: splitter por caracteres (RecursiveCharacterTextSplitter) versus o
+chunking por tokens de `rags/chunking.py`, em um processo e em paralelo.
+
+Carrega as páginas dos PDFs de `assets/` com os mesmos metadados e cabeçalho do `etl_pdf_process`
+e repete o corpus `--repeat` vezes (com fontes distintas por cópia) para medir a vazão em uma
+escala maior que a dos PDFs de exemplo.
+
+Métricas por estratégia: documentos/s e MB/s, número de trechos, média, desvio padrão e
+coeficiente de variação dos tokens por trecho, maior trecho e a fração de trechos acima do
+limite de tokens (`--max-tokens`), todos contados com o mesmo tokenizer do chunking.
+
+Uso:
+
+    python -m benchmarks.chunking_bench
+    python -m benchmarks.chunking_bench --repeat 200 --workers 8 --max-tokens 384
+"""
+
+from langchain_classic.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+from rags.chunking import ChunkingConfig, chunk_documents, get_token_counter
+from rags.etls import load_pdf_pages
+from statistics import mean, pstdev
+from rich import print
+from rich.table import Table
+import argparse
+import time
+import os
+
+
+def scale_corpus(pages: list[Document], repeat: int) -> list[Document]:
+    """
+    Repete as páginas `repeat` vezes, com uma fonte diferente por cópia (os ids dos trechos
+    dependem da fonte, então as cópias não colidem).
+    """
+
+    return [
+        Document(page_content=page.page_content, metadata={**page.metadata, "source": f"copia{copy}/{page.metadata.get('source')}"})
+        for copy in range(repeat)
+        for page in pages
+    ]
+
+
+def measure(name: str, split, documents: list[Document], max_tokens: int, rounds: int) -> dict:
+    """
+    Executa a estratégia `rounds` vezes (fica o melhor tempo) e calcula as estatísticas dos trechos.
+    """
+
+    elapsed = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        chunks = split(documents)
+        elapsed = min(elapsed, time.perf_counter() - start)
+
+    tokens = get_token_counter()([chunk.page_content for chunk in chunks])
+    megabytes = sum(len(doc.page_content.encode("utf-8")) for doc in documents) / 1_000_000
+    average = mean(tokens)
+    deviation = pstdev(tokens)
+
+    return {
+        "strategy": name,
+        "seconds": elapsed,
+        "docs_per_s": len(documents) / elapsed,
+        "mb_per_s": megabytes / elapsed,
+        "chunks": len(chunks),
+        "mean_tokens": average,
+        "std_tokens": deviation,
+        "cv": deviation / average if average else 0.0,
+        "max_tokens": max(tokens),
+        "over_limit": sum(count > max_tokens for count in tokens) / len(tokens),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Vazão e uniformidade do chunking por caracteres versus por tokens.")
+    parser.add_argument("--repeat", type=int, default=50, help="Cópias do corpus de assets/.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processos do chunking paralelo.")
+    parser.add_argument("--max-tokens", type=int, default=384)
+    parser.add_argument("--overlap-tokens", type=int, default=48)
+    parser.add_argument("--chunk-size", type=int, default=1500, help="Tamanho (caracteres) do splitter atual.")
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=3, help="Execuções por estratégia (fica a mais rápida).")
+    args = parser.parse_args()
+
+    documents = scale_corpus(load_pdf_pages(), args.repeat)
+    config = ChunkingConfig(max_tokens=args.max_tokens, overlap_tokens=args.overlap_tokens, min_tokens=args.max_tokens // 3)
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        separators=["\n\n", "\n", ". ", " ", ""],
+    )
+
+    # Carrega o tokenizer fora da medição.
+    get_token_counter()
+
+    strategies = [
+        (f"caracteres {args.chunk_size}/{args.chunk_overlap}", splitter.split_documents),
+        (f"tokens {args.max_tokens}/{args.overlap_tokens} (1 processo)", lambda docs: chunk_documents(docs, config, workers=1)),
+        # Sem o mínimo de documentos do ETL, para medir os processos em qualquer tamanho de corpus.
+        (
+            f"tokens {args.max_tokens}/{args.overlap_tokens} ({args.workers} processos)",
+            lambda docs: chunk_documents(docs, config, workers=args.workers, min_parallel_documents=0)
+        ),
+    ]
+    rows = [measure(name, split, documents, args.max_tokens, args.rounds) for name, split in strategies]
+
+    table = Table(title=f"Chunking: {len(documents)} páginas, limite de {args.max_tokens} tokens")
+    for column in ["estratégia", "tempo (s)", "docs/s", "MB/s", "trechos", "tokens médio", "desvio", "CV", "máx. tokens", "acima do limite"]:
+        table.add_column(column)
+
+    for row in rows:
+        table.add_row(
+            row["strategy"],
+            f"{row['seconds']:.3f}",
+            f"{row['docs_per_s']:.0f}",
+            f"{row['mb_per_s']:.2f}",
+            str(row["chunks"]),
+            f"{row['mean_tokens']:.1f}",
+            f"{row['std_tokens']:.1f}",
+            f"{row['cv']:.2f}",
+            str(row["max_tokens"]),
+            f"{row['over_limit']:.1%}",
+        )
+
+    print(table)
+
+
+if __name__ == "__main__":
+    main()
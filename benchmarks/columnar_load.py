@@ -0,0 +1,140 @@
+"""
+Benchmark de carga de dataset: `pd.read_csv` versus leitura colunar com memory map.
+
+Cada leitura roda em um subprocesso novo para que o pico de memória (RSS) de uma
+não contamine a outra. A conversão para Arrow IPC é feita antes e medida à parte.
+
+Uso:
+
+    python -m benchmarks.columnar_load --csv ./assets/dados_entregas.csv
+    python -m benchmarks.columnar_load --rows 2000000   # gera um CSV sintético
+"""
+
+from rich import print
+from rich.table import Table
+import numpy as np
+import pandas as pd
+import subprocess
+import argparse
+import json
+import time
+import sys
+import os
+
+
+METHODS = ["csv_all", "csv_numeric", "columnar_all", "columnar_numeric"]
+
+
+def generate_csv(path: str, rows: int) -> None:
+    """
+    Gera um CSV sintético com colunas numéricas e categóricas parecido com o de entregas.
+    """
+
+    rng = np.random.default_rng(42)
+    pd.DataFrame({
+        "id_entrega": np.arange(rows),
+        "distancia_km": rng.gamma(2.0, 3.0, rows).round(2),
+        "tempo_entrega_min": rng.normal(35, 10, rows).round(1),
+        "avaliacao_agente": rng.uniform(1, 5, rows).round(1),
+        "clima": rng.choice(["Ensolarado", "Chuvoso", "Nublado", "Tempestade"], rows),
+        "trafego": rng.choice(["Baixo", "Medio", "Alto", "Congestionado"], rows),
+        "veiculo": rng.choice(["moto", "carro", "bicicleta"], rows),
+    }).to_csv(path, index=False)
+
+
+def current_rss_mb() -> float:
+    """
+    RSS atual do processo (VmRSS), em MB.
+    """
+
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+
+    return 0.0
+
+
+def run_method(method: str, csv_path: str) -> dict:
+    """
+    Executa uma estratégia de leitura no processo atual e retorna o tempo e quanto o RSS
+    cresceu com o DataFrame carregado.
+    """
+
+    from analytics.columnar import read_frame, numeric_columns, ensure_columnar
+
+    ensure_columnar(csv_path)
+    numeric = numeric_columns(csv_path)
+    baseline_rss = current_rss_mb()
+
+    start = time.perf_counter()
+    if method == "csv_all":
+        df = pd.read_csv(csv_path)
+    elif method == "csv_numeric":
+        df = pd.read_csv(csv_path, usecols=numeric)
+    elif method == "columnar_all":
+        df = read_frame(csv_path)
+    else:
+        df = read_frame(csv_path, columns=numeric)
+
+    # Força o uso dos dados, como as ferramentas fazem.
+    df.describe(include="number")
+    elapsed = time.perf_counter() - start
+
+    return {"method": method, "seconds": elapsed, "rss_mb": current_rss_mb() - baseline_rss}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de carga: CSV versus Arrow colunar.")
+    parser.add_argument("--csv", default=None, help="CSV a ser medido.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Linhas do CSV sintético quando --csv não é informado.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--run", choices=METHODS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    csv_path = args.csv or f"./bench_columnar_{args.rows}.csv"
+
+    if args.run:
+        sys.stdout.write(json.dumps(run_method(args.run, csv_path)) + "\n")
+        return
+
+    if not os.path.exists(csv_path):
+        print(f"Gerando CSV sintético com {args.rows} linhas em {csv_path}...")
+        generate_csv(csv_path, args.rows)
+
+    from analytics.columnar import ensure_columnar, columnar_path
+
+    start = time.perf_counter()
+    ensure_columnar(csv_path)
+    conversion = time.perf_counter() - start
+
+    table = Table(title=f"Carga de {csv_path} ({os.path.getsize(csv_path) / 1024 / 1024:.1f} MB)")
+    for column in ["método", "tempo médio (s)", "melhor (s)", "RSS do DataFrame (MB)"]:
+        table.add_column(column)
+
+    for method in METHODS:
+        results = []
+        for _ in range(args.repeat):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.columnar_load", "--csv", csv_path, "--run", method],
+                capture_output=True, text=True, check=True
+            )
+            results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+        seconds = [result["seconds"] for result in results]
+        table.add_row(
+            method,
+            f"{sum(seconds) / len(seconds):.3f}",
+            f"{min(seconds):.3f}",
+            f"{max(result['rss_mb'] for result in results):.1f}",
+        )
+
+    print(table)
+    print(
+        f"Conversão para Arrow IPC: {conversion:.2f}s "
+        f"({os.path.getsize(columnar_path(csv_path)) / 1024 / 1024:.1f} MB em disco)"
+    )
+
+
+if __name__ == "__main__":
+    main()
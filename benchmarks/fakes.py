@@ -0,0 +1,167 @@
+"""
+Provedores falsos (chat e embeddings) para benchmarks e testes locais, sem gastar cota de API.
+
+São determinísticos e têm latência configurável. Para usá-los em um processo inteiro,
+defina `PROVIDERS_MODULE=benchmarks.fakes` (veja `providers.py`).
+
+Variáveis de ambiente:
+- FAKE_LLM_LATENCY_MS: latência de cada chamada ao modelo (padrão 200).
+- FAKE_LLM_SCRIPT_<ROLE>: ferramentas que o modelo do papel chama, em ordem, a cada pergunta
+  (ex.: FAKE_LLM_SCRIPT_AGENT=graph_tool, FAKE_LLM_SCRIPT_MATH=add_subtool,multiply_subtool).
+  Ferramentas unidas por "+" são chamadas juntas, na mesma resposta (ex.: rag_tool+graph_tool).
+- FAKE_EMBEDDINGS_LATENCY_MS: latência de cada chamada de embeddings (padrão 0).
+"""
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from utils import get_env_var
+from typing import Any
+import asyncio
+import time
+
+
+# Ferramentas de resposta estruturada do agente (ToolStrategy do create_agent).
+STRUCTURED_RESPONSE_TOOL = "ResponseSchema"
+
+# Código devolvido às ferramentas que pedem código pandas ao modelo.
+FAKE_PANDAS_CODE = "df.select_dtypes('number').iloc[:, 0].plot()"
+
+# Argumentos usados nas chamadas às ferramentas matemáticas do servidor MCP.
+MATH_ARGUMENTS = {"a": 6.0, "b": 3.0}
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Modelo de chat falso que segue um roteiro de chamadas de ferramentas.
+
+    A cada pergunta do usuário, o modelo percorre em ordem os passos do `script`, chamando
+    as ferramentas disponíveis de cada passo (várias na mesma resposta quando unidas por
+    "+") e, ao final, responde: pela ferramenta `ResponseSchema` quando o agente pede
+    resposta estruturada, ou em texto.
+    """
+
+    role: str = "default"
+    latency_ms: float = 200.0
+    script: list[str] = []
+    tool_names: list[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def bind_tools(self, tools: list, **kwargs: Any) -> "ScriptedChatModel":
+        names = [convert_to_openai_tool(tool)["function"]["name"] for tool in tools]
+        return self.model_copy(update={"tool_names": names})
+
+    def with_structured_output(self, schema, **kwargs):
+        raise NotImplementedError("Use o ScriptedChatModel com resposta estruturada via ferramentas.")
+
+    def _reply(self, messages: list[BaseMessage]) -> AIMessage:
+        question = ""
+        step = 0
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                question = message.text
+                break
+            if isinstance(message, AIMessage) and message.tool_calls:
+                step += 1
+
+        steps = [[name for name in entry.split("+") if name in self.tool_names] for entry in self.script]
+        pending = [names for names in steps if names]
+        usage = {"input_tokens": sum(len(m.text) for m in messages) // 4, "output_tokens": 20, "total_tokens": 0}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+
+        if step < len(pending):
+            tool_calls = [
+                {
+                    "name": name,
+                    "args": MATH_ARGUMENTS if name.endswith("_subtool") else {"question": question},
+                    "id": f"call_{step}_{position}_{name}"
+                }
+                for position, name in enumerate(pending[step])
+            ]
+            return AIMessage(content="", tool_calls=tool_calls, usage_metadata=usage)
+
+        if self.role in {"data_code"}:
+            return AIMessage(content=f"```python\n{FAKE_PANDAS_CODE}\n```", usage_metadata=usage)
+
+        answer = f"Resposta simulada ({self.role}) para: {question[:80]}"
+        if STRUCTURED_RESPONSE_TOOL in self.tool_names:
+            return AIMessage(
+                content="",
+                tool_calls=[{"name": STRUCTURED_RESPONSE_TOOL, "args": {"answer": answer}, "id": f"call_{step}_answer"}],
+                usage_metadata=usage
+            )
+
+        return AIMessage(content=answer, usage_metadata=usage)
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        time.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+
+class SlowFakeEmbeddings(Embeddings):
+    """
+    Embeddings determinísticos (hash do texto) com latência configurável por chamada.
+    """
+
+    def __init__(self, size: int = 768, latency_ms: float = 0.0) -> None:
+        self.__embeddings = DeterministicFakeEmbedding(size=size)
+        self.__latency = latency_ms / 1000
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        time.sleep(self.__latency)
+        return self.__embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        time.sleep(self.__latency)
+        return self.__embeddings.embed_query(text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        await asyncio.sleep(self.__latency)
+        return self.__embeddings.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        await asyncio.sleep(self.__latency)
+        return self.__embeddings.embed_query(text)
+
+
+def create_chat_model(model: str, role: str, **kwargs: Any) -> BaseChatModel:
+    """
+    Fábrica usada por `providers.chat_model` quando `PROVIDERS_MODULE=benchmarks.fakes`.
+    """
+
+    script = get_env_var(f"FAKE_LLM_SCRIPT_{role.upper()}", "")
+    return ScriptedChatModel(
+        role=role,
+        latency_ms=float(get_env_var("FAKE_LLM_LATENCY_MS", "200")),
+        script=[entry.strip() for entry in script.split(",") if entry.strip()]
+    )
+
+
+def create_embeddings(model: str, role: str, **kwargs: Any) -> Embeddings:
+    """
+    Fábrica usada por `providers.embeddings` quando `PROVIDERS_MODULE=benchmarks.fakes`.
+    """
+
+    return SlowFakeEmbeddings(latency_ms=float(get_env_var("FAKE_EMBEDDINGS_LATENCY_MS", "0")))
@@ -0,0 +1,126 @@
+"""
+Orçamento de tempo de import (cold start) dos pontos de entrada da API e do chat.
+
+Cada medição roda em um interpretador novo com `-X importtime`, como um worker do uvicorn
+recém-criado. A verificação principal é que as dependências pesadas (pandas, pyarrow, faiss,
+chromadb, pinecone, cliente MCP, SDK do Gemini...) não sejam carregadas só por importar o
+módulo: elas devem entrar no primeiro uso da ferramenta.
+
+O tempo é comparado com o de uma referência medida nas mesmas condições (`--reference`,
+padrão `langchain.agents`, que os pontos de entrada precisam de qualquer forma): o import
+não pode passar de `--max-ratio` vezes a referência. Assim o limite acompanha a velocidade
+da máquina. `--budget-ms` acrescenta um limite absoluto opcional.
+
+Sai com código 1 quando algum módulo pesado é importado ou um limite de tempo é excedido,
+para rodar no CI ou antes de um deploy.
+
+Uso:
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --module api.main --max-ratio 1.6 --runs 5 --top 15
+    python -m benchmarks.import_time --budget-ms 3000
+"""
+
+from statistics import median
+from rich import print
+from rich.table import Table
+import subprocess
+import argparse
+import sys
+
+
+# Módulos que não podem ser carregados ao importar a API.
+HEAVY_MODULES = [
+    "pandas",
+    "pyarrow",
+    "matplotlib",
+    "seaborn",
+    "faiss",
+    "chromadb",
+    "pinecone",
+    "langchain_mcp_adapters",
+    "mcp",
+    "langchain_google_genai",
+    "google.genai",
+    "langchain_experimental",
+    "psycopg",
+]
+
+PROBE = """
+import sys
+import {module}
+print(",".join(name for name in {heavy!r} if name in sys.modules))
+"""
+
+
+def measure(module: str) -> tuple[float, dict[str, float], list[str]]:
+    """
+    Importa o módulo em um subprocesso e retorna o tempo total (ms), o tempo cumulativo
+    de cada módulo (ms) e os módulos pesados que foram carregados.
+    """
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {module}:\n{result.stderr[-2000:]}")
+
+    cumulative: dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = line.split("|")
+        if total.strip().isdigit():
+            cumulative[name.strip()] = int(total) / 1000
+
+    loaded = [name for name in result.stdout.strip().split(",") if name]
+    return cumulative.get(module, 0.0), cumulative, loaded
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Orçamento de tempo de import dos pontos de entrada.")
+    parser.add_argument("--module", nargs="+", default=["api.main", "chat"])
+    parser.add_argument("--reference", default="langchain.agents", help="Import usado como referência de tempo.")
+    parser.add_argument("--max-ratio", type=float, default=1.6, help="Tempo máximo (mediana) em relação à referência.")
+    parser.add_argument("--budget-ms", type=float, default=0.0, help="Tempo máximo absoluto (mediana); 0 desativa.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Módulos mais lentos listados por ponto de entrada.")
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.module:
+        # Referência e módulo intercalados, para oscilações da máquina afetarem os dois.
+        runs, reference_runs = [], []
+        for _ in range(args.runs):
+            reference_runs.append(measure(args.reference)[0])
+            runs.append(measure(module))
+
+        total_ms = median(total for total, _, _ in runs)
+        reference_ms = median(reference_runs)
+        ratio = total_ms / reference_ms if reference_ms else float("inf")
+        _, cumulative, loaded = runs[-1]
+
+        table = Table(title=f"import {module}: {total_ms:.0f} ms, {ratio:.2f}x {args.reference} ({reference_ms:.0f} ms, limite {args.max_ratio:.2f}x)")
+        table.add_column("módulo")
+        table.add_column("cumulativo (ms)")
+        for name, elapsed in sorted(cumulative.items(), key=lambda item: item[1], reverse=True)[1:args.top + 1]:
+            table.add_row(name, f"{elapsed:.0f}")
+        print(table)
+
+        if ratio > args.max_ratio:
+            failed = True
+            print(f"[red]{module}: {ratio:.2f}x {args.reference} excede o limite de {args.max_ratio:.2f}x[/red]")
+        if args.budget_ms and total_ms > args.budget_ms:
+            failed = True
+            print(f"[red]{module}: {total_ms:.0f} ms excede o orçamento de {args.budget_ms:.0f} ms[/red]")
+        if loaded:
+            failed = True
+            print(f"[red]{module} importa módulos pesados no carregamento: {', '.join(loaded)}[/red]")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
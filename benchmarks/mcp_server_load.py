@@ -0,0 +1,119 @@
+"""
+Benchmark de carga do servidor MCP de matemática.
+
+Compara, sob vários clientes concorrentes, o custo de resolver uma conta de N etapas com
+as ferramentas escalares (N chamadas) versus uma única chamada vetorizada (batch_subtool
+ou evaluate_expression_subtool).
+
+Uso (com o servidor rodando via `docker compose --profile mcp up`):
+
+    python -m benchmarks.mcp_server_load --url http://localhost:8000/sse --clients 1 8 32 --steps 20
+"""
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from statistics import quantiles
+from rich import print
+from rich.table import Table
+import argparse
+import asyncio
+import time
+
+
+async def scalar_workload(session: ClientSession, steps: int) -> None:
+    """
+    Soma `steps` valores encadeando chamadas a add_subtool (uma ida e volta por etapa).
+    """
+
+    total = 0.0
+    for i in range(steps):
+        result = await session.call_tool("add_subtool", {"a": total, "b": float(i)})
+        total = float(result.content[0].text)
+
+
+async def batch_workload(session: ClientSession, steps: int) -> None:
+    """
+    Resolve a mesma conta em uma única chamada vetorizada.
+    """
+
+    await session.call_tool(
+        "evaluate_expression_subtool",
+        {"expression": "sum(x)", "variables": {"x": [float(i) for i in range(steps)]}}
+    )
+
+
+async def run_client(url: str, workload, steps: int, iterations: int, latencies: list[float], errors: list[str]) -> None:
+    """
+    Abre uma sessão SSE e executa o workload `iterations` vezes, registrando a latência de cada execução.
+    """
+
+    async with sse_client(url) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            for _ in range(iterations):
+                start = time.perf_counter()
+                try:
+                    await workload(session, steps)
+                    latencies.append(time.perf_counter() - start)
+                except Exception as e:
+                    errors.append(repr(e))
+
+
+async def run_scenario(url: str, workload, clients: int, steps: int, iterations: int) -> dict:
+    """
+    Executa `clients` clientes concorrentes e consolida throughput e percentis de latência.
+    """
+
+    latencies: list[float] = []
+    errors: list[str] = []
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        run_client(url, workload, steps, iterations, latencies, errors) for _ in range(clients)
+    ])
+    elapsed = time.perf_counter() - start
+
+    percentiles = quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "workload": workload.__name__,
+        "clients": clients,
+        "requests": len(latencies) + len(errors),
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentiles[49] * 1000 if percentiles else 0.0,
+        "p95_ms": percentiles[94] * 1000 if percentiles else 0.0,
+        "p99_ms": percentiles[98] * 1000 if percentiles else 0.0,
+        "errors": len(errors),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de carga do servidor MCP de matemática.")
+    parser.add_argument("--url", default="http://localhost:8000/sse")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--steps", type=int, default=20, help="Número de etapas da conta.")
+    parser.add_argument("--iterations", type=int, default=10, help="Execuções por cliente.")
+    args = parser.parse_args()
+
+    table = Table(title=f"Servidor MCP ({args.steps} etapas por conta)")
+    for column in ["workload", "clientes", "contas", "contas/s", "p50 (ms)", "p95 (ms)", "p99 (ms)", "erros"]:
+        table.add_column(column)
+
+    for clients in args.clients:
+        for workload in (scalar_workload, batch_workload):
+            result = await run_scenario(args.url, workload, clients, args.steps, args.iterations)
+            table.add_row(
+                result["workload"],
+                str(result["clients"]),
+                str(result["requests"]),
+                f"{result['throughput']:.1f}",
+                f"{result['p50_ms']:.1f}",
+                f"{result['p95_ms']:.1f}",
+                f"{result['p99_ms']:.1f}",
+                str(result["errors"]),
+            )
+
+    print(table)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
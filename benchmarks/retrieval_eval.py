@@ -0,0 +1,308 @@
+"""
+Avaliação offline da recuperação do RAG: qualidade versus latência por backend e configuração de fusão.
+
+Indexa os PDFs de `assets/` com o mesmo ETL do `RagSingletonTraining` e responde um conjunto de
+perguntas rotuladas (`benchmarks/data/retrieval_questions.json`, páginas relevantes por PDF) com:
+
+- Chroma em memória, FAISS flat (exato) e FAISS HNSW (aproximado);
+- BM25 sozinho;
+- fusão híbrida (EnsembleRetriever semântico + BM25) para cada combinação de peso e k.
+
+Por padrão os embeddings são locais e determinísticos (`rags.local_embeddings.HashingEmbeddings`),
+então o relatório é reprodutível e não gasta cota. Com `--embeddings-model` o mesmo relatório
+usa um modelo real via `providers.embeddings`.
+
+Métricas por configuração: recall@k (fração das páginas relevantes no top-k), hit@k (ao menos
+uma página relevante no top-k), MRR e latência por consulta (p50/p95) e tempo de indexação.
+
+Uso:
+
+    python -m benchmarks.retrieval_eval
+    python -m benchmarks.retrieval_eval --k 1 3 5 10 --weights 0.5 0.7 0.9 --fusion-k 3:5 5:5
+    python -m benchmarks.retrieval_eval --embeddings-model google_genai:gemini-embedding-001 --output report.json
+"""
+
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.retrievers import BM25Retriever
+from langchain_community.vectorstores import FAISS, Chroma
+from langchain_classic.retrievers import EnsembleRetriever
+from langchain_core.embeddings import Embeddings
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from rags.local_embeddings import HashingEmbeddings
+from rags.etls import etl_pdf_process
+from statistics import quantiles
+from pathlib import Path
+from rich import print
+from rich.table import Table
+import numpy as np
+import argparse
+import faiss
+import json
+import time
+import csv
+import uuid
+
+
+DEFAULT_QUESTIONS = Path(__file__).parent / "data" / "retrieval_questions.json"
+
+
+def normalize(vector: list[float]) -> list[float]:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return (array / norm if norm > 0 else array).tolist()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Guarda os vetores dos documentos para que todos os índices usem os mesmos vetores
+    (e um modelo remoto seja chamado uma vez só). As consultas não são cacheadas: o tempo
+    de embedding da pergunta faz parte da latência medida. Todos os vetores saem com norma 1,
+    então a distância de cada backend ordena como o cosseno.
+    """
+
+    def __init__(self, embeddings: Embeddings) -> None:
+        self.__embeddings = embeddings
+        self.__vectors: dict[str, list[float]] = {}
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        missing = [text for text in dict.fromkeys(texts) if text not in self.__vectors]
+        if missing:
+            vectors = self.__embeddings.embed_documents(missing)
+            self.__vectors.update(zip(missing, (normalize(vector) for vector in vectors)))
+
+        return [self.__vectors[text] for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return normalize(self.__embeddings.embed_query(text))
+
+
+def document_key(document: Document) -> tuple[str, int]:
+    """
+    Identifica o trecho pela página de origem: (nome do PDF, página a partir de 1).
+    """
+
+    return Path(str(document.metadata.get("source", ""))).name, int(document.metadata.get("page_number", 0))
+
+
+def load_questions(path: Path) -> list[dict]:
+    """
+    Lê as perguntas rotuladas e converte as páginas relevantes em chaves de `document_key`.
+    """
+
+    with open(path, encoding="utf-8") as file:
+        questions = json.load(file)
+
+    return [
+        {
+            "question": item["question"],
+            "relevant": {(entry["source"], int(entry["page"])) for entry in item["relevant"]},
+        }
+        for item in questions
+    ]
+
+
+def build_faiss(documents: list[Document], embeddings: Embeddings, index: faiss.Index) -> FAISS:
+    """
+    Cria o vector store FAISS sobre um índice específico (flat ou HNSW) com produto interno,
+    que é o cosseno para os vetores normalizados pelo `CachedEmbeddings`.
+    """
+
+    vector_store = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+        distance_strategy="MAX_INNER_PRODUCT",
+    )
+    vector_store.add_documents(documents)
+
+    return vector_store
+
+
+def timed(build) -> tuple[object, float]:
+    start = time.perf_counter()
+    result = build()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def build_systems(documents: list[Document], embeddings: Embeddings, args: argparse.Namespace) -> list[dict]:
+    """
+    Monta os recuperadores avaliados. Cada sistema tem nome, configuração, recuperador e
+    tempo de indexação (ms).
+    """
+
+    dimension = len(embeddings.embed_query("dimensão"))
+    top_k = max(args.k)
+
+    chroma, chroma_ms = timed(lambda: Chroma.from_documents(
+        documents, embeddings, collection_name=f"retrieval_eval_{uuid.uuid4().hex}"
+    ))
+    flat, flat_ms = timed(lambda: build_faiss(documents, embeddings, faiss.IndexFlatIP(dimension)))
+
+    def build_hnsw() -> FAISS:
+        index = faiss.IndexHNSWFlat(dimension, args.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = args.hnsw_ef_construction
+        index.hnsw.efSearch = args.hnsw_ef_search
+        return build_faiss(documents, embeddings, index)
+
+    hnsw, hnsw_ms = timed(build_hnsw)
+    _, bm25_ms = timed(lambda: BM25Retriever.from_documents(documents))
+
+    def bm25(k: int) -> BM25Retriever:
+        retriever = BM25Retriever.from_documents(documents)
+        retriever.k = k
+        return retriever
+
+    semantic = {"chroma": chroma, "faiss_flat": flat, "faiss_hnsw": hnsw}
+    build_times = {"chroma": chroma_ms, "faiss_flat": flat_ms, "faiss_hnsw": hnsw_ms}
+    systems = [
+        {"name": "chroma", "config": f"k={top_k}", "retriever": chroma.as_retriever(search_kwargs={"k": top_k}), "build_ms": chroma_ms},
+        {"name": "faiss_flat", "config": f"k={top_k}", "retriever": flat.as_retriever(search_kwargs={"k": top_k}), "build_ms": flat_ms},
+        {
+            "name": "faiss_hnsw",
+            "config": f"k={top_k} M={args.hnsw_m} ef={args.hnsw_ef_search}",
+            "retriever": hnsw.as_retriever(search_kwargs={"k": top_k}),
+            "build_ms": hnsw_ms,
+        },
+        {"name": "bm25", "config": f"k={top_k}", "retriever": bm25(top_k), "build_ms": bm25_ms},
+    ]
+
+    # Fusão híbrida como no rag_tool: semântico com k_s, BM25 com k_l, pesos [w, 1 - w] no RRF.
+    for fusion_k in args.fusion_k:
+        semantic_k, lexical_k = (int(value) for value in fusion_k.split(":"))
+        for weight in args.weights:
+            systems.append({
+                "name": f"hybrid_{args.hybrid_backend}",
+                "config": f"w={weight:.2f} k={semantic_k}:{lexical_k}",
+                "retriever": EnsembleRetriever(
+                    retrievers=[
+                        semantic[args.hybrid_backend].as_retriever(search_kwargs={"k": semantic_k}),
+                        bm25(lexical_k),
+                    ],
+                    weights=[weight, 1 - weight],
+                ),
+                "build_ms": build_times[args.hybrid_backend] + bm25_ms,
+            })
+
+    return systems
+
+
+def evaluate(retriever: BaseRetriever, questions: list[dict], ks: list[int], repeat: int) -> dict:
+    """
+    Executa todas as perguntas e calcula recall@k, hit@k, MRR e latência por consulta.
+    """
+
+    recalls = {k: 0.0 for k in ks}
+    hits = {k: 0.0 for k in ks}
+    reciprocal_ranks = 0.0
+    latencies: list[float] = []
+
+    for item in questions:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            documents = retriever.invoke(item["question"])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        # Chaves únicas na ordem do ranking (uma página pode ter vários trechos).
+        ranked = list(dict.fromkeys(document_key(document) for document in documents))
+        relevant = item["relevant"]
+
+        for k in ks:
+            found = relevant.intersection(ranked[:k])
+            recalls[k] += len(found) / len(relevant)
+            hits[k] += 1.0 if found else 0.0
+
+        for position, key in enumerate(ranked, start=1):
+            if key in relevant:
+                reciprocal_ranks += 1 / position
+                break
+
+    total = len(questions)
+    percentiles = quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        **{f"recall@{k}": recalls[k] / total for k in ks},
+        **{f"hit@{k}": hits[k] / total for k in ks},
+        "mrr": reciprocal_ranks / total,
+        "p50_ms": percentiles[49],
+        "p95_ms": percentiles[94],
+    }
+
+
+def write_output(path: str, rows: list[dict]) -> None:
+    """
+    Salva o relatório em JSON ou CSV, conforme a extensão do arquivo.
+    """
+
+    if path.endswith(".csv"):
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        return
+
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(rows, file, ensure_ascii=False, indent=2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Avaliação offline de qualidade e latência da recuperação.")
+    parser.add_argument("--questions", type=Path, default=DEFAULT_QUESTIONS)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--weights", type=float, nargs="+", default=[0.3, 0.5, 0.7, 0.9], help="Peso do recuperador semântico na fusão.")
+    parser.add_argument("--fusion-k", nargs="+", default=["3:5", "5:5"], help="Pares k_semântico:k_bm25 da fusão.")
+    parser.add_argument("--hybrid-backend", choices=["chroma", "faiss_flat", "faiss_hnsw"], default="chroma")
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--hnsw-ef-construction", type=int, default=64)
+    parser.add_argument("--hnsw-ef-search", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições de cada consulta para a latência.")
+    parser.add_argument("--embeddings-model", default=None, help="Modelo real (ex.: google_genai:gemini-embedding-001).")
+    parser.add_argument("--output", default=None, help="Arquivo .json ou .csv com o relatório.")
+    args = parser.parse_args()
+
+    if args.embeddings_model:
+        from providers import embeddings as create_embeddings
+
+        base_embeddings = create_embeddings(args.embeddings_model, role="eval")
+        embeddings_label = args.embeddings_model
+    else:
+        base_embeddings = HashingEmbeddings()
+        embeddings_label = "hashing local"
+
+    embeddings = CachedEmbeddings(base_embeddings)
+    questions = load_questions(args.questions)
+    documents = etl_pdf_process()
+
+    systems = build_systems(documents, embeddings, args)
+
+    rows: list[dict] = []
+    for system in systems:
+        metrics = evaluate(system["retriever"], questions, args.k, args.repeat)
+        rows.append({"backend": system["name"], "config": system["config"], **metrics, "build_ms": system["build_ms"]})
+
+    table = Table(title=f"Recuperação: {len(questions)} perguntas, {len(documents)} trechos, embeddings {embeddings_label}")
+    columns = ["backend", "config", *[f"recall@{k}" for k in args.k], f"hit@{max(args.k)}", "MRR", "p50 (ms)", "p95 (ms)", "indexação (ms)"]
+    for column in columns:
+        table.add_column(column)
+
+    for row in rows:
+        table.add_row(
+            row["backend"],
+            row["config"],
+            *[f"{row[f'recall@{k}']:.3f}" for k in args.k],
+            f"{row[f'hit@{max(args.k)}']:.3f}",
+            f"{row['mrr']:.3f}",
+            f"{row['p50_ms']:.2f}",
+            f"{row['p95_ms']:.2f}",
+            f"{row['build_ms']:.0f}",
+        )
+
+    print(table)
+
+    if args.output:
+        write_output(args.output, rows)
+        print(f"Relatório salvo em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Servidor MCP local com as mesmas ferramentas escalares do servidor de matemática, mas com
+latência fixa e sem dependências extras. Usado pelo benchmark de carga da API.
+
+Uso:
+
+    python -m benchmarks.stub_mcp_server --port 8765 --latency-ms 5
+"""
+
+from mcp.server.fastmcp import FastMCP
+import argparse
+import asyncio
+import uvicorn
+
+
+mcp = FastMCP("math")
+
+LATENCY_SECONDS = 0.0
+
+
+@mcp.tool()
+async def add_subtool(a: float, b: float) -> float:
+    """
+    Soma dois números.
+    """
+
+    await asyncio.sleep(LATENCY_SECONDS)
+    return a + b
+
+
+@mcp.tool()
+async def subtract_subtool(a: float, b: float) -> float:
+    """
+    Subtrai b de a.
+    """
+
+    await asyncio.sleep(LATENCY_SECONDS)
+    return a - b
+
+
+@mcp.tool()
+async def multiply_subtool(a: float, b: float) -> float:
+    """
+    Multiplica dois números.
+    """
+
+    await asyncio.sleep(LATENCY_SECONDS)
+    return a * b
+
+
+@mcp.tool()
+async def divide_subtool(a: float, b: float) -> float:
+    """
+    Divide a por b.
+    """
+
+    await asyncio.sleep(LATENCY_SECONDS)
+    if b == 0:
+        raise ValueError("Divisão por zero não é permitida.")
+    return a / b
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor MCP de matemática com latência fixa.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    LATENCY_SECONDS = args.latency_ms / 1000
+    uvicorn.run(mcp.sse_app(), host="127.0.0.1", port=args.port, log_level="warning")
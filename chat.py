@@ -2,6 +2,9 @@ from agent import Agent
 from rich import print
 from rich.markdown import Markdown
 from utils import db_checkpointer
+from tools.graph_tool import warmup_graph_tool
+from tools.mcp_session import MCPSessionManager
+from tools.sandbox import SandboxPool
 import asyncio
 
 
@@ -11,6 +14,18 @@ async def main():
     """
 
     async with db_checkpointer() as checkpointer:
+        try:
+            # Abre a sessão MCP e compila o subgrafo antes da primeira pergunta.
+            await warmup_graph_tool(checkpointer)
+        except Exception as e:
+            print(f"Não foi possível pré-carregar o servidor MCP: {e}")
+
+        try:
+            # Sobe os workers do sandbox com o dataset já carregado.
+            SandboxPool().start(["./assets/dados_entregas.csv"])
+        except Exception as e:
+            print(f"Não foi possível iniciar o sandbox: {e}")
+
         while True:
             question = input("\nPergunta: ").strip()
             if not question:
@@ -25,6 +40,9 @@ async def main():
             print(Markdown(response))
             print(Markdown("---"))
 
+        await MCPSessionManager().close()
+        SandboxPool().shutdown()
+
 
 if __name__ == "__main__":
     """
@@ -0,0 +1,380 @@
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.base.id import UUID
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from dataclasses import asdict, dataclass, fields
+from typing import Any
+from utils import get_env_var
+from structured_logging import log_event
+from observability import CHECKPOINT_BYTES, CHECKPOINT_BYTES_RECLAIMED, CHECKPOINT_RETENTION_DELETED
+import logging
+import asyncio
+import time
+import zlib
+
+
+# Prefixo das threads auxiliares criadas pelas ferramentas (ex.: graph_tool_{session_id}).
+SUBTHREAD_PREFIX = "graph_tool_"
+
+# Tipos do projeto gravados no estado do agente (o `structured_response` do `response_format`).
+# Registrados para o LangGraph desserializá-los sem aviso e também com LANGGRAPH_STRICT_MSGPACK=true.
+ALLOWED_MSGPACK_MODULES = [("dtos", "ResponseSchema")]
+
+# Diferença, em intervalos de 100ns, entre o início do calendário gregoriano (base dos UUIDs v6) e a época Unix.
+_GREGORIAN_OFFSET = 0x01B21DD213814000
+
+
+class CompressedSerializer(SerializerProtocol):
+    """
+    Serializer que comprime com zlib os valores gravados pelo checkpointer.
+
+    Segue a mesma convenção do `EncryptedSerializer` do LangGraph: o tipo gravado ganha o
+    sufixo `+zlib`, então checkpoints antigos (sem compressão) continuam legíveis. Valores
+    pequenos, ou que não diminuem com a compressão, são gravados como estão.
+    """
+
+    SUFFIX = "+zlib"
+
+    def __init__(self, serde: SerializerProtocol | None = None, level: int = 6, min_bytes: int = 512) -> None:
+        self.serde = serde or JsonPlusSerializer(allowed_msgpack_modules=ALLOWED_MSGPACK_MODULES)
+        self.level = level
+        self.min_bytes = min_bytes
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        typ, data = self.serde.dumps_typed(obj)
+        stored = data
+        if len(data) >= self.min_bytes:
+            compressed = zlib.compress(data, self.level)
+            if len(compressed) < len(data):
+                stored = compressed
+
+        # Também exportados no /metrics: stored/raw é a taxa de compressão.
+        self.raw_bytes += len(data)
+        self.stored_bytes += len(stored)
+        CHECKPOINT_BYTES.inc("raw", amount=len(data))
+        CHECKPOINT_BYTES.inc("stored", amount=len(stored))
+
+        if stored is data:
+            return typ, data
+        return f"{typ}{self.SUFFIX}", stored
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        typ, payload = data
+        if typ.endswith(self.SUFFIX):
+            return self.serde.loads_typed((typ[:-len(self.SUFFIX)], zlib.decompress(payload)))
+
+        return self.serde.loads_typed(data)
+
+
+@dataclass
+class RetentionStats:
+    """
+    Contadores de uma (ou várias) execuções da manutenção.
+    """
+
+    threads_expired: int = 0
+    checkpoints_deleted: int = 0
+    writes_deleted: int = 0
+    blobs_deleted: int = 0
+    bytes_reclaimed: int = 0
+
+    def add(self, other: "RetentionStats") -> None:
+        for field in fields(self):
+            setattr(self, field.name, getattr(self, field.name) + getattr(other, field.name))
+
+
+def checkpoint_id_at(timestamp: float) -> str:
+    """
+    Menor id de checkpoint (UUID v6) gerado no instante informado. Como os ids do LangGraph
+    são UUIDs v6, a ordem textual dos ids é a ordem cronológica dos checkpoints.
+    """
+
+    ticks = int(timestamp * 10_000_000) + _GREGORIAN_OFFSET
+    value = ((ticks >> 12) & 0xFFFFFFFFFFFF) << 80 | (ticks & 0x0FFF) << 64
+    return str(UUID(int=value, version=6))
+
+
+class _PostgresBackend:
+    """
+    Consultas de manutenção para o `AsyncPostgresSaver` (tabelas checkpoints, checkpoint_blobs e checkpoint_writes).
+    """
+
+    def __init__(self, saver) -> None:
+        self.saver = saver
+
+    async def _execute(self, statements: list[tuple[str, tuple]]) -> list[list[dict]]:
+        from langgraph.checkpoint.postgres import _ainternal
+        from psycopg.rows import dict_row
+
+        results = []
+        async with self.saver.lock, _ainternal.get_connection(self.saver.conn) as conn:
+            async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+                for sql, params in statements:
+                    await cur.execute(sql, params)
+                    results.append(await cur.fetchall() if cur.description else [])
+
+        return results
+
+    async def expired_threads(self, cutoff_id: str, limit: int) -> list[str]:
+        [rows] = await self._execute([(
+            "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING max(checkpoint_id) < %s LIMIT %s",
+            (cutoff_id, limit)
+        )])
+        return [row["thread_id"] for row in rows]
+
+    async def delete_threads(self, thread_ids: list[str]) -> RetentionStats:
+        checkpoints, blobs, writes = await self._execute([
+            ("DELETE FROM checkpoints WHERE thread_id = ANY(%s) "
+             "RETURNING pg_column_size(checkpoint) + pg_column_size(metadata) AS size", (thread_ids,)),
+            ("DELETE FROM checkpoint_blobs WHERE thread_id = ANY(%s) "
+             "RETURNING coalesce(octet_length(blob), 0) AS size", (thread_ids,)),
+            ("DELETE FROM checkpoint_writes WHERE thread_id = ANY(%s) "
+             "RETURNING octet_length(blob) AS size", (thread_ids,)),
+        ])
+        return RetentionStats(
+            threads_expired=len(thread_ids),
+            checkpoints_deleted=len(checkpoints),
+            blobs_deleted=len(blobs),
+            writes_deleted=len(writes),
+            bytes_reclaimed=sum(row["size"] for row in checkpoints + blobs + writes)
+        )
+
+    async def prune(self, keep_last: int, subthread_keep_last: int, limit: int) -> RetentionStats:
+        victims = """
+            SELECT thread_id, checkpoint_ns, checkpoint_id FROM (
+                SELECT thread_id, checkpoint_ns, checkpoint_id,
+                    row_number() OVER (PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC) AS position
+                FROM checkpoints
+            ) ranked
+            WHERE position > CASE WHEN thread_id LIKE %s THEN %s ELSE %s END
+            LIMIT %s
+        """
+        params = (f"{SUBTHREAD_PREFIX}%", subthread_keep_last, keep_last, limit)
+        writes, checkpoints, blobs = await self._execute([
+            ("CREATE TEMP TABLE retention_victims ON COMMIT DROP AS " + victims, params),
+            ("DELETE FROM checkpoint_writes w USING retention_victims v "
+             "WHERE w.thread_id = v.thread_id AND w.checkpoint_ns = v.checkpoint_ns AND w.checkpoint_id = v.checkpoint_id "
+             "RETURNING octet_length(w.blob) AS size", ()),
+            ("DELETE FROM checkpoints c USING retention_victims v "
+             "WHERE c.thread_id = v.thread_id AND c.checkpoint_ns = v.checkpoint_ns AND c.checkpoint_id = v.checkpoint_id "
+             "RETURNING c.thread_id, pg_column_size(c.checkpoint) + pg_column_size(c.metadata) AS size", ()),
+            # Blobs só são apagados quando nenhum checkpoint restante da thread aponta para a versão.
+            ("DELETE FROM checkpoint_blobs b "
+             "WHERE b.thread_id IN (SELECT DISTINCT thread_id FROM retention_victims) AND NOT EXISTS ("
+             "    SELECT 1 FROM checkpoints c WHERE c.thread_id = b.thread_id AND c.checkpoint_ns = b.checkpoint_ns"
+             "    AND c.checkpoint -> 'channel_versions' ->> b.channel = b.version"
+             ") RETURNING coalesce(octet_length(b.blob), 0) AS size", ()),
+        ])[1:]
+        return RetentionStats(
+            checkpoints_deleted=len(checkpoints),
+            writes_deleted=len(writes),
+            blobs_deleted=len(blobs),
+            bytes_reclaimed=sum(row["size"] for row in checkpoints + writes + blobs)
+        )
+
+
+class _SqliteBackend:
+    """
+    Consultas de manutenção para o `AsyncSqliteSaver` (tabelas checkpoints e writes; não há tabela de blobs).
+    """
+
+    def __init__(self, saver) -> None:
+        self.saver = saver
+
+    async def _execute(self, statements: list[tuple[str, tuple]]) -> list[list[tuple]]:
+        results = []
+        async with self.saver.lock:
+            try:
+                for sql, params in statements:
+                    async with self.saver.conn.execute(sql, params) as cursor:
+                        results.append(list(await cursor.fetchall()))
+                await self.saver.conn.commit()
+            except Exception:
+                await self.saver.conn.rollback()
+                raise
+
+        return results
+
+    async def expired_threads(self, cutoff_id: str, limit: int) -> list[str]:
+        [rows] = await self._execute([(
+            "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING max(checkpoint_id) < ? LIMIT ?",
+            (cutoff_id, limit)
+        )])
+        return [row[0] for row in rows]
+
+    async def delete_threads(self, thread_ids: list[str]) -> RetentionStats:
+        marks = ", ".join("?" * len(thread_ids))
+        checkpoints, writes = await self._execute([
+            (f"DELETE FROM checkpoints WHERE thread_id IN ({marks}) "
+             "RETURNING coalesce(length(checkpoint), 0) + coalesce(length(metadata), 0)", tuple(thread_ids)),
+            (f"DELETE FROM writes WHERE thread_id IN ({marks}) RETURNING coalesce(length(value), 0)", tuple(thread_ids)),
+        ])
+        return RetentionStats(
+            threads_expired=len(thread_ids),
+            checkpoints_deleted=len(checkpoints),
+            writes_deleted=len(writes),
+            bytes_reclaimed=sum(row[0] for row in checkpoints + writes)
+        )
+
+    async def prune(self, keep_last: int, subthread_keep_last: int, limit: int) -> RetentionStats:
+        victims = """
+            SELECT thread_id, checkpoint_ns, checkpoint_id FROM (
+                SELECT thread_id, checkpoint_ns, checkpoint_id,
+                    row_number() OVER (PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC) AS position
+                FROM checkpoints
+            )
+            WHERE position > CASE WHEN thread_id LIKE ? THEN ? ELSE ? END
+            LIMIT ?
+        """
+        params = (f"{SUBTHREAD_PREFIX}%", subthread_keep_last, keep_last, limit)
+        _, _, writes, checkpoints, _ = await self._execute([
+            ("CREATE TEMP TABLE IF NOT EXISTS retention_victims (thread_id TEXT, checkpoint_ns TEXT, checkpoint_id TEXT)", ()),
+            ("INSERT INTO retention_victims " + victims, params),
+            ("DELETE FROM writes WHERE (thread_id, checkpoint_ns, checkpoint_id) IN (SELECT * FROM retention_victims) "
+             "RETURNING coalesce(length(value), 0)", ()),
+            ("DELETE FROM checkpoints WHERE (thread_id, checkpoint_ns, checkpoint_id) IN (SELECT * FROM retention_victims) "
+             "RETURNING coalesce(length(checkpoint), 0) + coalesce(length(metadata), 0)", ()),
+            ("DELETE FROM retention_victims", ()),
+        ])
+        return RetentionStats(
+            checkpoints_deleted=len(checkpoints),
+            writes_deleted=len(writes),
+            bytes_reclaimed=sum(row[0] for row in checkpoints + writes)
+        )
+
+
+def _backend_for(checkpointer: BaseCheckpointSaver):
+    try:
+        from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+        if isinstance(checkpointer, AsyncPostgresSaver):
+            return _PostgresBackend(checkpointer)
+    except ImportError:
+        pass
+
+    try:
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+        if isinstance(checkpointer, AsyncSqliteSaver):
+            return _SqliteBackend(checkpointer)
+    except ImportError:
+        pass
+
+    return None
+
+
+class CheckpointRetention:
+    """
+    Manutenção periódica dos checkpoints gravados pelo agente e pelas ferramentas.
+
+    Em cada execução:
+    - apaga as threads sem atividade há mais de `ttl_hours`;
+    - mantém apenas os `keep_last` checkpoints mais recentes de cada thread
+      (`subthread_keep_last` para as threads auxiliares `graph_tool_*`), junto com os
+      writes e blobs que deixam de ser referenciados.
+
+    Tudo é feito em lotes de `batch_size` linhas, cada um na sua transação, para não
+    segurar o banco por muito tempo. Checkpointers em memória são ignorados.
+    """
+
+    def __init__(
+        self,
+        checkpointer: BaseCheckpointSaver,
+        keep_last: int | None = None,
+        subthread_keep_last: int | None = None,
+        ttl_hours: float | None = None,
+        batch_size: int | None = None,
+        interval_seconds: float | None = None
+    ) -> None:
+        self.__backend = _backend_for(checkpointer)
+        # `is None`: um 0 explícito é um valor válido e não volta para a variável de ambiente.
+        if keep_last is None:
+            keep_last = int(get_env_var("CHECKPOINT_KEEP_LAST", "20"))
+        if subthread_keep_last is None:
+            subthread_keep_last = int(get_env_var("CHECKPOINT_SUBTHREAD_KEEP_LAST", "1"))
+        if ttl_hours is None:
+            ttl_hours = float(get_env_var("CHECKPOINT_TTL_HOURS", "720"))
+        if batch_size is None:
+            batch_size = int(get_env_var("CHECKPOINT_MAINTENANCE_BATCH", "500"))
+        if interval_seconds is None:
+            interval_seconds = float(get_env_var("CHECKPOINT_MAINTENANCE_INTERVAL_SECONDS", "600"))
+
+        self.__keep_last = keep_last
+        self.__subthread_keep_last = subthread_keep_last
+        self.__ttl_seconds = ttl_hours * 3600
+        self.__batch_size = max(1, batch_size)
+        self.__interval_seconds = interval_seconds
+        self.__task: asyncio.Task | None = None
+        self.totals = RetentionStats()
+
+    @property
+    def enabled(self) -> bool:
+        return self.__backend is not None
+
+    async def run_once(self) -> RetentionStats:
+        """
+        Executa uma rodada completa de manutenção (TTL + keep-last-K) e retorna o que foi removido.
+        """
+
+        stats = RetentionStats()
+        if self.__backend is None:
+            return stats
+
+        cutoff_id = checkpoint_id_at(time.time() - self.__ttl_seconds)
+        while True:
+            thread_ids = await self.__backend.expired_threads(cutoff_id, self.__batch_size)
+            if thread_ids:
+                stats.add(await self.__backend.delete_threads(thread_ids))
+            if len(thread_ids) < self.__batch_size:
+                break
+            # Libera o event loop para as requisições entre um lote e outro.
+            await asyncio.sleep(0)
+
+        while True:
+            batch = await self.__backend.prune(self.__keep_last, self.__subthread_keep_last, self.__batch_size)
+            stats.add(batch)
+            if batch.checkpoints_deleted < self.__batch_size:
+                break
+            await asyncio.sleep(0)
+
+        self.totals.add(stats)
+        for field in fields(stats):
+            value = getattr(stats, field.name)
+            if field.name == "bytes_reclaimed":
+                CHECKPOINT_BYTES_RECLAIMED.inc(amount=value)
+            elif value:
+                CHECKPOINT_RETENTION_DELETED.inc(field.name, amount=value)
+        return stats
+
+    async def __loop(self) -> None:
+        while True:
+            try:
+                start = time.perf_counter()
+                stats = await self.run_once()
+                if stats.checkpoints_deleted:
+                    log_event(
+                        "checkpoint_maintenance",
+                        duration_ms=round((time.perf_counter() - start) * 1000),
+                        **asdict(stats)
+                    )
+            except Exception as e:
+                log_event("checkpoint_maintenance_error", level=logging.WARNING, reason=str(e))
+
+            await asyncio.sleep(self.__interval_seconds)
+
+    def start(self) -> None:
+        """
+        Inicia a manutenção periódica em segundo plano no event loop atual.
+        """
+
+        if self.__backend is not None and self.__task is None:
+            self.__task = asyncio.create_task(self.__loop())
+
+    async def stop(self) -> None:
+        if self.__task is not None:
+            self.__task.cancel()
+            try:
+                await self.__task
+            except asyncio.CancelledError:
+                pass
+            self.__task = None
@@ -3,6 +3,10 @@ from langgraph.pregel.main import BaseCheckpointSaver
 from typing import Literal
 
 
+# Dataset usado pelas ferramentas de dados quando a sessão não informa outro.
+DEFAULT_DATASET_ID = "dados_entregas"
+
+
 class MainContext(BaseModel):
     """
     Contexto que será passado para o agente, contendo informações relevantes
@@ -19,6 +23,11 @@ class MainContext(BaseModel):
         description="Sentimento detectado na pergunta do usuário, útil para personalizar respostas."
     )
 
+    dataset_id: str = Field(
+        DEFAULT_DATASET_ID,
+        description="Identificador, no catálogo de datasets, do dataset analisado pelas ferramentas de dados."
+    )
+
     checkpointer: BaseCheckpointSaver = Field(
         ...,
         description="Objeto de checkpoint para salvar o estado da conversa e das ferramentas."
@@ -37,6 +46,18 @@ class QuestionInputDTO(BaseModel):
     question: str = Field(..., description="A pergunta do usuário relacionada a informações gerais do DataFrame.")
 
 
+class RagQuestionInputDTO(QuestionInputDTO):
+    """
+    Esquema de entrada para a ferramenta de RAG, com filtros opcionais de metadados.
+    """
+
+    source: str | None = Field(None, description="Arquivo a consultar, pelo nome ou prefixo (ex.: 'Aula 3'), se o usuário restringir.")
+    page_number: int | None = Field(None, description="Página do arquivo, se o usuário restringir.")
+    categoria: str | None = Field(None, description="Categoria dos documentos, se o usuário restringir.")
+    id_produto: str | None = Field(None, description="Identificador do produto, se o usuário restringir.")
+    data_owner: str | None = Field(None, description="Área dona dos dados, se o usuário restringir.")
+
+
 class AttachmentInputDTO(BaseModel):
     """
     Esquema de entrada para a ferramenta de informações multimodais.
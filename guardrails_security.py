@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import re
 from dataclasses import dataclass, field
+from observability import traced
 
 
 @dataclass
@@ -54,6 +55,7 @@ class GuardrailsSecurity:
             re.compile(r"(?i)\.env"),
         ]
 
+    @traced("guardrails", name="guardrails.validate_input")
     def validate_input(self, text: str) -> str:
         """
         Valida texto de entrada do usuário.
@@ -76,6 +78,7 @@ class GuardrailsSecurity:
 
         return normalized
 
+    @traced("guardrails", name="guardrails.validate_output")
     def validate_output(self, text: str) -> str:
         """
         Valida texto de saída do modelo.
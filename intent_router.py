@@ -0,0 +1,259 @@
+from langchain_core.embeddings import Embeddings
+from rags.local_embeddings import HashingEmbeddings, normalize_text
+from observability import ROUTER_DECISIONS, ROUTER_LLM_CALLS_SAVED, ROUTER_SHADOW
+from structured_logging import log_event
+from providers import embeddings as embeddings_model
+from utils import get_env_var
+from dataclasses import dataclass
+import numpy as np
+import threading
+import re
+
+
+# Rótulo da rota que segue para o agente completo (o LLM escolhe as ferramentas).
+AGENT_ROUTE = "agent"
+
+# Chamadas ao modelo principal evitadas por uma pergunta roteada: só a que escolhe a ferramenta
+# (a resposta final continua sendo redigida pelo modelo a partir do resultado dela).
+LLM_CALLS_SAVED_PER_ROUTE = 1
+
+# Ferramentas que recebem apenas `question` e podem ser chamadas sem o agente.
+ROUTABLE_TOOLS = {
+    "graph_tool",
+    "graph_generator_tool",
+    "statistical_summary_tool",
+    "dataframe_informations_tool",
+    "dataframe_python_tool",
+    "rag_tool",
+}
+
+_NUMBER = r"\d+(?:[.,]\d+)?"
+_OPERATOR = r"(?:[-+*/x×÷^]|mais|menos|vezes|dividido por|multiplicado por|elevado a)"
+
+# Regras por palavra-chave, avaliadas sobre o texto normalizado (minúsculo e sem acentos).
+# A confiança de cada regra é comparada com ROUTER_RULE_THRESHOLD.
+KEYWORD_RULES: list[tuple[str, re.Pattern, float]] = [
+    (
+        "graph_tool",
+        re.compile(
+            rf"^(?:quanto (?:e|da|vale)|calcule|calcular|qual (?:e )?o resultado de|resolva)?\s*"
+            rf"\(?\s*{_NUMBER}\s*\)?(?:\s*{_OPERATOR}\s*\(?\s*{_NUMBER}\s*\)?)+\s*[?=.]*$"
+        ),
+        0.99,
+    ),
+    ("graph_generator_tool", re.compile(r"\b(?:plot\w*|grafico\w*|histograma\w*|boxplot\w*)\b"), 0.95),
+    ("statistical_summary_tool", re.compile(r"\b(?:resumo estatistico|estatisticas? descritivas?|describe\(\))"), 0.9),
+    (
+        "dataframe_informations_tool",
+        re.compile(r"\b(?:quantas (?:linhas|colunas)|tipos? (?:de dados )?das colunas|(?:valores|dados) (?:nulos|duplicados))\b"),
+        0.9,
+    ),
+]
+
+# Exemplos de cada rota; o centróide dos embeddings de cada grupo é calculado uma vez por processo.
+ROUTE_EXAMPLES: dict[str, list[str]] = {
+    "graph_tool": [
+        "quanto é 15 vezes 3",
+        "some 10 e 20",
+        "qual o resultado de 144 dividido por 12",
+        "multiplique 7 por 8 e depois subtraia 5",
+        "calcule a soma de 3, 5 e 9",
+    ],
+    "graph_generator_tool": [
+        "crie um gráfico da média de tempo de entrega por clima",
+        "plote a distribuição do tempo de entrega",
+        "mostre a distribuição das avaliações dos agentes",
+        "faça um gráfico de barras por categoria",
+        "visualize a relação entre distância e tempo de entrega",
+    ],
+    "statistical_summary_tool": [
+        "faça um resumo estatístico dos dados",
+        "quais são as estatísticas descritivas das colunas numéricas",
+        "mostre média, mediana e desvio padrão das colunas",
+        "descreva estatisticamente o dataset",
+    ],
+    "dataframe_informations_tool": [
+        "quantas linhas e colunas tem o dataset",
+        "quais são as colunas e seus tipos",
+        "existem valores nulos ou duplicados",
+        "me dê um panorama geral do arquivo",
+    ],
+    "dataframe_python_tool": [
+        "qual é a média da coluna tempo de entrega",
+        "quais são os valores únicos da coluna clima",
+        "qual a correlação entre distância e tempo de entrega",
+        "quantas entregas foram feitas com chuva",
+    ],
+    "rag_tool": [
+        "o que é um banco de dados vetorial",
+        "como funciona a busca híbrida no rag",
+        "explique embeddings",
+        "como avaliar um rag com ragas e langsmith",
+        "quais são as técnicas avançadas de rag",
+        "o que são cadeias de conversação no langchain",
+    ],
+    AGENT_ROUTE: [
+        "olá, tudo bem?",
+        "obrigado pela ajuda",
+        "o que você consegue fazer",
+        "compare o resumo estatístico com um gráfico das entregas",
+        "analise a imagem anexa",
+        "e sobre o que conversamos antes?",
+    ],
+}
+
+
+@dataclass
+class RouteDecision:
+    """
+    Resultado da classificação de uma pergunta.
+
+    `route` é o melhor palpite (uma ferramenta ou `agent`) e `direct` indica se a confiança
+    passou do limite, ou seja, se a pergunta pode ir direto para a ferramenta.
+    """
+
+    route: str
+    confidence: float
+    method: str
+    direct: bool = False
+
+
+class IntentRouter:
+    """
+    Singleton com o classificador local que roteia perguntas óbvias direto para uma ferramenta,
+    sem a chamada ao LLM que só escolheria a ferramenta.
+
+    A classificação usa primeiro as regras por palavra-chave e, se nenhuma decidir, o centróide
+    mais próximo dos exemplos de cada rota. Na dúvida (regras conflitantes, similaridade baixa
+    ou pouca margem para a segunda rota) a pergunta segue para o agente completo.
+
+    Variáveis de ambiente:
+    - ROUTER_MODE: "shadow" (padrão; só registra o palpite ao lado do agente), "on" (roteia) ou "off".
+      Fica em "shadow" até a acurácia medida pelo `record_agent_choice` justificar ligar.
+    - ROUTER_RULE_THRESHOLD: confiança mínima de uma regra (padrão 0.9).
+    - ROUTER_CENTROID_THRESHOLD: similaridade mínima com o centróide (padrão 0.45, calibrado para os embeddings locais).
+    - ROUTER_CENTROID_MARGIN: diferença mínima para o segundo centróide (padrão 0.15).
+    - ROUTER_EMBEDDINGS_MODEL: "local" (feature hashing, sem rede) ou um modelo dos providers.
+    """
+
+    __instance: "IntentRouter" = None
+
+    def __new__(cls):
+        if cls.__instance is None:
+            cls.__instance = super(IntentRouter, cls).__new__(cls)
+            cls.__instance.__setup()
+
+        return cls.__instance
+
+    def __setup(self) -> None:
+        self.mode = get_env_var("ROUTER_MODE", "shadow")
+        self.rule_threshold = float(get_env_var("ROUTER_RULE_THRESHOLD", "0.9"))
+        self.centroid_threshold = float(get_env_var("ROUTER_CENTROID_THRESHOLD", "0.45"))
+        self.centroid_margin = float(get_env_var("ROUTER_CENTROID_MARGIN", "0.15"))
+        self.__embeddings_model = get_env_var("ROUTER_EMBEDDINGS_MODEL", "local")
+        self.__embeddings: Embeddings | None = None
+        self.__routes: list[str] = []
+        self.__centroids: np.ndarray | None = None
+        self.__lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in {"on", "shadow"}
+
+    def __load_centroids(self) -> None:
+        with self.__lock:
+            if self.__centroids is not None:
+                return
+
+            if self.__embeddings_model == "local":
+                self.__embeddings = HashingEmbeddings()
+            else:
+                self.__embeddings = embeddings_model(self.__embeddings_model, role="router")
+
+            centroids = []
+            for route, examples in ROUTE_EXAMPLES.items():
+                vectors = np.asarray(self.__embeddings.embed_documents(examples), dtype=np.float32)
+                vectors /= np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-12)
+                centroid = vectors.mean(axis=0)
+                centroids.append(centroid / max(np.linalg.norm(centroid), 1e-12))
+                self.__routes.append(route)
+
+            self.__centroids = np.vstack(centroids)
+
+    def __by_rules(self, text: str) -> RouteDecision | None:
+        matches = {tool: confidence for tool, pattern, confidence in KEYWORD_RULES if pattern.search(text)}
+        if len(matches) != 1:
+            # Nenhuma regra ou pedido composto (ex.: gráfico + resumo): o agente decide.
+            return None
+
+        tool, confidence = next(iter(matches.items()))
+        return RouteDecision(route=tool, confidence=confidence, method="rule", direct=confidence >= self.rule_threshold)
+
+    def __by_centroid(self, question: str) -> RouteDecision:
+        self.__load_centroids()
+
+        query = np.asarray(self.__embeddings.embed_query(question), dtype=np.float32)
+        query /= max(np.linalg.norm(query), 1e-12)
+        scores = self.__centroids @ query
+        best, second = np.argsort(-scores)[:2]
+
+        route = self.__routes[best]
+        confidence = float(scores[best])
+        direct = (
+            route in ROUTABLE_TOOLS
+            and confidence >= self.centroid_threshold
+            and confidence - float(scores[second]) >= self.centroid_margin
+        )
+        return RouteDecision(route=route, confidence=confidence, method="centroid", direct=direct)
+
+    def classify(self, question: str) -> RouteDecision:
+        """
+        Classifica a pergunta sem chamar o LLM.
+
+        Args:
+            question: Pergunta do usuário.
+
+        Returns:
+            Rota escolhida, confiança, método e se a pergunta pode ir direto para a ferramenta.
+        """
+
+        decision = self.__by_rules(normalize_text(question).strip()) or self.__by_centroid(question)
+        if self.mode != "on":
+            decision.direct = False
+
+        ROUTER_DECISIONS.inc(decision.route if decision.direct else AGENT_ROUTE, decision.method)
+        log_event(
+            "intent_routed",
+            route=decision.route,
+            method=decision.method,
+            confidence=round(decision.confidence, 3),
+            direct=decision.direct,
+            llm_calls_saved=LLM_CALLS_SAVED_PER_ROUTE if decision.direct else 0,
+        )
+        if decision.direct:
+            ROUTER_LLM_CALLS_SAVED.inc(amount=LLM_CALLS_SAVED_PER_ROUTE)
+
+        return decision
+
+    def record_agent_choice(self, decision: RouteDecision, tools_called: list[str]) -> None:
+        """
+        Compara o palpite do roteador com as ferramentas que o agente de fato chamou, para
+        medir a acurácia do roteamento nas perguntas que seguiram para o LLM.
+
+        Args:
+            decision: Palpite feito antes de chamar o agente.
+            tools_called: Ferramentas chamadas pelo agente no turno, em ordem.
+        """
+
+        actual = tools_called[0] if len(tools_called) == 1 else AGENT_ROUTE
+        match = decision.route == actual
+        ROUTER_SHADOW.inc(decision.route, actual, str(match).lower())
+        log_event(
+            "intent_router_shadow",
+            predicted=decision.route,
+            actual=actual,
+            tools_called=tools_called,
+            method=decision.method,
+            confidence=round(decision.confidence, 3),
+            match=match,
+        )
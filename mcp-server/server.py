@@ -1,8 +1,42 @@
 from mcp.server.fastmcp import FastMCP
+from typing import Literal
+import numpy as np
+import operator
 import uvicorn
+import ast
 
 mcp = FastMCP("math")
 
+# Limite de elementos por chamada em lote para evitar que uma única requisição monopolize o servidor.
+MAX_BATCH_SIZE = 100_000
+
+DIVISION_BY_ZERO_MESSAGE = "Divisão por zero não é permitida."
+
+# Operadores e funções aceitos pelo avaliador de expressões restritas.
+BINARY_OPERATORS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.divide,
+    ast.Pow: np.power,
+    ast.Mod: np.mod,
+}
+
+UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+FUNCTIONS = {
+    "abs": np.abs,
+    "sqrt": np.sqrt,
+    "round": np.round,
+    "sum": np.sum,
+    "mean": np.mean,
+    "min": np.min,
+    "max": np.max,
+}
+
 
 @mcp.tool()
 def multiply_subtool(a: float, b: float) -> float:
@@ -71,6 +105,144 @@ def divide_subtool(a: float, b: float) -> float:
     return a / b
 
 
+def _as_array(values: list[float] | float, name: str) -> np.ndarray:
+    """
+    Converte a entrada em um array float64 validando o tamanho máximo do lote.
+    """
+
+    array = np.asarray(values, dtype=np.float64)
+    if array.size > MAX_BATCH_SIZE:
+        raise ValueError(f"'{name}' excede o limite de {MAX_BATCH_SIZE} elementos.")
+
+    return array
+
+
+def _to_response(result: np.ndarray, undefined_message: str) -> dict:
+    """
+    Serializa o resultado vetorizado, trocando posições indefinidas (NaN/inf) por None
+    e registrando o motivo por índice.
+    """
+
+    result = np.atleast_1d(result)
+    invalid = ~np.isfinite(result)
+    values = result.tolist()
+    for index in np.flatnonzero(invalid):
+        values[index] = None
+
+    return {
+        "result": values,
+        "errors": {int(index): undefined_message for index in np.flatnonzero(invalid)},
+    }
+
+
+def _evaluate(node: ast.AST, variables: dict[str, np.ndarray]) -> np.ndarray | float:
+    """
+    Avalia recursivamente a AST permitindo apenas números, variáveis, operadores aritméticos
+    e um conjunto fechado de funções.
+    """
+
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body, variables)
+
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return float(node.value)
+
+    if isinstance(node, ast.Name):
+        if node.id not in variables:
+            raise ValueError(f"Variável desconhecida: '{node.id}'.")
+        return variables[node.id]
+
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+        return BINARY_OPERATORS[type(node.op)](_evaluate(node.left, variables), _evaluate(node.right, variables))
+
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+        return UNARY_OPERATORS[type(node.op)](_evaluate(node.operand, variables))
+
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id in FUNCTIONS
+        and not node.keywords
+        and len(node.args) == 1
+    ):
+        return FUNCTIONS[node.func.id](_evaluate(node.args[0], variables))
+
+    raise ValueError(f"Expressão não permitida: '{ast.dump(node)}'.")
+
+
+@mcp.tool()
+def batch_subtool(
+    operation: Literal["add", "subtract", "multiply", "divide"],
+    a: list[float],
+    b: list[float]
+) -> dict:
+    """
+    Aplica uma operação elemento a elemento sobre duas listas de números em uma única chamada.
+    Listas de tamanho 1 são expandidas (broadcasting) para o tamanho da outra lista.
+
+    Args:
+        operation: A operação a aplicar: 'add', 'subtract', 'multiply' ou 'divide'.
+        a: Lista com os primeiros operandos.
+        b: Lista com os segundos operandos.
+
+    Returns:
+        Dicionário com a lista 'result' e um dicionário 'errors' (índice -> mensagem) para as
+        posições sem resultado, como divisões por zero.
+    """
+
+    left = _as_array(a, "a")
+    right = _as_array(b, "b")
+
+    try:
+        left, right = np.broadcast_arrays(left, right)
+    except ValueError:
+        raise ValueError("As listas 'a' e 'b' devem ter o mesmo tamanho ou tamanho 1.")
+
+    if operation == "divide":
+        result = np.full(left.shape, np.nan)
+        np.divide(left, right, out=result, where=right != 0)
+        return _to_response(result, DIVISION_BY_ZERO_MESSAGE)
+
+    functions = {"add": np.add, "subtract": np.subtract, "multiply": np.multiply}
+    with np.errstate(all="ignore"):
+        result = functions[operation](left, right)
+
+    return _to_response(result, "Resultado fora do intervalo numérico.")
+
+
+@mcp.tool()
+def evaluate_expression_subtool(expression: str, variables: dict[str, list[float]] | None = None) -> dict:
+    """
+    Avalia uma expressão aritmética completa em uma única chamada, com suporte a listas de
+    números (avaliadas elemento a elemento). Aceita apenas números, variáveis informadas,
+    os operadores + - * / ** % e as funções abs, sqrt, round, sum, mean, min e max.
+
+    Exemplos:
+        - expression="(3 + 4) * 2 / 7"
+        - expression="preco * quantidade", variables={"preco": [10, 20], "quantidade": [3, 0]}
+        - expression="sum(x) / 2", variables={"x": [1, 2, 3]}
+
+    Args:
+        expression: A expressão aritmética a ser avaliada.
+        variables: Valores das variáveis usadas na expressão (número ou lista de números).
+
+    Returns:
+        Dicionário com a lista 'result' e um dicionário 'errors' (índice -> mensagem) para as
+        posições sem resultado, como divisões por zero.
+    """
+
+    if len(expression) > 1000:
+        raise ValueError("Expressão muito longa.")
+
+    arrays = {name: _as_array(values, name) for name, values in (variables or {}).items()}
+    tree = ast.parse(expression, mode="eval")
+
+    with np.errstate(all="ignore"):
+        result = np.asarray(_evaluate(tree, arrays), dtype=np.float64)
+
+    return _to_response(result, "Resultado indefinido (ex.: divisão por zero).")
+
+
 if __name__ == "__main__":
     # mcp.run(transport="stdio")
     uvicorn.run(mcp.sse_app(), host="0.0.0.0", port=8000)
@@ -0,0 +1,7 @@
+from .history_compaction import HistoryCompactionMiddleware
+from .tool_call_control import ToolCallControlMiddleware
+
+__all__ = [
+    "HistoryCompactionMiddleware",
+    "ToolCallControlMiddleware"
+]
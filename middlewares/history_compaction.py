@@ -0,0 +1,177 @@
+from typing import Annotated, Any, Awaitable, Callable
+from typing_extensions import NotRequired
+from langchain.agents.middleware import AgentMiddleware, AgentState, ModelRequest, ModelResponse
+from langchain.agents.middleware.types import PrivateStateAttr
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AnyMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.runtime import Runtime
+from dataclasses import dataclass
+from utils import get_env_var, get_prompt
+from providers import chat_model
+from structured_logging import log_event
+import logging
+import asyncio
+
+
+class HistoryCompactionState(AgentState):
+    """
+    Estado do agente acrescido do resumo das mensagens já compactadas.
+    """
+
+    history_summary: NotRequired[Annotated[str, PrivateStateAttr]]
+
+
+@dataclass
+class _PendingCompaction:
+    """
+    Resultado de uma compactação feita em segundo plano, aplicado no início do próximo turno.
+    """
+
+    summary: str
+    removed_ids: list[str]
+
+
+class HistoryCompactionMiddleware(AgentMiddleware):
+    """
+    Middleware que limita o tamanho do histórico de cada sessão.
+
+    Ao final de cada execução, se o histórico passar de `token_budget` tokens (estimados),
+    um resumo das mensagens antigas é gerado em segundo plano, sem atrasar a resposta. No
+    início do próximo turno as mensagens resumidas são removidas do estado (o que também
+    reduz o checkpoint) e o resumo passa a ser enviado ao modelo junto do prompt do sistema.
+    Os últimos `keep_turns` turnos (pergunta do usuário + respostas e ferramentas) são
+    sempre mantidos na íntegra.
+    """
+
+    state_schema = HistoryCompactionState
+
+    def __init__(
+        self,
+        model: str | BaseChatModel | None = None,
+        token_budget: int | None = None,
+        keep_turns: int | None = None,
+        summary_max_words: int = 300
+    ) -> None:
+        super().__init__()
+        self.__model = model or get_env_var("HISTORY_SUMMARY_MODEL", "google_genai:gemini-2.5-flash-lite")
+        self.__token_budget = token_budget or int(get_env_var("HISTORY_TOKEN_BUDGET", "6000"))
+        self.__keep_turns = keep_turns or int(get_env_var("HISTORY_KEEP_TURNS", "4"))
+        self.__summary_max_words = summary_max_words
+        self.__pending: dict[str, _PendingCompaction] = {}
+        self.__tasks: dict[str, asyncio.Task] = {}
+
+    def __llm(self) -> BaseChatModel:
+        if isinstance(self.__model, str):
+            self.__model = chat_model(self.__model, role="summary", temperature=0)
+
+        return self.__model
+
+    @staticmethod
+    def __session_id(runtime: Runtime) -> str | None:
+        return getattr(runtime.context, "session_id", None)
+
+    def before_agent(self, state: HistoryCompactionState, runtime: Runtime) -> dict[str, Any] | None:
+        """
+        Aplica a compactação pendente da sessão, se houver uma pronta.
+        """
+
+        session_id = self.__session_id(runtime)
+        pending = self.__pending.pop(session_id, None) if session_id else None
+        if pending is None:
+            return None
+
+        current_ids = {message.id for message in state["messages"]}
+        return {
+            "messages": [RemoveMessage(id=message_id) for message_id in pending.removed_ids if message_id in current_ids],
+            "history_summary": pending.summary
+        }
+
+    async def abefore_agent(self, state: HistoryCompactionState, runtime: Runtime) -> dict[str, Any] | None:
+        return self.before_agent(state, runtime)
+
+    def __with_summary(self, request: ModelRequest) -> ModelRequest:
+        summary = request.state.get("history_summary")
+        if not summary:
+            return request
+
+        system_prompt = f"{request.system_prompt or ''}\n\n## Resumo da conversa até aqui\n{summary}".strip()
+        return request.override(system_message=SystemMessage(content=system_prompt))
+
+    def wrap_model_call(self, request: ModelRequest, handler: Callable[[ModelRequest], ModelResponse]) -> ModelResponse:
+        return handler(self.__with_summary(request))
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]]
+    ) -> ModelResponse:
+        return await handler(self.__with_summary(request))
+
+    async def aafter_agent(self, state: HistoryCompactionState, runtime: Runtime) -> dict[str, Any] | None:
+        """
+        Agenda a compactação em segundo plano quando o histórico passa do orçamento de tokens.
+        """
+
+        session_id = self.__session_id(runtime)
+        if not session_id or session_id in self.__tasks or session_id in self.__pending:
+            return None
+
+        messages = state["messages"]
+        if count_tokens_approximately(messages) <= self.__token_budget:
+            return None
+
+        old_messages = self.__old_messages(messages)
+        if not old_messages:
+            return None
+
+        task = asyncio.create_task(self.__compact(session_id, old_messages, state.get("history_summary")))
+        self.__tasks[session_id] = task
+        task.add_done_callback(lambda _: self.__tasks.pop(session_id, None))
+        return None
+
+    def __old_messages(self, messages: list[AnyMessage]) -> list[AnyMessage]:
+        """
+        Mensagens anteriores aos últimos `keep_turns` turnos. O corte é sempre feito em uma
+        mensagem do usuário, para nunca separar uma chamada de ferramenta da sua resposta.
+        """
+
+        turn_starts = [index for index, message in enumerate(messages) if isinstance(message, HumanMessage)]
+        if len(turn_starts) <= self.__keep_turns:
+            return []
+
+        return messages[:turn_starts[-self.__keep_turns]]
+
+    @staticmethod
+    def __transcript(messages: list[AnyMessage], max_chars: int = 1500) -> str:
+        lines = []
+        for message in messages:
+            text = message.text if isinstance(message.text, str) else str(message.content)
+            if isinstance(message, ToolMessage):
+                role = f"ferramenta {message.name}"
+            elif isinstance(message, HumanMessage):
+                role = "usuário"
+            else:
+                role = "assistente"
+
+            if text:
+                lines.append(f"{role}: {text[:max_chars]}")
+
+        return "\n".join(lines)
+
+    async def __compact(self, session_id: str, old_messages: list[AnyMessage], summary: str | None) -> None:
+        try:
+            prompt = get_prompt("history_summary.prompt.md", context={
+                "summary": summary,
+                "transcript": self.__transcript(old_messages),
+                "max_words": self.__summary_max_words
+            })
+            response = await self.__llm().ainvoke([HumanMessage(content=prompt)])
+            self.__pending[session_id] = _PendingCompaction(
+                summary=response.text,
+                removed_ids=[message.id for message in old_messages if message.id]
+            )
+            log_event("history_compacted", session_id=session_id, messages=len(old_messages))
+        except Exception as e:
+            # A compactação é uma otimização: em caso de falha, tenta de novo no próximo turno.
+            log_event("history_compaction_error", level=logging.WARNING, session_id=session_id, reason=str(e))
@@ -0,0 +1,103 @@
+from typing import Awaitable, Callable
+from langchain.agents.middleware import AgentMiddleware, ToolCallRequest
+from langchain_core.messages import ToolMessage
+from langgraph.types import Command
+from utils import get_env_var
+from structured_logging import log_event
+import logging
+import asyncio
+
+
+class ToolCallControlMiddleware(AgentMiddleware):
+    """
+    Middleware que controla a execução das chamadas de ferramentas de um mesmo turno.
+
+    Quando o modelo devolve várias chamadas em uma única `AIMessage`, o nó de ferramentas do
+    agente já as executa em paralelo e devolve as `ToolMessage` na ordem das chamadas (ordem
+    determinística, independente de qual termina primeiro), então a latência do turno é a da
+    ferramenta mais lenta. Este middleware acrescenta:
+
+    - um limite de chamadas simultâneas por sessão (`max_parallel`), para um turno com muitas
+      chamadas não ocupar sozinho o pool das ferramentas;
+    - um tempo limite por ferramenta: a chamada que estoura vira uma `ToolMessage` de erro e
+      o modelo segue com os resultados das demais. Ferramentas assíncronas são canceladas; as
+      síncronas (threads do `tools/concurrency.py`) não podem ser interrompidas e continuam até
+      o fim ocupando a vaga da ferramenta (métricas `tool_abandoned_runs*` e evento
+      `tool_run_abandoned`).
+
+    Variáveis de ambiente:
+    - TOOL_CALLS_MAX_PARALLEL: chamadas simultâneas por sessão (padrão 4).
+    - TOOL_TIMEOUT_SECONDS: tempo limite padrão de cada ferramenta (padrão 60; 0 desliga).
+    - TOOL_TIMEOUT_SECONDS_<NOME>: tempo limite de uma ferramenta específica.
+    """
+
+    def __init__(self, max_parallel: int | None = None, timeout_seconds: float | None = None) -> None:
+        super().__init__()
+        self.__max_parallel = max_parallel or int(get_env_var("TOOL_CALLS_MAX_PARALLEL", "4"))
+        self.__timeout_seconds = timeout_seconds if timeout_seconds is not None else float(get_env_var("TOOL_TIMEOUT_SECONDS", "60"))
+        # Semáforo por (event loop, sessão), removido quando a sessão não tem chamadas em andamento.
+        self.__semaphores: dict[tuple[int, str], tuple[asyncio.Semaphore, int]] = {}
+
+    def __timeout(self, tool_name: str) -> float | None:
+        timeout = float(get_env_var(f"TOOL_TIMEOUT_SECONDS_{tool_name.upper()}", str(self.__timeout_seconds)))
+        return timeout if timeout > 0 else None
+
+    @staticmethod
+    def __session_id(request: ToolCallRequest) -> str:
+        config = getattr(request.runtime, "config", None) or {}
+        return str(config.get("configurable", {}).get("thread_id", "default"))
+
+    def __acquire_slot(self, key: tuple[int, str]) -> asyncio.Semaphore:
+        semaphore, users = self.__semaphores.get(key, (None, 0))
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.__max_parallel)
+
+        self.__semaphores[key] = (semaphore, users + 1)
+        return semaphore
+
+    def __release_slot(self, key: tuple[int, str]) -> None:
+        semaphore, users = self.__semaphores[key]
+        if users <= 1:
+            del self.__semaphores[key]
+        else:
+            self.__semaphores[key] = (semaphore, users - 1)
+
+    def wrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], ToolMessage | Command]
+    ) -> ToolMessage | Command:
+        # O agente só é executado de forma assíncrona; no modo síncrono as chamadas seguem sem controle.
+        return handler(request)
+
+    async def awrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], Awaitable[ToolMessage | Command]]
+    ) -> ToolMessage | Command:
+        tool_call = request.tool_call
+        timeout = self.__timeout(tool_call["name"])
+        key = (id(asyncio.get_running_loop()), self.__session_id(request))
+
+        semaphore = self.__acquire_slot(key)
+        try:
+            async with semaphore:
+                return await asyncio.wait_for(handler(request), timeout=timeout)
+        except asyncio.TimeoutError:
+            log_event(
+                "tool_timeout",
+                level=logging.WARNING,
+                tool=tool_call["name"],
+                tool_call_id=tool_call["id"],
+                timeout_seconds=timeout
+            )
+            return ToolMessage(
+                content=f"A ferramenta {tool_call['name']} não respondeu dentro do tempo limite de {timeout:g}s e o resultado "
+                        "foi descartado. Não a chame de novo neste turno; responda com os resultados das demais ferramentas "
+                        "ou informe que a informação não está disponível.",
+                tool_call_id=tool_call["id"],
+                name=tool_call["name"],
+                status="error"
+            )
+        finally:
+            self.__release_slot(key)
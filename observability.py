@@ -0,0 +1,480 @@
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from contextvars import ContextVar
+from typing import Any, Callable
+from utils import get_env_var
+from structured_logging import log_event
+from uuid import UUID
+import functools
+import threading
+import inspect
+import time
+
+
+# Buckets (em segundos) dos histogramas de latência.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+@functools.cache
+def is_enabled() -> bool:
+    """
+    Lido uma única vez (depois do .env carregado). Com `OBSERVABILITY_ENABLED=false`, spans e
+    callbacks viram no-op e nada é medido.
+    """
+
+    return get_env_var("OBSERVABILITY_ENABLED", "true").lower() in {"1", "true", "yes"}
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """
+    Contador monotônico com labels, no formato do Prometheus.
+    """
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.description = description
+        self.label_names = labels
+        self.__values: dict[tuple, float] = {}
+        self.__lock = threading.Lock()
+
+    def inc(self, *labels: Any, amount: float = 1.0) -> None:
+        with self.__lock:
+            self.__values[labels] = self.__values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self.__lock:
+            for labels, value in sorted(self.__values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Gauge:
+    """
+    Valor instantâneo com labels (sobe e desce), no formato do Prometheus.
+    """
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.description = description
+        self.label_names = labels
+        self.__values: dict[tuple, float] = {}
+        self.__lock = threading.Lock()
+
+    def inc(self, *labels: Any, amount: float = 1.0) -> None:
+        with self.__lock:
+            self.__values[labels] = self.__values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: Any, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} gauge"]
+        with self.__lock:
+            for labels, value in sorted(self.__values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    Histograma cumulativo com labels, no formato do Prometheus.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.label_names = labels
+        self.buckets = buckets
+        self.__series: dict[tuple, list] = {}
+        self.__lock = threading.Lock()
+
+    def observe(self, value: float, *labels: Any) -> None:
+        with self.__lock:
+            series = self.__series.get(labels)
+            if series is None:
+                # [contagem por bucket..., soma, total]
+                series = self.__series[labels] = [0] * len(self.buckets) + [0.0, 0]
+
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self.__lock:
+            for labels, series in sorted(self.__series.items()):
+                for bound, count in zip(self.buckets, series):
+                    bucket = _labels(self.label_names, labels, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{bucket} {count}")
+                bucket = _labels(self.label_names, labels, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{bucket} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {series[-2]}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {series[-1]}")
+        return lines
+
+
+SPAN_DURATION = Histogram(
+    "agent_span_duration_seconds",
+    "Duração dos spans do agente (modelo, ferramentas, recuperação, guardrails).",
+    ("kind", "name")
+)
+SPAN_ERRORS = Counter("agent_span_errors_total", "Spans finalizados com erro.", ("kind", "name"))
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens consumidos nas chamadas ao modelo.", ("model", "type"))
+HTTP_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Duração das requisições HTTP da API.",
+    ("method", "path", "status")
+)
+
+TOOL_QUEUE_WAIT = Histogram(
+    "tool_queue_wait_seconds",
+    "Tempo que cada chamada de ferramenta esperou pelo limite de concorrência.",
+    ("tool",)
+)
+TOOL_ABANDONED = Counter(
+    "tool_abandoned_runs_total",
+    "Execuções de ferramentas síncronas abandonadas (timeout) que continuaram rodando na thread.",
+    ("tool",)
+)
+TOOL_ABANDONED_RUNNING = Gauge(
+    "tool_abandoned_runs",
+    "Execuções abandonadas ainda em andamento, ocupando vagas do limite de concorrência da ferramenta.",
+    ("tool",)
+)
+
+ROUTER_DECISIONS = Counter(
+    "intent_router_decisions_total",
+    "Perguntas classificadas pelo roteador de intenções, por rota e método.",
+    ("route", "method")
+)
+ROUTER_LLM_CALLS_SAVED = Counter(
+    "intent_router_llm_calls_saved_total",
+    "Chamadas ao modelo principal evitadas pelo roteamento direto para uma ferramenta."
+)
+ROUTER_SHADOW = Counter(
+    "intent_router_shadow_total",
+    "Palpites do roteador comparados com a ferramenta escolhida pelo agente.",
+    ("predicted", "actual", "match")
+)
+RAG_CONTEXT_TOKENS = Counter(
+    "rag_context_tokens_total",
+    "Tokens (estimados) do contexto do RAG antes e depois do empacotamento.",
+    ("stage",)
+)
+
+CHECKPOINT_BYTES = Counter(
+    "checkpoint_serialized_bytes_total",
+    "Bytes dos valores gravados pelo checkpointer antes (raw) e depois (stored) da compressão.",
+    ("stage",)
+)
+CHECKPOINT_RETENTION_DELETED = Counter(
+    "checkpoint_retention_deleted_total",
+    "Itens removidos pela manutenção dos checkpoints (threads expiradas, checkpoints, writes e blobs).",
+    ("item",)
+)
+CHECKPOINT_BYTES_RECLAIMED = Counter(
+    "checkpoint_retention_reclaimed_bytes_total",
+    "Bytes liberados pela manutenção dos checkpoints."
+)
+
+METRICS: list[Counter | Gauge | Histogram] = [
+    SPAN_DURATION, SPAN_ERRORS, LLM_TOKENS, HTTP_DURATION, TOOL_QUEUE_WAIT, TOOL_ABANDONED, TOOL_ABANDONED_RUNNING,
+    ROUTER_DECISIONS, ROUTER_LLM_CALLS_SAVED, ROUTER_SHADOW, RAG_CONTEXT_TOKENS,
+    CHECKPOINT_BYTES, CHECKPOINT_RETENTION_DELETED, CHECKPOINT_BYTES_RECLAIMED
+]
+
+
+def render_metrics() -> str:
+    """
+    Todas as métricas no formato texto do Prometheus (endpoint /metrics).
+    """
+
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+_current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    Trecho cronometrado de uma execução. Spans abertos dentro de outro viram filhos dele,
+    formando a árvore da resposta (agente > modelo/ferramentas > recuperação).
+
+    Pode ser usado como context manager (sync ou async) ou aberto e fechado manualmente
+    com `begin()`/`finish()`, como faz o callback do LangChain.
+    """
+
+    __slots__ = ("name", "kind", "attributes", "parent", "children", "start", "duration", "error", "_token")
+
+    def __init__(self, name: str, kind: str, parent: "Span | None", attributes: dict) -> None:
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.parent = parent
+        self.children: list[Span] = []
+        self.start = 0.0
+        self.duration = 0.0
+        self.error: str | None = None
+        self._token = None
+        if parent is not None:
+            parent.children.append(self)
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def begin(self) -> "Span":
+        self.start = time.perf_counter()
+        return self
+
+    def finish(self, error: BaseException | str | None = None) -> None:
+        self.duration = time.perf_counter() - self.start
+        SPAN_DURATION.observe(self.duration, self.kind, self.name)
+        if error is not None:
+            self.error = str(error) or type(error).__name__
+            SPAN_ERRORS.inc(self.kind, self.name)
+
+        if self.parent is None:
+            _report_trace(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self.begin()
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        _current_span.reset(self._token)
+        self.finish(exc)
+
+    async def __aenter__(self) -> "Span":
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, traceback) -> None:
+        self.__exit__(exc_type, exc, traceback)
+
+    def tree(self, depth: int = 0) -> list[str]:
+        attributes = " ".join(f"{key}={value}" for key, value in self.attributes.items())
+        status = f" ERRO: {self.error}" if self.error else ""
+        lines = [f"{'  ' * depth}{self.kind}:{self.name} {self.duration * 1000:.1f}ms {attributes}{status}".rstrip()]
+        for child in self.children:
+            lines.extend(child.tree(depth + 1))
+        return lines
+
+
+class _NoopSpan:
+    """
+    Span usado quando a observabilidade está desligada: não mede nem registra nada.
+    """
+
+    __slots__ = ()
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def begin(self) -> "_NoopSpan":
+        return self
+
+    def finish(self, error: BaseException | str | None = None) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        pass
+
+    async def __aenter__(self) -> "_NoopSpan":
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, kind: str = "internal", parent: Span | None = None, **attributes: Any) -> Span | _NoopSpan:
+    """
+    Cria um span filho do span atual (ou de `parent`).
+
+    Exemplo:
+        with span("bm25.build", kind="retrieval", documents=len(documents)):
+            ...
+    """
+
+    if not is_enabled():
+        return NOOP_SPAN
+
+    return Span(name, kind, parent or _current_span.get(), attributes)
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+def traced(kind: str, name: str | None = None) -> Callable:
+    """
+    Decorator que envolve a função (sync ou async) em um span.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, kind):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, kind):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _report_trace(root: Span) -> None:
+    """
+    Mostra a árvore de spans das execuções mais lentas que `TRACE_LOG_THRESHOLD_MS` (desligado se negativo).
+    """
+
+    threshold_ms = float(get_env_var("TRACE_LOG_THRESHOLD_MS", "-1"))
+    if threshold_ms >= 0 and root.duration * 1000 >= threshold_ms:
+        log_event("slow_trace", duration_ms=round(root.duration * 1000, 1), trace=root.tree())
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    Callback do LangChain que transforma chamadas ao modelo, ferramentas e retrievers em spans.
+
+    Os eventos de chains não geram spans, mas são usados para descobrir o span pai de cada
+    chamada (o `parent_run_id` de uma chamada ao modelo normalmente é o nó do grafo).
+    """
+
+    run_inline = True
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.__spans: dict[UUID, Span] = {}
+        self.__ancestors: dict[UUID, Span | None] = {}
+
+    def __parent(self, parent_run_id: UUID | None) -> Span | None:
+        if parent_run_id in self.__spans:
+            return self.__spans[parent_run_id]
+        if parent_run_id in self.__ancestors:
+            return self.__ancestors[parent_run_id]
+        return _current_span.get()
+
+    def __start(self, run_id: UUID, parent_run_id: UUID | None, name: str, kind: str, **attributes: Any) -> Span:
+        started = Span(name, kind, self.__parent(parent_run_id), attributes).begin()
+        self.__spans[run_id] = started
+        return started
+
+    def __finish(self, run_id: UUID, error: BaseException | None = None) -> Span | None:
+        finished = self.__spans.pop(run_id, None)
+        if finished is not None:
+            finished.finish(error)
+        return finished
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id: UUID | None = None, **kwargs) -> None:
+        self.__ancestors[run_id] = self.__parent(parent_run_id)
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs) -> None:
+        self.__ancestors.pop(run_id, None)
+
+    def on_chain_error(self, error, *, run_id: UUID, **kwargs) -> None:
+        self.__ancestors.pop(run_id, None)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, parent_run_id: UUID | None = None, metadata=None, **kwargs) -> None:
+        model = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name") or "llm"
+        self.__start(run_id, parent_run_id, model, "llm")
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, parent_run_id: UUID | None = None, metadata=None, **kwargs) -> None:
+        model = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name") or "llm"
+        self.__start(run_id, parent_run_id, model, "llm")
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs) -> None:
+        finished = self.__spans.get(run_id)
+        if finished is not None:
+            input_tokens = output_tokens = 0
+            for generations in response.generations:
+                for generation in generations:
+                    usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    input_tokens += usage.get("input_tokens", 0)
+                    output_tokens += usage.get("output_tokens", 0)
+
+            finished.set(input_tokens=input_tokens, output_tokens=output_tokens)
+            LLM_TOKENS.inc(finished.name, "input", amount=input_tokens)
+            LLM_TOKENS.inc(finished.name, "output", amount=output_tokens)
+
+        self.__finish(run_id)
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs) -> None:
+        self.__finish(run_id, error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, parent_run_id: UUID | None = None, **kwargs) -> None:
+        started = self.__start(run_id, parent_run_id, (serialized or {}).get("name") or kwargs.get("name") or "tool", "tool")
+        # Spans abertos dentro da ferramenta (ex.: etapas da recuperação) ficam abaixo dela.
+        started._token = _current_span.set(started)
+
+    def __finish_tool(self, run_id: UUID, error: BaseException | None = None) -> None:
+        finished = self.__finish(run_id, error)
+        if finished is not None and finished._token is not None:
+            try:
+                _current_span.reset(finished._token)
+            except ValueError:
+                # Fim da ferramenta reportado em outro contexto (ex.: outra thread).
+                pass
+
+    def on_tool_end(self, output, *, run_id: UUID, **kwargs) -> None:
+        self.__finish_tool(run_id)
+
+    def on_tool_error(self, error, *, run_id: UUID, **kwargs) -> None:
+        self.__finish_tool(run_id, error)
+
+    def on_retriever_start(self, serialized, query, *, run_id: UUID, parent_run_id: UUID | None = None, **kwargs) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name") or "retriever"
+        self.__start(run_id, parent_run_id, name, "retrieval")
+
+    def on_retriever_end(self, documents, *, run_id: UUID, **kwargs) -> None:
+        finished = self.__spans.get(run_id)
+        if finished is not None:
+            finished.set(documents=len(documents))
+        self.__finish(run_id)
+
+    def on_retriever_error(self, error, *, run_id: UUID, **kwargs) -> None:
+        self.__finish(run_id, error)
+
+
+def tracing_callbacks() -> list[BaseCallbackHandler]:
+    """
+    Callbacks a passar no `config` das execuções do LangChain (vazio no modo no-op).
+    """
+
+    return [TracingCallbackHandler()] if is_enabled() else []
@@ -0,0 +1,81 @@
+from langchain_core.language_models import BaseChatModel
+from langchain_core.embeddings import Embeddings
+from typing import Any, Callable
+from utils import get_env_var
+import importlib
+
+
+# Fábricas: (model, role, **kwargs) -> modelo. `role` identifica quem está pedindo o modelo
+# (ex.: "agent", "math", "data_code"), o que permite a fakes responder de forma diferente.
+ChatModelFactory = Callable[..., BaseChatModel]
+EmbeddingsFactory = Callable[..., Embeddings]
+
+_chat_model_factory: ChatModelFactory | None = None
+_embeddings_factory: EmbeddingsFactory | None = None
+
+
+def _default_chat_model(model: str, role: str, **kwargs: Any) -> BaseChatModel:
+    from langchain.chat_models import init_chat_model
+
+    return init_chat_model(model=model, **kwargs)
+
+
+def _default_embeddings(model: str, role: str, **kwargs: Any) -> Embeddings:
+    from langchain.embeddings import init_embeddings
+
+    return init_embeddings(model, **kwargs)
+
+
+def _module_factory(name: str) -> Callable | None:
+    """
+    Fábrica definida pelo módulo em `PROVIDERS_MODULE` (ex.: `benchmarks.fakes`), que precisa
+    expor `create_chat_model` e/ou `create_embeddings`. Permite trocar os provedores de um
+    processo inteiro (ex.: a API subida pelo benchmark de carga) sem mudar código.
+    """
+
+    module_name = get_env_var("PROVIDERS_MODULE")
+    if not module_name:
+        return None
+
+    return getattr(importlib.import_module(module_name), name, None)
+
+
+def set_chat_model_factory(factory: ChatModelFactory | None) -> None:
+    """
+    Substitui a criação de modelos de chat (None volta ao padrão).
+    """
+
+    global _chat_model_factory
+    _chat_model_factory = factory
+
+
+def set_embeddings_factory(factory: EmbeddingsFactory | None) -> None:
+    """
+    Substitui a criação de modelos de embeddings (None volta ao padrão).
+    """
+
+    global _embeddings_factory
+    _embeddings_factory = factory
+
+
+def chat_model(model: str, role: str = "default", **kwargs: Any) -> BaseChatModel:
+    """
+    Cria o modelo de chat usado pelo agente e pelas ferramentas.
+
+    Args:
+        model: Modelo no formato do `init_chat_model` (ex.: "google_genai:gemini-2.5-flash-lite").
+        role: Quem usa o modelo (ex.: "agent", "math", "rag").
+        kwargs: Parâmetros repassados ao modelo (temperature, api_key...).
+    """
+
+    factory = _chat_model_factory or _module_factory("create_chat_model") or _default_chat_model
+    return factory(model, role, **kwargs)
+
+
+def embeddings(model: str, role: str = "default", **kwargs: Any) -> Embeddings:
+    """
+    Cria o modelo de embeddings (ex.: "google_genai:gemini-embedding-001").
+    """
+
+    factory = _embeddings_factory or _module_factory("create_embeddings") or _default_embeddings
+    return factory(model, role, **kwargs)
@@ -0,0 +1,214 @@
+from concurrent.futures import ProcessPoolExecutor
+from langchain_core.documents import Document
+from structured_logging import log_event
+from utils import get_env_var
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable
+import hashlib
+import logging
+import math
+import multiprocessing
+import os
+import re
+
+
+# Separadores de seção (parágrafos) e de sentença; as quebras simples do PDF viram espaço.
+SECTION_PATTERN = re.compile(r"\n\s*\n+")
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?;:])\s+(?=[\"'(\[]?[A-ZÀ-Ý0-9•\-])|\n(?=\s*(?:[•\-*]|\d+[.)])\s)")
+WORD_PATTERN = re.compile(r"\S+\s*")
+
+# Aproximação usada quando o tokenizer local não está disponível (ex.: sem o arquivo BPE do tiktoken).
+_REGEX_TOKEN_PATTERN = re.compile(r"\w{1,4}|[^\w\s]")
+
+# Abaixo deste número de documentos o custo de subir processos supera o ganho: cada processo
+# (spawn) importa o projeto de novo, ~1,6 s de CPU, e uma página custa ~65 µs no processo atual.
+# Medido com `benchmarks.chunking_bench`, 4 processos perderam para 1 até em 19.600 páginas.
+MIN_PARALLEL_DOCUMENTS = 50000
+
+
+@dataclass(frozen=True)
+class ChunkingConfig:
+    """
+    Tamanho máximo e sobreposição dos trechos, em tokens.
+
+    Uma seção nova fecha o trecho atual quando ele já tem pelo menos `min_tokens`, para os
+    trechos não misturarem assuntos; seções menores são agrupadas.
+    """
+
+    max_tokens: int = 384
+    overlap_tokens: int = 48
+    min_tokens: int = 128
+
+
+@lru_cache(maxsize=1)
+def get_token_counter() -> Callable[[list[str]], list[int]]:
+    """
+    Contador de tokens local: o encoding do tiktoken (`CHUNK_TOKENIZER`, padrão cl100k_base) ou,
+    se ele não puder ser carregado, uma aproximação por regex (palavras em pedaços de até 4 letras).
+    """
+
+    encoding_name = get_env_var("CHUNK_TOKENIZER", "cl100k_base")
+    if encoding_name != "regex":
+        try:
+            import tiktoken
+
+            encoding = tiktoken.get_encoding(encoding_name)
+            return lambda texts: [len(tokens) for tokens in encoding.encode_ordinary_batch(texts)]
+        except Exception as e:
+            log_event("chunk_tokenizer_fallback", level=logging.WARNING, tokenizer=encoding_name, error=str(e))
+
+    return lambda texts: [len(_REGEX_TOKEN_PATTERN.findall(text)) for text in texts]
+
+
+def count_tokens(text: str) -> int:
+    return get_token_counter()([text])[0]
+
+
+def chunk_id(metadata: dict, text: str) -> str:
+    """
+    Id estável do trecho: depende só da origem (arquivo e página) e do conteúdo, então
+    reprocessar o mesmo corpus gera os mesmos ids, em qualquer ordem ou número de processos.
+    Vai em `Document.id` e nos metadados; os vector stores o usam como id (veja
+    `rags.vetorial_db`), então reindexar o mesmo corpus substitui os trechos em vez de duplicá-los.
+    """
+
+    origin = f"{os.path.basename(str(metadata.get('source', '')))}|{metadata.get('page_number', '')}"
+    return hashlib.blake2b(f"{origin}|{text}".encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _split_long(sentence: str, tokens: int, max_tokens: int) -> list[str]:
+    """
+    Quebra uma sentença maior que o limite em pedaços de palavras inteiras com até `max_tokens`.
+    """
+
+    words = WORD_PATTERN.findall(sentence)
+    pieces = max(2, math.ceil(tokens / max_tokens))
+    per_piece = math.ceil(len(words) / pieces)
+    return ["".join(words[start:start + per_piece]).strip() for start in range(0, len(words), per_piece)]
+
+
+def _units(text: str, max_tokens: int) -> list[tuple[str, int, bool]]:
+    """
+    Sentenças do texto com a contagem de tokens e se abrem uma nova seção.
+    """
+
+    sentences: list[tuple[str, bool]] = []
+    for section in SECTION_PATTERN.split(text):
+        parts = [part.strip() for part in SENTENCE_PATTERN.split(section)]
+        parts = [" ".join(part.split()) for part in parts if part]
+        sentences.extend((part, index == 0) for index, part in enumerate(parts))
+
+    counts = get_token_counter()([sentence for sentence, _ in sentences])
+
+    units: list[tuple[str, int, bool]] = []
+    for (sentence, starts_section), tokens in zip(sentences, counts):
+        if tokens <= max_tokens:
+            units.append((sentence, tokens, starts_section))
+            continue
+
+        pieces = _split_long(sentence, tokens, max_tokens)
+        for index, (piece, piece_tokens) in enumerate(zip(pieces, get_token_counter()(pieces))):
+            units.append((piece, piece_tokens, starts_section and index == 0))
+
+    return units
+
+
+def split_text(text: str, config: ChunkingConfig) -> list[str]:
+    """
+    Agrupa as sentenças do texto em trechos de até `max_tokens`, repetindo no início de cada
+    trecho as últimas sentenças do anterior (até `overlap_tokens`). Nenhuma sentença é cortada,
+    exceto as que sozinhas passam do limite.
+    """
+
+    chunks: list[str] = []
+    current: list[tuple[str, int]] = []
+    current_tokens = 0
+    # Sentenças já emitidas em algum trecho: um trecho só de sobreposição não é emitido de novo.
+    fresh = False
+
+    def flush() -> None:
+        nonlocal current, current_tokens, fresh
+        if fresh:
+            chunks.append(" ".join(sentence for sentence, _ in current))
+
+        overlap: list[tuple[str, int]] = []
+        overlap_tokens = 0
+        for sentence, tokens in reversed(current):
+            if overlap_tokens + tokens > config.overlap_tokens:
+                break
+            overlap.insert(0, (sentence, tokens))
+            overlap_tokens += tokens
+
+        current, current_tokens, fresh = overlap, overlap_tokens, False
+
+    for sentence, tokens, starts_section in _units(text, config.max_tokens):
+        if fresh and starts_section and current_tokens >= config.min_tokens:
+            flush()
+            # Seção nova começa limpa, sem a sobreposição do assunto anterior.
+            current, current_tokens = [], 0
+
+        if current_tokens + tokens > config.max_tokens:
+            flush()
+            while current and current_tokens + tokens > config.max_tokens:
+                current_tokens -= current.pop(0)[1]
+
+        current.append((sentence, tokens))
+        current_tokens += tokens
+        fresh = True
+
+    if fresh:
+        flush()
+
+    return chunks
+
+
+def _chunk_document(document: Document, config: ChunkingConfig) -> list[Document]:
+    chunks = []
+    for index, text in enumerate(split_text(document.page_content, config)):
+        identifier = chunk_id(document.metadata, text)
+        metadata = {**document.metadata, "chunk_index": index, "chunk_id": identifier}
+        chunks.append(Document(id=identifier, page_content=text, metadata=metadata))
+
+    return chunks
+
+
+def _chunk_batch(documents: list[Document], config: ChunkingConfig) -> list[list[Document]]:
+    return [_chunk_document(document, config) for document in documents]
+
+
+def chunk_documents(
+    documents: list[Document],
+    config: ChunkingConfig | None = None,
+    workers: int | None = None,
+    min_parallel_documents: int = MIN_PARALLEL_DOCUMENTS
+) -> list[Document]:
+    """
+    Divide os documentos em trechos por número de tokens, respeitando seções e sentenças.
+
+    Roda no processo atual. Com `CHUNKING_WORKERS` (padrão 1) maior que 1 e pelo menos
+    `min_parallel_documents` documentos, os lotes são distribuídos entre processos (spawn) e o
+    resultado mantém a ordem de entrada. Cada trecho recebe nos metadados o `chunk_index`
+    dentro do documento e um `chunk_id` estável (veja `chunk_id`).
+
+    Args:
+        documents: Documentos (ex.: páginas do PDF) com metadados `source` e `page_number`.
+        config: Tamanhos em tokens (padrão: `ChunkingConfig()`).
+        workers: Processos usados; 1 processa no processo atual.
+        min_parallel_documents: Mínimo de documentos para usar os processos.
+    """
+
+    config = config or ChunkingConfig()
+    workers = workers or int(get_env_var("CHUNKING_WORKERS", "1"))
+
+    if workers <= 1 or len(documents) < min_parallel_documents:
+        results = _chunk_batch(documents, config)
+    else:
+        # Spawn: o ETL roda na thread de aquecimento, e fork com outras threads ativas pode travar.
+        batch_size = math.ceil(len(documents) / (workers * 4))
+        batches = [documents[start:start + batch_size] for start in range(0, len(documents), batch_size)]
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            results = [chunks for batch in executor.map(_chunk_batch, batches, [config] * len(batches)) for chunks in batch]
+
+    return [chunk for chunks in results for chunk in chunks]
@@ -0,0 +1,174 @@
+from langchain_core.documents import Document
+from rags.local_embeddings import normalize_text
+from observability import RAG_CONTEXT_TOKENS, span
+from structured_logging import log_event
+from utils import get_env_var
+import math
+import re
+
+
+# Sobreposição mínima (em caracteres) para considerar que dois trechos continuam um ao outro.
+MIN_OVERLAP_CHARS = 20
+
+# Trechos da mesma página sem sobreposição são unidos com este separador.
+GAP_SEPARATOR = "\n[...]\n"
+
+# Tokens aproximados que o `doc_context.prompt.md` acrescenta por documento (fonte, página, metadados).
+DOCUMENT_OVERHEAD_TOKENS = 40
+
+# Sentenças curtas (títulos, números soltos) não são deduplicadas.
+MIN_DEDUP_SENTENCE_CHARS = 20
+
+# Separadores entre sentenças (capturados, para o texto mantido preservar as quebras de linha).
+SENTENCE_PATTERN = re.compile(r"((?<=[.!?;])\s+|\n+)")
+
+
+def approximate_tokens(text: str) -> int:
+    """
+    Estimativa de tokens usada no orçamento (~4 caracteres por token, como o `count_tokens_approximately`).
+    """
+
+    return math.ceil(len(text) / 4)
+
+
+def _merge_text(first: str, second: str) -> str | None:
+    """
+    Une dois trechos quando um contém o outro ou o fim de um repete o começo do outro
+    (a sobreposição do splitter). Retorna None se não houver sobreposição.
+    """
+
+    if second in first:
+        return first
+    if first in second:
+        return second
+
+    for left, right in ((first, second), (second, first)):
+        probe = right[:MIN_OVERLAP_CHARS]
+        position = left.find(probe)
+        while position != -1:
+            if right.startswith(left[position:]):
+                return left + right[len(left) - position:]
+            position = left.find(probe, position + 1)
+
+    return None
+
+
+def _merge_same_page(documents: list[Document]) -> list[Document]:
+    """
+    Junta os trechos da mesma fonte e página em um único documento, na posição do mais relevante.
+    """
+
+    packed: list[Document] = []
+    by_page: dict[tuple, int] = {}
+
+    for doc in documents:
+        key = (doc.metadata.get("source"), doc.metadata.get("page_number"))
+        if key not in by_page:
+            by_page[key] = len(packed)
+            packed.append(Document(page_content=doc.page_content, metadata=dict(doc.metadata)))
+            continue
+
+        target = packed[by_page[key]]
+        merged = _merge_text(target.page_content, doc.page_content)
+        target.page_content = merged if merged is not None else f"{target.page_content}{GAP_SEPARATOR}{doc.page_content}"
+
+    return packed
+
+
+def _drop_repeated_sentences(documents: list[Document]) -> list[Document]:
+    """
+    Remove sentenças já presentes em um documento mais relevante (ou antes no mesmo documento).
+    """
+
+    seen: set[str] = set()
+    result: list[Document] = []
+
+    for doc in documents:
+        parts = SENTENCE_PATTERN.split(doc.page_content)
+        kept = []
+        # `parts` alterna sentença e separador; a sentença descartada leva junto o separador seguinte.
+        for index in range(0, len(parts), 2):
+            sentence = parts[index]
+            key = " ".join(normalize_text(sentence).split())
+            if len(key) >= MIN_DEDUP_SENTENCE_CHARS:
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append(sentence + (parts[index + 1] if index + 1 < len(parts) else ""))
+
+        content = "".join(kept).strip()
+        if content:
+            result.append(Document(page_content=content, metadata=doc.metadata))
+
+    return result
+
+
+def _fill_budget(documents: list[Document], token_budget: int) -> list[Document]:
+    """
+    Preenche o orçamento em ordem de relevância; o primeiro documento que não cabe inteiro é
+    cortado no fim de uma sentença, e os seguintes ficam de fora.
+    """
+
+    result: list[Document] = []
+    remaining = token_budget
+
+    for doc in documents:
+        cost = approximate_tokens(doc.page_content) + DOCUMENT_OVERHEAD_TOKENS
+        if cost <= remaining:
+            result.append(doc)
+            remaining -= cost
+            continue
+
+        available_chars = (remaining - DOCUMENT_OVERHEAD_TOKENS) * 4
+        if available_chars > 0:
+            cut = doc.page_content[:available_chars]
+            boundary = max(cut.rfind(". "), cut.rfind("\n"))
+            if boundary > 0:
+                result.append(Document(page_content=cut[:boundary + 1], metadata=doc.metadata))
+        break
+
+    return result
+
+
+def _context_tokens(documents: list[Document]) -> int:
+    return sum(approximate_tokens(doc.page_content) + DOCUMENT_OVERHEAD_TOKENS for doc in documents)
+
+
+def pack_context(documents: list[Document], token_budget: int | None = None) -> list[Document]:
+    """
+    Empacota os documentos recuperados antes do `create_stuff_documents_chain`.
+
+    Os documentos chegam em ordem de relevância (saída do EnsembleRetriever). Trechos da mesma
+    fonte e página são unidos (removendo a sobreposição do splitter), sentenças repetidas entre
+    documentos são descartadas e o resultado é cortado no orçamento de tokens
+    (`RAG_CONTEXT_TOKEN_BUDGET`). Os tokens economizados são registrados por consulta.
+
+    Args:
+        documents: Documentos recuperados, do mais para o menos relevante.
+        token_budget: Orçamento de tokens do contexto (padrão: RAG_CONTEXT_TOKEN_BUDGET).
+
+    Returns:
+        Documentos prontos para o prompt de QA, na mesma ordem de relevância.
+    """
+
+    token_budget = token_budget or int(get_env_var("RAG_CONTEXT_TOKEN_BUDGET", "3000"))
+
+    with span("rag.context_packing", kind="retrieval", documents=len(documents)) as packing_span:
+        packed = _fill_budget(_drop_repeated_sentences(_merge_same_page(documents)), token_budget)
+
+        tokens_in = _context_tokens(documents)
+        tokens_out = _context_tokens(packed)
+        packing_span.set(tokens_in=tokens_in, tokens_out=tokens_out, tokens_saved=tokens_in - tokens_out)
+
+    RAG_CONTEXT_TOKENS.inc("retrieved", amount=tokens_in)
+    RAG_CONTEXT_TOKENS.inc("packed", amount=tokens_out)
+    log_event(
+        "rag_context_packed",
+        documents_in=len(documents),
+        documents_out=len(packed),
+        tokens_in=tokens_in,
+        tokens_out=tokens_out,
+        tokens_saved=tokens_in - tokens_out,
+        token_budget=token_budget,
+    )
+    return packed
@@ -1,22 +1,20 @@
 from langchain_community.document_loaders import TextLoader, PyPDFDirectoryLoader
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.language_models import BaseChatModel
 from langchain_classic.text_splitter import RecursiveCharacterTextSplitter
 from langchain_classic.schema import Document
-from utils import get_prompt
+from rags.chunking import ChunkingConfig, chunk_documents
+from utils import get_prompt, get_env_var
 from datetime import datetime
 from pathlib import Path
 
 
-def etl_pdf_process(llm: ChatGoogleGenerativeAI | None = None) -> list[Document]:
+def load_pdf_pages() -> list[Document]:
     """
-    Extrai e transforma documentos de PDF em chunks com metadados.
-
-    Args:
-        llm: LLM opcional para gerar um resumo do PDF e adicionar como documento extra.
+    Extrai as páginas dos PDFs de `assets/` com os metadados e o cabeçalho usados na indexação.
 
     Returns:
-        Lista de documentos prontos para indexação.
+        Uma página por documento, ainda sem chunking.
     """
 
     loader = PyPDFDirectoryLoader("assets", glob="*.pdf")
@@ -44,15 +42,34 @@ def etl_pdf_process(llm: ChatGoogleGenerativeAI | None = None) -> list[Document]
             Document(page_content=f"{page_header}{doc.page_content}", metadata=metadata)
         )
 
+    return docs_with_metadata
+
+
+def etl_pdf_process(llm: BaseChatModel | None = None) -> list[Document]:
+    """
+    Extrai e transforma documentos de PDF em chunks com metadados.
+
+    Args:
+        llm: LLM opcional para gerar um resumo do PDF e adicionar como documento extra.
+
+    Returns:
+        Lista de documentos prontos para indexação.
+    """
+
+    docs_with_metadata = load_pdf_pages()
+
     # Transformação de dados (chunking)
     # Dividimos o texto para respeitar limites de contexto dos embeddings.
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1500,  # Mais contexto por chunk para preservar trechos inteiros do PDF.
-        chunk_overlap=200,  # Sobreposição para manter continuidade entre trechos (volta 200 caracteres no texto).
-        separators=["\n\n", "\n", ". ", " ", ""],
-    )
-
-    chunks = text_splitter.split_documents(docs_with_metadata)
+    if get_env_var("RAG_CHUNKER", "tokens") == "tokens":
+        # Trechos por tokens (~1500 caracteres), sem cortar sentenças, no processo atual (veja `CHUNKING_WORKERS`).
+        chunks = chunk_documents(docs_with_metadata, ChunkingConfig(max_tokens=384, overlap_tokens=48, min_tokens=128))
+    else:
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=1500,  # Mais contexto por chunk para preservar trechos inteiros do PDF.
+            chunk_overlap=200,  # Sobreposição para manter continuidade entre trechos (volta 200 caracteres no texto).
+            separators=["\n\n", "\n", ". ", " ", ""],
+        )
+        chunks = text_splitter.split_documents(docs_with_metadata)
     # print("Total de chunks gerados:", len(chunks))
 
     # Resumo opcional do PDF para fornecer visão geral ao modelo.
@@ -65,11 +82,11 @@ def etl_pdf_process(llm: ChatGoogleGenerativeAI | None = None) -> list[Document]
 
         chain = summary_prompt | llm
         summaries = chain.batch([{"doc_content": chunk.page_content} for chunk in chunks])
-        for summary in summaries:
+        for chunk, summary in zip(chunks, summaries):
             summary_text = summary.content.strip()
             summary_metadata = {
                 "id_doc": "pdf_summary",
-                "source": doc.metadata.get("source", "N/A"),
+                "source": chunk.metadata.get("source", "N/A"),
                 "page_number": 1,
                 "categoria": "N/A",
                 "id_produto": "N/A",
@@ -124,12 +141,14 @@ def etl_text_process() -> list[Document]:
             )
 
     # Transformação de dados (chunking)
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=700,
-        chunk_overlap=100,
-        separators=["\n\n", "\n", ". ", " ", ""],
-    )
-
-    chunks = text_splitter.split_documents(docs_with_metadata)
+    if get_env_var("RAG_CHUNKER", "tokens") == "tokens":
+        chunks = chunk_documents(docs_with_metadata, ChunkingConfig(max_tokens=192, overlap_tokens=24, min_tokens=64))
+    else:
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=700,
+            chunk_overlap=100,
+            separators=["\n\n", "\n", ". ", " ", ""],
+        )
+        chunks = text_splitter.split_documents(docs_with_metadata)
 
     return chunks
@@ -0,0 +1,68 @@
+from langchain_core.embeddings import Embeddings
+import unicodedata
+import hashlib
+import numpy as np
+import re
+
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Minúsculas e sem acentos, para "avaliação" e "avaliacao" caírem nas mesmas features.
+    """
+
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Embeddings locais e determinísticos por feature hashing de palavras e n-gramas de caracteres.
+
+    Não capturam sinônimos como um modelo treinado, mas aproximam variações morfológicas
+    ("chunk", "chunking") pelos n-gramas e produzem o mesmo vetor em qualquer máquina, sem rede
+    nem cota. Servem para avaliações offline reprodutíveis e para testes locais dos índices.
+    Os vetores saem normalizados (norma L2 = 1), então produto interno equivale a cosseno.
+    """
+
+    def __init__(self, size: int = 1024, char_ngrams: tuple[int, int] = (3, 5), word_weight: float = 2.0) -> None:
+        self.size = size
+        self.char_ngrams = char_ngrams
+        self.word_weight = word_weight
+
+    def __features(self, text: str) -> list[tuple[str, float]]:
+        words = TOKEN_PATTERN.findall(normalize_text(text))
+        features = [(f"w:{word}", self.word_weight) for word in words]
+
+        low, high = self.char_ngrams
+        for word in words:
+            padded = f"<{word}>"
+            for n in range(low, high + 1):
+                features.extend((f"c:{padded[i:i + n]}", 1.0) for i in range(len(padded) - n + 1))
+
+        return features
+
+    def __embed(self, text: str) -> list[float]:
+        vector = np.zeros(self.size, dtype=np.float32)
+        for feature, weight in self.__features(text):
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            # O bit mais alto define o sinal: colisões tendem a se cancelar em vez de acumular.
+            sign = 1.0 if value >> 63 else -1.0
+            vector[value % self.size] += sign * weight
+
+        # Amortece termos muito repetidos (como tf sublinear) antes de normalizar.
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+
+        return vector.tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self.__embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.__embed(text)
@@ -0,0 +1,158 @@
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from rags.local_embeddings import normalize_text
+from typing import Any
+from pathlib import Path
+import numpy as np
+import re
+
+
+# Campos de metadados indexados (preenchidos pelo `etl_pdf_process` e pelo `etl_text_process`).
+METADATA_FIELDS = ("source", "page_number", "categoria", "id_produto", "data_owner")
+
+# Valor usado pelo ETL quando o campo não se aplica; não entra no índice.
+MISSING_VALUE = "N/A"
+
+PAGE_PATTERN = re.compile(r"\b(?:pagina|pag\.?|pg\.?)\s*(\d+)\b")
+
+
+def normalize_value(field: str, value: Any) -> str:
+    """
+    Forma canônica de um valor: sem acentos e minúscula; fontes pelo nome do arquivo e páginas como inteiro.
+    """
+
+    if field == "source":
+        value = Path(str(value)).name
+    elif field == "page_number":
+        try:
+            value = int(float(value))
+        except (TypeError, ValueError):
+            pass
+
+    return " ".join(normalize_text(str(value)).split())
+
+
+def source_aliases(source: str) -> set[str]:
+    """
+    Formas pelas quais um arquivo pode ser citado na pergunta: nome, nome sem extensão e o
+    prefixo antes do " - " (ex.: "aula 3" para "Aula 3 - Embeddings de Alta Performance.pdf").
+    """
+
+    name = normalize_value("source", source)
+    stem = normalize_value("source", Path(source).stem)
+    aliases = {name, stem}
+    if " - " in stem:
+        aliases.add(stem.split(" - ")[0].strip())
+
+    return {alias for alias in aliases if alias}
+
+
+class MetadataIndex:
+    """
+    Índice invertido dos metadados dos trechos: para cada campo e valor, as posições (ordenadas)
+    dos trechos que o têm. As posições são as mesmas da lista de documentos usada na construção,
+    que é a ordem das linhas do índice vetorial compartilhado.
+
+    Um filtro é um dicionário campo -> valor (ou lista de valores). Valores do mesmo campo são
+    combinados com OU e campos diferentes com E, por interseção das listas de posições, sem
+    percorrer o corpus.
+    """
+
+    def __init__(self, documents: list[Document]) -> None:
+        self.__documents = documents
+        postings: dict[str, dict[str, list[int]]] = {field: {} for field in METADATA_FIELDS}
+        # Valores originais de cada valor canônico, para montar filtros nativos (ex.: Chroma).
+        self.__raw_values: dict[str, dict[str, set]] = {field: {} for field in METADATA_FIELDS}
+
+        for position, doc in enumerate(documents):
+            for field in METADATA_FIELDS:
+                value = doc.metadata.get(field)
+                if value is None or value == MISSING_VALUE:
+                    continue
+
+                keys = source_aliases(str(value)) if field == "source" else {normalize_value(field, value)}
+                for key in keys:
+                    postings[field].setdefault(key, []).append(position)
+                    self.__raw_values[field].setdefault(key, set()).add(value)
+
+        self.__postings = {
+            field: {key: np.asarray(positions, dtype=np.int64) for key, positions in values.items()}
+            for field, values in postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.__documents)
+
+    def values(self, field: str) -> list[str]:
+        """
+        Valores canônicos conhecidos de um campo.
+        """
+
+        return list(self.__postings.get(field, {}))
+
+    def select(self, filters: dict[str, Any]) -> np.ndarray:
+        """
+        Posições dos trechos que atendem a todos os filtros.
+
+        Args:
+            filters: Campo -> valor ou lista de valores (ex.: {"source": "aula 3", "page_number": [4, 5]}).
+        """
+
+        selected: np.ndarray | None = None
+        for field, value in filters.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            matches = [self.__postings.get(field, {}).get(normalize_value(field, item)) for item in values]
+            matches = [positions for positions in matches if positions is not None]
+            positions = np.unique(np.concatenate(matches)) if matches else np.empty(0, dtype=np.int64)
+            selected = positions if selected is None else np.intersect1d(selected, positions, assume_unique=True)
+
+        return selected if selected is not None else np.arange(len(self.__documents))
+
+    def documents(self, positions: np.ndarray) -> list[Document]:
+        """
+        Trechos nas posições informadas (ex.: para montar o BM25 só sobre o subconjunto).
+        """
+
+        return [self.__documents[int(position)] for position in positions]
+
+    def parse_filters(self, question: str) -> dict[str, list[str]]:
+        """
+        Extrai filtros citados na pergunta: página ("página 4", "pág. 4"), arquivo (pelo nome
+        ou pelo prefixo, ex.: "aula 3") e valores conhecidos de categoria, produto e dono.
+        """
+
+        text = f" {' '.join(normalize_text(question).split())} "
+        filters: dict[str, list[str]] = {}
+
+        pages = PAGE_PATTERN.findall(text)
+        if pages:
+            filters["page_number"] = pages
+
+        for field in ("source", "categoria", "id_produto", "data_owner"):
+            # Casamento por palavra inteira: "aula 1" não casa dentro de "aula 10".
+            found = [value for value in self.values(field) if len(value) >= 3 and re.search(rf"(?<!\w){re.escape(value)}(?!\w)", text)]
+            if found:
+                filters[field] = found
+
+        return filters
+
+    def vector_search_kwargs(self, vector_store: VectorStore, filters: dict[str, Any], positions: np.ndarray) -> dict[str, Any]:
+        """
+        Argumentos de busca que restringem o vector store ao subconjunto: posições para o índice
+        compartilhado e um filtro `where` nativo para o Chroma.
+        """
+
+        from rags.shared_index import SharedIndexVectorStore
+
+        if isinstance(vector_store, SharedIndexVectorStore):
+            return {"positions": positions}
+
+        clauses = []
+        for field, value in filters.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            raw = set()
+            for item in values:
+                raw |= self.__raw_values.get(field, {}).get(normalize_value(field, item), set())
+            clauses.append({field: {"$in": sorted(raw, key=str)}})
+
+        return {"filter": clauses[0] if len(clauses) == 1 else {"$and": clauses}}
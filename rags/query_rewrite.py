@@ -0,0 +1,147 @@
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from rags.local_embeddings import TOKEN_PATTERN, normalize_text
+from collections import OrderedDict
+from dtos import ResponseSchema
+from observability import span
+from structured_logging import log_event
+from utils import get_env_var, get_prompt
+import threading
+import hashlib
+import re
+
+
+# Pronomes, demonstrativos e expressões que só fazem sentido com o histórico (texto normalizado).
+# "esta" fica de fora: sem acento, coincide com o verbo "está".
+ANAPHORA_PATTERN = re.compile(
+    r"\b(?:ele|ela|eles|elas|dele|dela|deles|delas|nele|nela|isso|isto|disso|disto|nisso|nisto|aquilo|"
+    r"esse|essa|esses|essas|desse|dessa|desses|dessas|nesse|nessa|este|estes|deste|desta|"
+    r"aquele|aquela|daquele|daquela|o mesmo|a mesma|anterior|acima|mencionad\w*|citad\w*|"
+    r"explique melhor|continue|mais detalhes|outro|outra)\b"
+)
+
+# Perguntas que começam retomando o assunto anterior ("e o BM25?", "mas e no Chroma?").
+CONTINUATION_PATTERN = re.compile(r"^(?:e|mas|entao|tambem|e quanto|e sobre|e se)\b")
+
+# Perguntas curtas demais para se sustentarem sozinhas.
+MIN_STANDALONE_WORDS = 4
+
+
+def needs_contextualization(question: str) -> bool:
+    """
+    Heurística barata: a pergunta depende do histórico quando usa pronomes ou demonstrativos,
+    retoma o assunto anterior ou é curta demais para ser autossuficiente.
+    """
+
+    normalized = normalize_text(question).strip()
+    return (
+        len(TOKEN_PATTERN.findall(normalized)) < MIN_STANDALONE_WORDS
+        or CONTINUATION_PATTERN.search(normalized) is not None
+        or ANAPHORA_PATTERN.search(normalized) is not None
+    )
+
+
+def recent_history(messages: list[AnyMessage], limit: int) -> list[AnyMessage]:
+    """
+    Últimas mensagens de texto da conversa (perguntas do usuário e respostas do agente), sem
+    chamadas e resultados de ferramentas e sem a pergunta atual. A resposta estruturada do
+    agente (chamada de `ResponseSchema`) vira uma mensagem de texto com a resposta.
+    """
+
+    history: list[AnyMessage] = []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            history.append(HumanMessage(content=message.text))
+        elif isinstance(message, AIMessage) and not message.tool_calls and message.text:
+            history.append(AIMessage(content=message.text))
+        elif isinstance(message, AIMessage):
+            history.extend(
+                AIMessage(content=call["args"].get("answer", ""))
+                for call in message.tool_calls if call["name"] == ResponseSchema.__name__
+            )
+
+    if history and isinstance(history[-1], HumanMessage):
+        history = history[:-1]
+
+    return history[-limit:] if limit > 0 else []
+
+
+class QueryRewriter:
+    """
+    Singleton que reescreve a pergunta do RAG como uma pergunta independente só quando é preciso.
+
+    A reescrita (uma chamada ao LLM antes da recuperação) é pulada quando não há histórico ou
+    quando a heurística não encontra pronomes nem retomadas do assunto anterior. As reescritas
+    feitas ficam em um cache LRU por (hash do histórico recente, pergunta).
+
+    Variáveis de ambiente:
+    - RAG_REWRITE_HISTORY_MESSAGES: mensagens recentes usadas na reescrita e na chave do cache (padrão 6).
+    - RAG_REWRITE_CACHE_SIZE: reescritas mantidas no cache (padrão 1024).
+    """
+
+    __instance: "QueryRewriter" = None
+
+    def __new__(cls):
+        if cls.__instance is None:
+            cls.__instance = super(QueryRewriter, cls).__new__(cls)
+            cls.__instance.__setup()
+
+        return cls.__instance
+
+    def __setup(self) -> None:
+        self.history_messages = int(get_env_var("RAG_REWRITE_HISTORY_MESSAGES", "6"))
+        self.cache_size = int(get_env_var("RAG_REWRITE_CACHE_SIZE", "1024"))
+        self.__cache: OrderedDict[str, str] = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__prompt = ChatPromptTemplate.from_messages([
+            ("system", get_prompt("contextualize_query.prompt.md")),
+            MessagesPlaceholder("chat_history"),
+            ("human", "{input}")
+        ])
+
+    @staticmethod
+    def __cache_key(question: str, history: list[AnyMessage]) -> str:
+        digest = hashlib.sha256()
+        for message in history:
+            digest.update(f"{message.type}:{message.text}\x00".encode("utf-8"))
+        digest.update(question.strip().encode("utf-8"))
+        return digest.hexdigest()
+
+    def rewrite(self, question: str, messages: list[AnyMessage], llm: BaseChatModel) -> str:
+        """
+        Retorna a pergunta pronta para a recuperação, reescrita com o histórico quando necessário.
+
+        Args:
+            question: Pergunta recebida pela ferramenta.
+            messages: Mensagens da conversa (estado do agente).
+            llm: Modelo usado na reescrita.
+        """
+
+        history = recent_history(messages, self.history_messages)
+        if not history or not needs_contextualization(question):
+            log_event("rag_query_rewrite", action="skipped", history=len(history))
+            return question
+
+        key = self.__cache_key(question, history)
+        with self.__lock:
+            cached = self.__cache.get(key)
+            if cached is not None:
+                self.__cache.move_to_end(key)
+
+        if cached is not None:
+            log_event("rag_query_rewrite", action="cached", history=len(history))
+            return cached
+
+        with span("rag.query_rewrite", kind="llm", history=len(history)):
+            chain = self.__prompt | llm | StrOutputParser()
+            rewritten = chain.invoke({"input": question, "chat_history": history}).strip() or question
+
+        with self.__lock:
+            self.__cache[key] = rewritten
+            while len(self.__cache) > self.cache_size:
+                self.__cache.popitem(last=False)
+
+        log_event("rag_query_rewrite", action="rewritten", history=len(history), question=question, rewritten=rewritten)
+        return rewritten
@@ -0,0 +1,196 @@
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from langchain_core.documents import Document
+from typing import Any, Callable, Iterable
+from utils import get_env_var, file_lock
+from structured_logging import log_event
+from pathlib import Path
+import pyarrow as pa
+import numpy as np
+import hashlib
+import shutil
+import json
+import os
+import re
+
+
+VECTORS_FILE = "vectors.npy"
+CHUNKS_FILE = "chunks.arrow"
+
+# Nome dos diretórios de versão do índice (veja `index_key`): só eles são removidos na limpeza.
+INDEX_KEY_PATTERN = re.compile(r"[0-9a-f]{16}")
+
+
+def index_key(*parts: Any) -> str:
+    """
+    Versão do índice: muda quando qualquer parte muda (PDFs, modelo de embeddings, ETL).
+    """
+
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def source_fingerprint(paths: Iterable[Path]) -> list[tuple[str, int, int]]:
+    """
+    Nome, tamanho e data de modificação dos arquivos de origem, sem ler o conteúdo.
+    """
+
+    return [(path.name, path.stat().st_size, path.stat().st_mtime_ns) for path in sorted(paths)]
+
+
+def write_index(documents: list[Document], embeddings: Embeddings, directory: Path) -> None:
+    """
+    Vetoriza os documentos e grava o índice: vetores normalizados em `.npy` (float32) e
+    textos/metadados em Arrow IPC sem compressão, os dois formatos mapeáveis sem cópia.
+    """
+
+    vectors = np.asarray(embeddings.embed_documents([doc.page_content for doc in documents]), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.where(norms > 0, norms, 1.0)
+
+    directory.mkdir(parents=True, exist_ok=True)
+    np.save(directory / VECTORS_FILE, vectors)
+
+    table = pa.table({
+        "page_content": [doc.page_content for doc in documents],
+        "metadata": [json.dumps(doc.metadata, ensure_ascii=False, default=str) for doc in documents],
+    })
+    with pa.OSFile(str(directory / CHUNKS_FILE), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+class SharedIndexVectorStore(VectorStore):
+    """
+    Vector store somente leitura sobre um índice gravado em disco e mapeado em memória.
+
+    Vetores e textos não são copiados para o processo: todos os workers do uvicorn que abrem
+    o mesmo diretório leem as mesmas páginas do page cache. A busca é exata (produto interno
+    dos vetores normalizados, ou seja, cosseno) e só os top-k viram `Document`.
+    """
+
+    def __init__(self, directory: Path, embeddings: Embeddings) -> None:
+        self.__embeddings = embeddings
+        self.__vectors = np.load(directory / VECTORS_FILE, mmap_mode="r")
+        self.__chunks = pa.ipc.open_file(pa.memory_map(str(directory / CHUNKS_FILE), "r")).read_all()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.__embeddings
+
+    def __len__(self) -> int:
+        return self.__vectors.shape[0]
+
+    def __document(self, position: int) -> Document:
+        row = self.__chunks.slice(position, 1).to_pylist()[0]
+        return Document(page_content=row["page_content"], metadata=json.loads(row["metadata"]))
+
+    def documents(self) -> list[Document]:
+        """
+        Todos os trechos do índice (ex.: para montar o BM25).
+        """
+
+        return [
+            Document(page_content=row["page_content"], metadata=json.loads(row["metadata"]))
+            for row in self.__chunks.to_pylist()
+        ]
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: list[float],
+        k: int = 4,
+        positions: np.ndarray | None = None
+    ) -> list[tuple[Document, float]]:
+        """
+        Busca exata por cosseno. Com `positions` (ex.: vindas do `MetadataIndex`), só as linhas
+        do subconjunto são lidas e pontuadas.
+        """
+
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query /= norm
+
+        scores = (self.__vectors[positions] if positions is not None else self.__vectors) @ query
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        rows = positions[top] if positions is not None else top
+        return [(self.__document(int(row)), float(score)) for row, score in zip(rows, scores[top])]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> list[tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(
+            self.__embeddings.embed_query(query), k=k, positions=kwargs.get("positions")
+        )
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, **kwargs)]
+
+    def similarity_search_by_vector(self, embedding: list[float], k: int = 4, **kwargs: Any) -> list[Document]:
+        return [
+            doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, positions=kwargs.get("positions"))
+        ]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # Cosseno em [-1, 1] -> relevância em [0, 1].
+        return lambda score: (score + 1) / 2
+
+    def add_texts(self, texts: Iterable[str], metadatas: list[dict] | None = None, **kwargs: Any) -> list[str]:
+        raise NotImplementedError("O índice compartilhado é somente leitura; reconstrua-o a partir dos documentos.")
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: list[str],
+        embedding: Embeddings,
+        metadatas: list[dict] | None = None,
+        *,
+        directory: Path,
+        **kwargs: Any
+    ) -> "SharedIndexVectorStore":
+        metadatas = metadatas or [{} for _ in texts]
+        documents = [Document(page_content=text, metadata=metadata) for text, metadata in zip(texts, metadatas)]
+        write_index(documents, embedding, Path(directory))
+        return cls(Path(directory), embedding)
+
+
+def open_shared_index(key: str, embeddings: Embeddings, load_documents: Callable[[], list[Document]]) -> SharedIndexVectorStore:
+    """
+    Abre o índice da versão `key`, construindo-o uma única vez entre todos os processos.
+
+    O primeiro worker a chegar pega o lock de arquivo, roda o ETL e a vetorização e publica
+    o diretório com um rename atômico; os demais esperam o lock e apenas mapeiam os arquivos.
+    Versões antigas (diretórios com nome de `index_key` e um `VECTORS_FILE`) são removidas
+    após a publicação; o resto de `RAG_INDEX_DIR` não é tocado.
+
+    Args:
+        key: Versão do índice (veja `index_key`).
+        embeddings: Modelo usado para vetorizar documentos e consultas.
+        load_documents: ETL chamado só quando o índice ainda não existe.
+    """
+
+    base_dir = Path(get_env_var("RAG_INDEX_DIR", "./.rag_index"))
+    directory = base_dir / key
+
+    if not directory.exists():
+        with file_lock(base_dir / ".build.lock"):
+            if not directory.exists():
+                documents = load_documents()
+                tmp_dir = base_dir / f".{key}.{os.getpid()}.tmp"
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                write_index(documents, embeddings, tmp_dir)
+                os.replace(tmp_dir, directory)
+                log_event("rag_index_built", key=key, chunks=len(documents))
+
+                for old in base_dir.iterdir():
+                    if (
+                        old.name != key
+                        and INDEX_KEY_PATTERN.fullmatch(old.name)
+                        and old.is_dir()
+                        and (old / VECTORS_FILE).is_file()
+                    ):
+                        shutil.rmtree(old, ignore_errors=True)
+
+    return SharedIndexVectorStore(directory, embeddings)
@@ -1,9 +1,55 @@
 from utils import get_env_var
-from langchain_community.vectorstores import Chroma
 from langchain_classic.schema import Document
-from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
+from langchain_core.language_models import BaseChatModel
+from langchain_core.vectorstores import VectorStore
+from providers import chat_model, embeddings as create_embeddings
+from rags.shared_index import index_key, open_shared_index, source_fingerprint
+from rags.metadata_index import MetadataIndex
 from rags.vetorial_db import results_by_chromadb
 from rags.etls import etl_pdf_process
+from structured_logging import log_event
+from pathlib import Path
+import threading
+import time
+
+
+EMBEDDINGS_MODEL = "google_genai:gemini-embedding-001"
+
+# Incrementar quando o ETL mudar (chunking, metadados) para invalidar o índice compartilhado.
+ETL_VERSION = 2
+
+
+def load_documents(llm_for_summary: BaseChatModel | None) -> list[Document]:
+    """
+    Roda o ETL dos PDFs e garante os metadados obrigatórios em todos os trechos.
+    """
+
+    documents = etl_pdf_process(llm_for_summary)
+
+    required_metadata_defaults = {
+        "id_doc": "N/A",
+        "source": "N/A",
+        "page_number": "N/A",
+        "categoria": "N/A",
+        "id_produto": "N/A",
+        "preco": "N/A",
+        "timestamp": "N/A",
+        "data_owner": "N/A",
+    }
+
+    for doc in documents:
+        metadata = doc.metadata or {}
+        for key, default_value in required_metadata_defaults.items():
+            if key not in metadata:
+                metadata[key] = default_value
+            else:
+                value = metadata[key]
+                if hasattr(value, "item"):
+                    metadata[key] = value.item()
+
+        doc.metadata = metadata
+
+    return documents
 
 
 class RagSingletonTraining:
@@ -13,72 +59,93 @@ class RagSingletonTraining:
     """
 
     __instance: "RagSingletonTraining" = None
-    __VECTOR_STORE: Chroma = None
-    __QA_LLM: ChatGoogleGenerativeAI = None
+    __VECTOR_STORE: VectorStore = None
+    __QA_LLM: BaseChatModel = None
     __DOCUMENTS: list[Document] = None
+    __METADATA_INDEX: MetadataIndex = None
+    __lock = threading.Lock()
 
     def __new__(cls):
         """
         Implementação do padrão singleton para garantir que apenas uma instância da classe seja criada.
-        """
 
-        if cls.__instance is None:
-            cls.__instance = super(RagSingletonTraining, cls).__new__(cls)
-
-            print("Iniciando treinamento RAG")
-
-            GEMINI_API_KEY = get_env_var("GEMINI_API_KEY")
-            cls.__QA_LLM = ChatGoogleGenerativeAI(
-                model="gemini-2.5-flash-lite",
-                temperature=0.1,
-                api_key=GEMINI_API_KEY
-            )
-
-            GEMINI_API_KEY = get_env_var("GEMINI_API_KEY")
-            embeddings = GoogleGenerativeAIEmbeddings(
-                model="gemini-embedding-001",
-                google_api_key=GEMINI_API_KEY
-            )
-
-            summary_enabled = str(get_env_var("RAG_SUMMARY_ENABLED", "false")).lower() in {"1", "true", "yes"}
-            llm_for_summary = cls.__QA_LLM if summary_enabled else None
-
-            documents = etl_pdf_process(llm_for_summary)
-
-            required_metadata_defaults = {
-                "id_doc": "N/A",
-                "source": "N/A",
-                "page_number": "N/A",
-                "categoria": "N/A",
-                "id_produto": "N/A",
-                "preco": "N/A",
-                "timestamp": "N/A",
-                "data_owner": "N/A",
-            }
-
-            for doc in documents:
-                metadata = doc.metadata or {}
-                for key, default_value in required_metadata_defaults.items():
-                    if key not in metadata:
-                        metadata[key] = default_value
-                    else:
-                        value = metadata[key]
-                        if hasattr(value, "item"):
-                            metadata[key] = value.item()
-
-                doc.metadata = metadata
+        A construção (ETL e vetorização) roda sob lock: o aquecimento a faz em outra thread
+        enquanto o `rag_tool` pode ser chamado pelas requisições. A instância só é publicada
+        depois que tudo foi construído; se a construção falhar, a próxima chamada tenta de novo.
+        """
 
-            cls.__DOCUMENTS = documents
+        if cls.__instance is not None:
+            return cls.__instance
 
-            cls.__VECTOR_STORE = results_by_chromadb(cls.__DOCUMENTS, embeddings)
+        with cls.__lock:
+            if cls.__instance is None:
+                cls.__build()
+                cls.__instance = super(RagSingletonTraining, cls).__new__(cls)
 
         return cls.__instance
 
-    def get_vector_store(self) -> Chroma:
+    @classmethod
+    def __build(cls) -> None:
+        start = time.perf_counter()
+        log_event("rag_training_started")
+
+        GEMINI_API_KEY = get_env_var("GEMINI_API_KEY")
+        qa_llm = chat_model(
+            "google_genai:gemini-2.5-flash-lite",
+            role="rag",
+            temperature=0.1,
+            api_key=GEMINI_API_KEY
+        )
+
+        embeddings = create_embeddings(
+            EMBEDDINGS_MODEL,
+            role="rag",
+            google_api_key=GEMINI_API_KEY
+        )
+
+        summary_enabled = str(get_env_var("RAG_SUMMARY_ENABLED", "false")).lower() in {"1", "true", "yes"}
+        llm_for_summary = qa_llm if summary_enabled else None
+
+        backend = get_env_var("RAG_VECTOR_BACKEND", "shared")
+        if backend == "chroma":
+            documents = load_documents(llm_for_summary)
+            vector_store = results_by_chromadb(documents, embeddings)
+        else:
+            # Índice em disco mapeado em memória: construído uma vez e lido sem cópia por
+            # todos os workers. O ETL e a vetorização só rodam quando a versão muda.
+            key = index_key(
+                source_fingerprint(Path("assets").glob("*.pdf")),
+                EMBEDDINGS_MODEL,
+                get_env_var("PROVIDERS_MODULE", ""),
+                ETL_VERSION,
+                get_env_var("RAG_CHUNKER", "tokens"),
+                summary_enabled
+            )
+            vector_store = open_shared_index(key, embeddings, lambda: load_documents(llm_for_summary))
+            documents = vector_store.documents()
+
+        # Posições alinhadas com as linhas do índice compartilhado (mesma ordem dos documentos).
+        metadata_index = MetadataIndex(documents)
+
+        cls.__QA_LLM = qa_llm
+        cls.__VECTOR_STORE = vector_store
+        cls.__DOCUMENTS = documents
+        cls.__METADATA_INDEX = metadata_index
+        log_event(
+            "rag_training_finished",
+            backend=backend,
+            documents=len(documents),
+            duration_ms=int((time.perf_counter() - start) * 1000),
+        )
+
+    def get_vector_store(self) -> VectorStore:
         return self.__VECTOR_STORE
 
-    def get_qa_llm(self) -> ChatGoogleGenerativeAI:
+    def get_qa_llm(self) -> BaseChatModel:
         return self.__QA_LLM
 
     def get_documents(self) -> list[Document]:
-        return self.__DOCUMENTS
\ No newline at end of file
+        return self.__DOCUMENTS
+
+    def get_metadata_index(self) -> MetadataIndex:
+        return self.__METADATA_INDEX
\ No newline at end of file
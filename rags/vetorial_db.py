@@ -1,18 +1,37 @@
+from __future__ import annotations
+
 from utils import get_env_var
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_community.vectorstores import FAISS, Chroma
+from langchain_core.embeddings import Embeddings
 from langchain_community.vectorstores.utils import filter_complex_metadata
-from langchain_pinecone import Pinecone
-from langchain_classic.storage import LocalFileStore
-from langchain_classic.embeddings import CacheBackedEmbeddings
-from pinecone import ServerlessSpec, Pinecone as PineconeClient
 from langchain_classic.schema import Document
+from typing import TYPE_CHECKING
 import os
 import shutil
-import faiss
 
+# Os backends (faiss, chromadb, pinecone) são importados só quando usados: cada um custa
+# centenas de milissegundos no cold start da API, que usa apenas o Chroma.
+if TYPE_CHECKING:
+    from langchain_classic.embeddings import CacheBackedEmbeddings
+    from langchain_community.vectorstores import FAISS, Chroma
+    from langchain_pinecone import Pinecone
+
+
+def document_ids(documents: list[Document]) -> list[str] | None:
+    """
+    Ids dos documentos para o vector store: o `chunk_id` estável do chunking por tokens, que
+    faz a reindexação do mesmo corpus substituir os trechos em vez de duplicá-los. Sem ids em
+    todos os documentos (ex.: splitter por caracteres, resumos do LLM) ou com ids repetidos,
+    retorna None e o vector store gera ids aleatórios.
+    """
+
+    ids = [document.id for document in documents]
+    if not all(ids) or len(set(ids)) != len(ids):
+        return None
+
+    return ids
 
-def results_by_cache(embeddings: GoogleGenerativeAIEmbeddings) -> CacheBackedEmbeddings:
+
+def results_by_cache(embeddings: Embeddings) -> CacheBackedEmbeddings:
     """
     Cria um cache persistente de embeddings para acelerar consultas.
 
@@ -23,6 +42,9 @@ def results_by_cache(embeddings: GoogleGenerativeAIEmbeddings) -> CacheBackedEmb
         Wrapper com cache persistente para reutilizar vetores já calculados.
     """
 
+    from langchain_classic.storage import LocalFileStore
+    from langchain_classic.embeddings import CacheBackedEmbeddings
+
     # Pasta local para persistir vetores (reduz custo e latência).
     store = LocalFileStore("./embeddings_cache")
     cached_embeddings: CacheBackedEmbeddings = CacheBackedEmbeddings.from_bytes_store(
@@ -34,7 +56,7 @@ def results_by_cache(embeddings: GoogleGenerativeAIEmbeddings) -> CacheBackedEmb
     return cached_embeddings
 
 
-def results_by_faissdb(company_documents: list[Document], embeddings: GoogleGenerativeAIEmbeddings) -> FAISS:
+def results_by_faissdb(company_documents: list[Document], embeddings: Embeddings) -> FAISS:
     """
     Cria um índice FAISS local a partir de documentos.
 
@@ -46,6 +68,9 @@ def results_by_faissdb(company_documents: list[Document], embeddings: GoogleGene
         Índice FAISS pronto para busca por similaridade.
     """
 
+    from langchain_community.vectorstores import FAISS
+    import faiss
+
     # Remove metadados complexos que o FAISS não consegue serializar.
     filtered_documents = filter_complex_metadata(company_documents)
 
@@ -55,13 +80,13 @@ def results_by_faissdb(company_documents: list[Document], embeddings: GoogleGene
     faiss.IndexHNSWFlat(dimension, neighbors)  # Instancia HNSW (aproximado e rápido).
 
     # Cria índice FAISS e persiste localmente para reuso.
-    vector_store = FAISS.from_documents(filtered_documents, embedding=embeddings)
+    vector_store = FAISS.from_documents(filtered_documents, embedding=embeddings, ids=document_ids(filtered_documents))
     vector_store.save_local("faiss_index")
 
     return vector_store
 
 
-def results_by_chromadb(company_documents: list[Document], embeddings: GoogleGenerativeAIEmbeddings) -> Chroma:
+def results_by_chromadb(company_documents: list[Document], embeddings: Embeddings) -> Chroma:
     """
     Cria (ou recria) um índice ChromaDB persistente.
 
@@ -73,6 +98,8 @@ def results_by_chromadb(company_documents: list[Document], embeddings: GoogleGen
         Repositório Chroma pronto para busca e persistência em disco.
     """
 
+    from langchain_community.vectorstores import Chroma
+
     # Remove metadados complexos para garantir serialização correta.
     filtered_documents = filter_complex_metadata(company_documents)
 
@@ -84,12 +111,17 @@ def results_by_chromadb(company_documents: list[Document], embeddings: GoogleGen
         shutil.rmtree(persist_directory)
 
     # Cria e persiste o índice localmente.
-    vector_store = Chroma.from_documents(filtered_documents, embeddings, persist_directory=persist_directory)
+    vector_store = Chroma.from_documents(
+        filtered_documents,
+        embeddings,
+        ids=document_ids(filtered_documents),
+        persist_directory=persist_directory
+    )
 
     return vector_store
 
 
-def results_by_pinecone(company_documents: list[Document], embeddings: GoogleGenerativeAIEmbeddings) -> Pinecone:
+def results_by_pinecone(company_documents: list[Document], embeddings: Embeddings) -> Pinecone:
     """
     Cria e popula um índice Pinecone gerenciado (SaaS).
 
@@ -101,6 +133,9 @@ def results_by_pinecone(company_documents: list[Document], embeddings: GoogleGen
         Repositório Pinecone pronto para busca por similaridade.
     """
 
+    from langchain_pinecone import Pinecone
+    from pinecone import ServerlessSpec, Pinecone as PineconeClient
+
     # Remove metadados complexos que o Pinecone não suporta.
     filtered_documents = filter_complex_metadata(company_documents)
 
@@ -136,6 +171,7 @@ def results_by_pinecone(company_documents: list[Document], embeddings: GoogleGen
         documents=filtered_documents,
         embedding=embeddings,
         index_name=index_name,
+        ids=document_ids(filtered_documents),
     )
     print(f"Documentos inseridos no índice '{index_name}' com sucesso.")
 
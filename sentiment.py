@@ -0,0 +1,134 @@
+from rags.local_embeddings import TOKEN_PATTERN, normalize_text
+from collections import OrderedDict
+from utils import get_env_var
+import threading
+
+
+NEUTRAL = "neutral"
+
+# Termos (já normalizados: minúsculos e sem acentos) que indicam cada perfil. Termos de uma
+# palavra casam como prefixo, então "frustr" cobre "frustrado" e "frustrante". Palavras comuns
+# em perguntas sobre os dados ("erro padrao", "demora media") só entram como expressão.
+LEXICON: dict[str, list[str]] = {
+    "negative": [
+        "nao funciona", "nao consigo", "nao deu certo", "deu erro", "dando erro", "so da erro", "pessim",
+        "horrivel", "ruim", "frustr", "irritad", "raiva", "absurdo", "decepcion", "odeio", "lixo",
+        "muita demora", "demorando muito", "travou", "inutil", "cansad", "chatead", ":(",
+    ],
+    "positive": [
+        "obrigad", "otimo", "excelente", "perfeito", "adorei", "gostei", "legal", "show", "maravilh",
+        "parabens", "valeu", "incrivel", ":)", ":d",
+    ],
+    "expert": [
+        "embedding", "vetorial", "hnsw", "faiss", "bm25", "rerank", "latencia", "p95", "p99", "desvio padrao",
+        "regressao", "pearson", "spearman", "quantil", "percentil", "dtype", "groupby", "pandas", "numpy",
+        "kernel", "gradiente", "cosseno", "tokeniz", "hiperparametro", "overfitting", "intervalo de confianca",
+    ],
+    "beginner": [
+        "sou iniciante", "iniciante", "nao entendo", "nao entendi", "leigo", "de forma simples", "o que significa",
+        "basico", "primeira vez", "passo a passo", "me ensina", "nunca usei", "sou novo",
+    ],
+    "baby": [
+        "tivesse 5 anos", "tivesse cinco anos", "tenho 5 anos", "crianca", "eli5", "bem simplesinho", "como se eu fosse um bebe",
+    ],
+}
+
+# Ordem de desempate quando mais de um perfil passa do limite: a frustração do usuário vem
+# primeiro, depois o nível de conhecimento (do mais simples ao mais técnico) e por fim o elogio.
+PRIORITY = ["negative", "baby", "beginner", "expert", "positive"]
+
+# Peso de cada ocorrência na pontuação. Uma palavra solta é ambígua e sozinha não passa do
+# SENTIMENT_THRESHOLD padrão; expressões e emoticons são explícitos e passam.
+WORD_WEIGHT = 0.5
+PHRASE_WEIGHT = 1.0
+
+# Termos de uma palavra indexados pelos 3 primeiros caracteres (casam como prefixo das palavras
+# da mensagem); expressões e emoticons são procurados como substring. Sem regex por termo, a
+# mensagem é percorrida uma vez só.
+_WORD_TERMS: dict[str, list[tuple[str, str]]] = {}
+_PHRASES: list[tuple[str, str]] = []
+for _label, _terms in LEXICON.items():
+    for _term in _terms:
+        if _term.isalnum():
+            _WORD_TERMS.setdefault(_term[:3], []).append((_term, _label))
+        else:
+            _PHRASES.append((f" {_term}" if _term[0].isalnum() else _term, _label))
+
+
+def score_message(text: str) -> dict[str, float]:
+    """
+    Pontuação de cada perfil em uma única mensagem (0 a 1), pelos termos do léxico encontrados
+    (WORD_WEIGHT por palavra, PHRASE_WEIGHT por expressão ou emoticon).
+    """
+
+    normalized = f" {normalize_text(text)}"
+    scores = dict.fromkeys(LEXICON, 0.0)
+
+    for word in TOKEN_PATTERN.findall(normalized):
+        for term, label in _WORD_TERMS.get(word[:3], ()):
+            if word.startswith(term):
+                scores[label] += WORD_WEIGHT
+
+    for phrase, label in _PHRASES:
+        scores[label] += PHRASE_WEIGHT * normalized.count(phrase)
+
+    return {label: min(1.0, score) for label, score in scores.items()}
+
+
+class SentimentDetector:
+    """
+    Singleton que detecta localmente o tom e o nível de conhecimento do usuário, preenchendo
+    `MainContext.sentiment` sem chamada a um LLM (um léxico consultado por prefixo de palavra,
+    na casa dos microssegundos por mensagem).
+
+    O perfil de cada sessão é suavizado por média móvel exponencial entre as mensagens, para o
+    tom acompanhar a conversa e não só a última mensagem, e fica em um cache LRU em memória.
+
+    Variáveis de ambiente:
+    - SENTIMENT_SMOOTHING: peso da mensagem atual na média móvel (padrão 0.6).
+    - SENTIMENT_THRESHOLD: pontuação mínima para um perfil ser usado (padrão 0.45: uma palavra
+      solta na mensagem, 0.6 × 0.5 = 0.3, não basta; duas palavras ou uma expressão bastam).
+    - SENTIMENT_MAX_SESSIONS: sessões mantidas no cache (padrão 10000).
+    """
+
+    __instance: "SentimentDetector" = None
+
+    def __new__(cls):
+        if cls.__instance is None:
+            cls.__instance = super(SentimentDetector, cls).__new__(cls)
+            cls.__instance.__setup()
+
+        return cls.__instance
+
+    def __setup(self) -> None:
+        self.smoothing = float(get_env_var("SENTIMENT_SMOOTHING", "0.6"))
+        self.threshold = float(get_env_var("SENTIMENT_THRESHOLD", "0.45"))
+        self.max_sessions = int(get_env_var("SENTIMENT_MAX_SESSIONS", "10000"))
+        self.__profiles: OrderedDict[str, dict[str, float]] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def update(self, session_id: str, text: str) -> str:
+        """
+        Atualiza o perfil da sessão com a nova mensagem e retorna o sentimento a usar no prompt.
+
+        Args:
+            session_id: Sessão da conversa.
+            text: Mensagem do usuário.
+
+        Returns:
+            Um dos perfis do léxico ou "neutral".
+        """
+
+        scores = score_message(text)
+
+        with self.__lock:
+            previous = self.__profiles.pop(session_id, None) or dict.fromkeys(LEXICON, 0.0)
+            profile = {
+                label: self.smoothing * scores[label] + (1 - self.smoothing) * previous[label]
+                for label in LEXICON
+            }
+            self.__profiles[session_id] = profile
+            while len(self.__profiles) > self.max_sessions:
+                self.__profiles.popitem(last=False)
+
+        return next((label for label in PRIORITY if profile[label] >= self.threshold), NEUTRAL)
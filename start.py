@@ -1,7 +1,15 @@
+from utils import get_env_var, load_environment_variables
 import uvicorn
 import logging
 
 
 if __name__ == "__main__":
+    load_environment_variables()
+
+    # Com mais de um worker, o índice do RAG e os datasets são mapeados em memória e
+    # compartilhados entre os processos (veja rags/shared_index.py e analytics/catalog.py).
+    workers = int(get_env_var("API_WORKERS", "1"))
+
     print("Iniciando API de desenvolvimento")
-    uvicorn.run("api.main:app", host="0.0.0.0", port=3100, workers=1, reload=True, log_level=logging.INFO)
+    # O reload do uvicorn só funciona com um único worker.
+    uvicorn.run("api.main:app", host="0.0.0.0", port=3100, workers=workers, reload=workers == 1, log_level=logging.INFO)
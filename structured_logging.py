@@ -0,0 +1,111 @@
+from logging.handlers import QueueHandler, QueueListener
+from utils import get_env_var
+import functools
+import logging
+import atexit
+import random
+import queue
+import time
+import sys
+
+try:
+    import orjson
+
+    def _dumps(payload: dict) -> str:
+        return orjson.dumps(payload, default=str).decode("utf-8")
+except ImportError:
+    import json
+
+    def _dumps(payload: dict) -> str:
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+LOGGER_NAME = "agents_poc"
+
+
+class _JsonFormatter(logging.Formatter):
+    """
+    Serializa o evento em uma linha JSON. Roda na thread de escrita, fora do event loop.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = getattr(record, "payload", None)
+        if payload is None:
+            payload = {"event": "log", "ts": int(record.created), "message": record.getMessage()}
+
+        payload.setdefault("level", record.levelname.lower())
+        return _dumps(payload)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler que apenas enfileira o registro. O `prepare` padrão formata a mensagem na
+    thread de quem chamou; aqui a formatação fica toda para a thread do QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+@functools.cache
+def _sample_rates() -> dict[str, float]:
+    """
+    Taxas de amostragem por evento, ex.: `LOG_SAMPLING=http_request=0.1,tool_called=0.5`.
+    Eventos não listados são sempre registrados.
+    """
+
+    rates = {}
+    for item in filter(None, get_env_var("LOG_SAMPLING", "").split(",")):
+        event, _, rate = item.partition("=")
+        rates[event.strip()] = float(rate)
+    return rates
+
+
+@functools.cache
+def get_logger() -> logging.Logger:
+    """
+    Logger da aplicação, com a escrita feita por uma thread em segundo plano.
+
+    Quem registra um evento só coloca o registro em uma fila em memória; a serialização
+    em JSON e a escrita em stdout acontecem no QueueListener.
+    """
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(get_env_var("LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(_JsonFormatter())
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    # Esvazia a fila antes de o processo terminar.
+    atexit.register(listener.stop)
+
+    logger.addHandler(_DeferredQueueHandler(log_queue))
+    return logger
+
+
+def log_event(event: str, level: int = logging.INFO, **fields: object) -> None:
+    """
+    Registra um evento estruturado (uma linha JSON).
+
+    Eventos com nível abaixo de WARNING respeitam a amostragem configurada em `LOG_SAMPLING`.
+
+    Args:
+        event: Nome do evento (ex.: "tool_called").
+        level: Nível de log.
+        fields: Campos adicionais do evento.
+    """
+
+    logger = get_logger()
+    if not logger.isEnabledFor(level):
+        return
+
+    if level < logging.WARNING:
+        rate = _sample_rates().get(event)
+        if rate is not None and random.random() >= rate:
+            return
+
+    logger.log(level, event, extra={"payload": {"event": event, "ts": int(time.time()), **fields}})
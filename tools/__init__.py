@@ -1,10 +1,36 @@
-from .dataframe_informations_tool import dataframe_informations_tool
-from .graph_generator_tool import graph_generator_tool
-from .statistical_summary_tool import statistical_summary_tool
-from .dataframe_python_tool import dataframe_python_tool
-from .multimodal_inputs import multimodal_inputs_tool
-from .graph_tool import graph_tool
-from .rag_tool import rag_tool
+from typing import TYPE_CHECKING
+import importlib
+
+
+# Cada ferramenta é importada no primeiro acesso (PEP 562): importar o pacote não carrega
+# pandas, o cliente MCP ou o pipeline RAG, o que reduz o cold start da API.
+_TOOL_MODULES = {
+    "dataframe_informations_tool": ".dataframe_informations_tool",
+    "graph_generator_tool": ".graph_generator_tool",
+    "statistical_summary_tool": ".statistical_summary_tool",
+    "dataframe_python_tool": ".dataframe_python_tool",
+    "multimodal_inputs_tool": ".multimodal_inputs",
+    "graph_tool": ".graph_tool",
+    "rag_tool": ".rag_tool",
+}
+
+if TYPE_CHECKING:
+    from .dataframe_informations_tool import dataframe_informations_tool
+    from .graph_generator_tool import graph_generator_tool
+    from .statistical_summary_tool import statistical_summary_tool
+    from .dataframe_python_tool import dataframe_python_tool
+    from .multimodal_inputs import multimodal_inputs_tool
+    from .graph_tool import graph_tool
+    from .rag_tool import rag_tool
+
+
+def __getattr__(name: str):
+    if name not in _TOOL_MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    tool = getattr(importlib.import_module(_TOOL_MODULES[name], __name__), name)
+    globals()[name] = tool
+    return tool
 
 
 __all__ = [
@@ -15,4 +41,4 @@ __all__ = [
     "multimodal_inputs_tool",
     "rag_tool",
     "graph_tool"
-]
\ No newline at end of file
+]
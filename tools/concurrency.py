@@ -0,0 +1,139 @@
+from concurrent.futures import ThreadPoolExecutor
+from observability import TOOL_ABANDONED, TOOL_ABANDONED_RUNNING, TOOL_QUEUE_WAIT
+from structured_logging import log_event
+from typing import Any, Callable
+from utils import get_env_var
+import contextvars
+import functools
+import threading
+import inspect
+import asyncio
+import logging
+import time
+
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+# Semáforos por event loop e ferramenta: um asyncio.Semaphore só pode ser usado no loop em que
+# foi criado. Guarda o próprio loop para descartar os semáforos de loops já fechados.
+_semaphores: dict[int, tuple[asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]]] = {}
+_semaphores_lock = threading.Lock()
+
+
+def tool_concurrency(tool_name: str) -> int:
+    """
+    Limite de execuções simultâneas da ferramenta: `TOOL_CONCURRENCY_<NOME>` ou `TOOL_CONCURRENCY_DEFAULT`.
+    """
+
+    default = get_env_var("TOOL_CONCURRENCY_DEFAULT", "4")
+    return max(1, int(get_env_var(f"TOOL_CONCURRENCY_{tool_name.upper()}", default)))
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Pool de threads exclusivo das ferramentas síncronas (`TOOLS_EXECUTOR_WORKERS`), separado do
+    executor padrão do asyncio, que continua livre para o restante da aplicação.
+    """
+
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            workers = int(get_env_var("TOOLS_EXECUTOR_WORKERS", "16"))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tool")
+
+    return _executor
+
+
+def _semaphore(tool_name: str) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    entry = _semaphores.get(id(loop))
+    if entry is None or entry[0] is not loop:
+        with _semaphores_lock:
+            for key, (other_loop, _) in list(_semaphores.items()):
+                if other_loop.is_closed():
+                    del _semaphores[key]
+            entry = _semaphores[id(loop)] = (loop, {})
+
+    semaphores = entry[1]
+    semaphore = semaphores.get(tool_name)
+    if semaphore is None:
+        semaphore = semaphores[tool_name] = asyncio.Semaphore(tool_concurrency(tool_name))
+
+    return semaphore
+
+
+def _track_abandoned(tool_name: str, future) -> None:
+    """
+    Registra uma execução cujo chamador desistiu (ex.: timeout) enquanto a thread ainda roda:
+    a thread não pode ser interrompida e segue ocupando uma vaga de `TOOL_CONCURRENCY_*` até terminar.
+    """
+
+    start = time.perf_counter()
+    TOOL_ABANDONED.inc(tool_name)
+    TOOL_ABANDONED_RUNNING.inc(tool_name)
+    log_event("tool_run_abandoned", level=logging.WARNING, tool=tool_name, concurrency=tool_concurrency(tool_name))
+
+    def finished(_) -> None:
+        TOOL_ABANDONED_RUNNING.dec(tool_name)
+        log_event("tool_run_abandoned_finished", tool=tool_name, extra_seconds=round(time.perf_counter() - start, 3))
+
+    future.add_done_callback(finished)
+
+
+def concurrency_limited(func: Callable) -> Callable:
+    """
+    Decorator (aplicado abaixo do `@tool`) que limita as execuções simultâneas de uma ferramenta.
+
+    Ferramentas síncronas viram corrotinas que rodam no pool de threads das ferramentas, fora do
+    event loop; as assíncronas continuam no loop, só passando pelo semáforo. Assinatura, docstring
+    e anotações (inclusive o `ToolRuntime`) são preservadas para o `@tool`.
+    """
+
+    tool_name = func.__name__
+
+    async def acquire() -> asyncio.Semaphore:
+        semaphore = _semaphore(tool_name)
+        start = time.perf_counter()
+        await semaphore.acquire()
+        TOOL_QUEUE_WAIT.observe(time.perf_counter() - start, tool_name)
+        return semaphore
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            semaphore = await acquire()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                semaphore.release()
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    async def sync_wrapper(*args: Any, **kwargs: Any) -> Any:
+        semaphore = await acquire()
+        loop = asyncio.get_running_loop()
+
+        def release(_) -> None:
+            try:
+                loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:
+                pass  # Loop já encerrado.
+
+        # O contexto é copiado para a thread: spans e callbacks continuam aninhados na chamada.
+        context = contextvars.copy_context()
+        future = get_executor().submit(context.run, func, *args, **kwargs)
+        # A vaga só é liberada quando a thread termina, mesmo se quem espera for cancelado
+        # (ex.: timeout), para o limite valer para o trabalho que de fato está rodando.
+        future.add_done_callback(release)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # Ainda na fila, a execução é cancelada; já rodando, segue até o fim e fica registrada.
+            if not future.cancel() and not future.done():
+                _track_abandoned(tool_name, future)
+            raise
+
+    return sync_wrapper
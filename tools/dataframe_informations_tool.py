@@ -3,11 +3,13 @@ from langchain.tools import tool, ToolRuntime
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
 from dtos import MainContext, QuestionInputDTO
-from langchain_groq import ChatGroq
-import pandas as pd
+from providers import chat_model
+from structured_logging import log_event
+from tools.concurrency import concurrency_limited
 
 
 @tool(args_schema=QuestionInputDTO)
+@concurrency_limited
 def dataframe_informations_tool(question: str, runtime: ToolRuntime[MainContext]) -> str:
     """
     Utilize esta ferramenta sempre que o usuário solicitar informações gerais
@@ -20,25 +22,41 @@ def dataframe_informations_tool(question: str, runtime: ToolRuntime[MainContext]
         runtime: O contexto de execução da ferramenta, fornecido pelo agente.
     """
 
-    print(f"Entrei na ferramenta 'dataframe_informations_tool' com a pergunta: \"{question}\"")
+    log_event("tool_called", tool="dataframe_informations_tool", question=question)
+
+    # pandas/pyarrow só carregam quando uma ferramenta de dados é usada.
+    from analytics.profiling import profile_dataset, should_stream
+    from analytics.catalog import DatasetCatalog
 
     context = runtime.context
 
     GROQ_API_KEY = get_env_var('GROQ_API_KEY')
 
-    df = pd.read_csv('./assets/dados_entregas.csv')
-
-    llm = ChatGroq(
+    llm = chat_model(
+        "groq:llama-3.3-70b-versatile",
+        role="data_analysis",
         temperature=0,
-        groq_api_key=GROQ_API_KEY,
-        model='llama-3.3-70b-versatile'
+        api_key=GROQ_API_KEY
     )
 
-    shape = df.shape
-    columns = df.dtypes
-    nulls = df.isnull().sum()
-    nulls_str = df.apply(lambda col: col[~col.isna()].astype(str).str.strip().str.lower().eq("nan").sum())
-    duplicates = df.duplicated().sum()
+    # Arquivos grandes são perfilados em streaming (duplicados estimados por hash), sem carregar tudo em memória.
+    catalog = DatasetCatalog()
+    dataset_path = catalog.path(context.dataset_id)
+
+    if should_stream(dataset_path):
+        profile = profile_dataset(dataset_path)
+        shape = profile.shape
+        columns = profile.dtypes()
+        nulls = profile.nulls()
+        nulls_str = profile.nan_strings()
+        duplicates = profile.duplicates()
+    else:
+        df = catalog.get_frame(context.dataset_id)
+        shape = df.shape
+        columns = df.dtypes
+        nulls = df.isnull().sum()
+        nulls_str = df.apply(lambda col: col[~col.isna()].astype(str).str.strip().str.lower().eq("nan").sum())
+        duplicates = df.duplicated().sum()
 
     prompt = get_prompt('exploratoria.prompt.md')
 
@@ -1,11 +1,17 @@
-from langchain_experimental.tools import PythonAstREPLTool
+from utils import get_prompt, get_env_var
 from langchain.tools import tool, ToolRuntime
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
+from providers import chat_model
 from dtos import MainContext, QuestionInputDTO
-import pandas as pd
+from tools.sandbox import SandboxPool, SandboxError
+from structured_logging import log_event
+from tools.concurrency import concurrency_limited
 
 
 @tool(args_schema=QuestionInputDTO)
-def dataframe_python_tool(question: str, runtime: ToolRuntime[MainContext]) -> PythonAstREPLTool:
+@concurrency_limited
+def dataframe_python_tool(question: str, runtime: ToolRuntime[MainContext]) -> str:
     """
     Utilize esta ferramenta sempre que o usuário solicitar cálculos,
     consultas ou transformações específicas usando Python diretamente
@@ -14,12 +20,64 @@ def dataframe_python_tool(question: str, runtime: ToolRuntime[MainContext]) -> P
     Evite utilizar esta ferramenta para solicitações mais amplas ou descritivas,
     como informações gerais sobre o DataFrame, resumos estatísticos completos
     ou geração de gráficos — nesses casos, use as ferramentas apropriadas.
+
+    Args:
+        question: A pergunta do usuário que deve ser respondida com código pandas.
+        runtime: O contexto de execução da ferramenta, fornecido pelo agente.
+
+    Returns:
+        O código executado e o resultado obtido sobre o DataFrame.
     """
 
-    print(f"Entrei na ferramenta 'dataframe_python_tool' com a pergunta: \"{question}\"")
+    log_event("tool_called", tool="dataframe_python_tool", question=question)
+
+    # pandas/pyarrow só carregam quando uma ferramenta de dados é usada.
+    from analytics.catalog import DatasetCatalog
 
     context = runtime.context
 
-    df = pd.read_csv('./assets/dados_entregas.csv')
+    GROQ_API_KEY = get_env_var('GROQ_API_KEY')
+
+    catalog = DatasetCatalog()
+    dataset_path = catalog.path(context.dataset_id)
+    # Para o prompt bastam os tipos e algumas linhas de amostra.
+    df = catalog.sample(context.dataset_id, rows=5)
+
+    llm = chat_model(
+        "groq:llama-3.3-70b-versatile",
+        role="data_code",
+        temperature=0,
+        api_key=GROQ_API_KEY
+    )
+
+    columns = [f"- {col}: ({dtype})" for col, dtype in df.dtypes.items()]
+    samples = df.to_dict(orient='records')
+
+    prompt = get_prompt('python.prompt.md')
+
+    response_template = PromptTemplate(
+        template=prompt,
+        input_variables=["question", "columns", "sample"]
+    )
+
+    chain = response_template | llm | StrOutputParser()
+
+    response_code = chain.invoke(
+        {
+            "question": question,
+            "columns": "\n".join(columns),
+            "sample": samples
+        },
+        config={"configurable": {"thread_id": context.session_id}},
+        context=context
+    )
+
+    clean_code = response_code.replace("```python", "").replace("```", "").strip()
+
+    # Executa o código gerado em um worker isolado, com timeout, limite de memória e de tamanho do resultado.
+    try:
+        output = SandboxPool().run_python(clean_code, dataset_path)
+    except SandboxError as e:
+        return f"Não foi possível executar o código gerado:\n```python\n{clean_code}\n```\nErro: {e}"
 
-    return PythonAstREPLTool(locals={"df": df}).with_config({"configurable": {"thread_id": context.session_id}})
\ No newline at end of file
+    return f"Código executado:\n```python\n{clean_code}\n```\nResultado:\n{output}"
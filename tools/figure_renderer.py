@@ -0,0 +1,109 @@
+from rags.local_embeddings import normalize_text
+from tools.sandbox import SandboxPool
+from utils import get_env_var
+from pathlib import Path
+import hashlib
+import os
+
+
+def dataset_version(dataset_path: str) -> str:
+    """
+    Versão do dataset derivada do tamanho e da data de modificação do arquivo.
+
+    Args:
+        dataset_path: Caminho do arquivo do dataset.
+
+    Returns:
+        String que muda sempre que o arquivo é alterado.
+    """
+
+    stat = os.stat(dataset_path)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def figure_cache_key(code: str, version: str) -> str:
+    """
+    Chave do cache de figuras: hash do código gerado + versão do dataset.
+    """
+
+    return hashlib.sha256(f"{version}\n{code}".encode("utf-8")).hexdigest()
+
+
+def question_cache_key(question: str, dataset_path: str, version: str) -> str:
+    """
+    Chave do cache de perguntas: pergunta normalizada (minúsculas, sem acentos, espaços e
+    pontuação final) + dataset e sua versão.
+    """
+
+    normalized = " ".join(normalize_text(question).split()).rstrip(" ?.!")
+    return hashlib.sha256(f"{os.path.realpath(dataset_path)}\n{version}\n{normalized}".encode("utf-8")).hexdigest()
+
+
+def _cache_dir() -> Path:
+    cache_dir = Path(get_env_var("FIGURES_DIR", "./figures_cache"))
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+
+def cached_figure_for_question(question: str, dataset_path: str) -> Path | None:
+    """
+    Figura já gerada para a mesma pergunta sobre a mesma versão do dataset, consultada antes
+    da chamada ao LLM que gera o código.
+
+    Returns:
+        Caminho do PNG, ou None se a pergunta ainda não foi respondida (ou a figura saiu do disco).
+    """
+
+    cache_dir = _cache_dir()
+    reference = cache_dir / f"{question_cache_key(question, dataset_path, dataset_version(dataset_path))}.ref"
+    try:
+        figure_path = cache_dir / reference.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+
+    return figure_path if figure_path.exists() else None
+
+
+def remember_question(question: str, dataset_path: str, figure_path: Path) -> None:
+    """
+    Associa a pergunta (normalizada) à figura gerada, para `cached_figure_for_question`.
+    """
+
+    cache_dir = _cache_dir()
+    reference = cache_dir / f"{question_cache_key(question, dataset_path, dataset_version(dataset_path))}.ref"
+    tmp_path = reference.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_text(figure_path.name, encoding="utf-8")
+    os.replace(tmp_path, reference)
+
+
+def render_figure(code: str, dataset_path: str) -> Path:
+    """
+    Renderiza o código de plotagem nos workers do sandbox e salva o PNG em disco.
+
+    Figuras já renderizadas para o mesmo código e a mesma versão do dataset são
+    reaproveitadas do cache sem executar nada.
+
+    Args:
+        code: Código Python gerado pela LLM para plotar o gráfico.
+        dataset_path: Caminho do dataset exposto como `df` para o código.
+
+    Returns:
+        Caminho do arquivo PNG gerado.
+    """
+
+    cache_dir = _cache_dir()
+
+    version = dataset_version(dataset_path)
+    figure_path = cache_dir / f"{figure_cache_key(code, version)}.png"
+    if figure_path.exists():
+        return figure_path
+
+    dpi = int(get_env_var("FIGURE_DPI", "100"))
+    png = SandboxPool().render_figure(code, dataset_path, dpi=dpi)
+
+    # Escrita atômica para que leitores concorrentes nunca vejam um PNG parcial.
+    tmp_path = figure_path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_bytes(png)
+    os.replace(tmp_path, figure_path)
+
+    return figure_path
@@ -2,15 +2,17 @@ from utils import get_prompt, get_env_var
 from langchain.tools import tool, ToolRuntime
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
-from langchain_groq import ChatGroq
+from providers import chat_model
 from dtos import MainContext, QuestionInputDTO
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pandas as pd
+from tools.figure_renderer import cached_figure_for_question, remember_question, render_figure
+from tools.sandbox import SandboxError
+from structured_logging import log_event
+from tools.concurrency import concurrency_limited
 
 
 @tool(args_schema=QuestionInputDTO)
-def graph_generator_tool(question: str, runtime: ToolRuntime[MainContext]) -> plt.Figure:
+@concurrency_limited
+def graph_generator_tool(question: str, runtime: ToolRuntime[MainContext]) -> str:
     """
     Utilize esta ferramenta sempre que o usuário solicitar um gráfico a partir
     de um DataFrame pandas (`df`) com base em uma instrução do usuário. A instrução
@@ -31,24 +33,41 @@ def graph_generator_tool(question: str, runtime: ToolRuntime[MainContext]) -> pl
 
     Args:
         question: A pergunta do usuário relacionada à geração de gráficos a partir do DataFrame.
+
+    Returns:
+        O caminho do arquivo PNG com o gráfico gerado.
     """
 
-    print(f"Entrei na ferramenta 'graph_generator_tool' com a pergunta: \"{question}\"")
+    log_event("tool_called", tool="graph_generator_tool", question=question)
+
+    # pandas/pyarrow só carregam quando uma ferramenta de dados é usada.
+    from analytics.catalog import DatasetCatalog
 
     context = runtime.context
 
     GROQ_API_KEY = get_env_var('GROQ_API_KEY')
 
-    df = pd.read_csv('./assets/dados_entregas.csv')
+    catalog = DatasetCatalog()
+    dataset_path = catalog.path(context.dataset_id)
+
+    # A mesma pergunta sobre a mesma versão do dataset reaproveita a figura sem chamar o LLM;
+    # o cache por código (em `render_figure`) só evita a renderização.
+    cached_path = cached_figure_for_question(question, dataset_path)
+    if cached_path is not None:
+        return f"Gráfico gerado em: {cached_path.as_posix()}"
 
-    llm = ChatGroq(
+    # Para o prompt bastam os tipos e algumas linhas de amostra.
+    df = catalog.sample(context.dataset_id, rows=20)
+
+    llm = chat_model(
+        "groq:llama-3.3-70b-versatile",
+        role="data_code",
         temperature=0,
-        groq_api_key=GROQ_API_KEY,
-        model='llama-3.3-70b-versatile'
+        api_key=GROQ_API_KEY
     )
 
     columns = [f"- {col}: ({dtype})" for col, dtype in df.dtypes.items()]
-    samples = df.head(20).to_dict(orient='records')
+    samples = df.to_dict(orient='records')
 
     prompt = get_prompt('visual.prompt.md')
 
@@ -71,10 +90,11 @@ def graph_generator_tool(question: str, runtime: ToolRuntime[MainContext]) -> pl
 
     clean_code = response_code.replace("```python", "").replace("```", "").strip()
 
-    exec_globals = {"df": df, "plt": plt, "sns": sns}
-    exec_locals = {}
-    exec(clean_code, exec_globals, exec_locals)
-
-    fig = plt.gcf()  # Get the current figure after executing the code
+    # Renderiza nos workers do sandbox, com backend Agg e figura própria por tarefa.
+    try:
+        figure_path = render_figure(clean_code, dataset_path)
+    except SandboxError as e:
+        return f"Não foi possível gerar o gráfico: {e}"
 
-    return fig
\ No newline at end of file
+    remember_question(question, dataset_path, figure_path)
+    return f"Gráfico gerado em: {figure_path.as_posix()}"
\ No newline at end of file
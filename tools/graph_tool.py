@@ -1,14 +1,20 @@
-from langchain_mcp_adapters.client import MultiServerMCPClient
 from langgraph.graph import StateGraph, START, END, add_messages
+from langgraph.graph.state import CompiledStateGraph
+from langgraph.pregel.main import BaseCheckpointSaver
 from langgraph.graph.state import RunnableConfig
 from langgraph.prebuilt.tool_node import ToolNode, tools_condition
 from langchain.tools import tool, ToolRuntime
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
-from langchain.chat_models import init_chat_model
+from providers import chat_model
 from enum import Enum
 from dtos import MainContext, QuestionInputDTO
+from tools.mcp_session import MCPSessionManager, RECONNECT_ERRORS
 from typing import TypedDict, Annotated, Sequence
-from rich import print
+from structured_logging import log_event
+from tools.concurrency import concurrency_limited
+import threading
+import logging
+import uuid
 
 
 class GraphType(Enum):
@@ -22,6 +28,32 @@ class ToolState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
 
 
+MATH_SYSTEM_PROMPT = """
+    Você é um assistente matemático. Após executar as ferramentas matemáticas,
+    SEMPRE responda com o resultado em linguagem natural, dizendo apenas o número
+    resultado sem explicações adicionais.
+
+    Ferramentas Disponíveis:
+        - multiply_subtool: Multiplica dois números.
+        - add_subtool: Soma dois números.
+        - subtract_subtool: Subtrai dois números.
+        - divide_subtool: Divide dois números.
+        - batch_subtool: Aplica soma, subtração, multiplicação ou divisão elemento a elemento em listas de números.
+        - evaluate_expression_subtool: Avalia uma expressão aritmética completa (com listas) em uma única chamada.
+
+    Prefira batch_subtool ou evaluate_expression_subtool quando a conta tiver várias etapas
+    ou vários valores, resolvendo tudo em uma única chamada de ferramenta.
+"""
+
+# Grafo compilado reutilizado entre chamadas, junto com a chave (versão das ferramentas, checkpointer)
+# usada para compilá-lo. Só é recompilado quando a sessão MCP é reaberta ou o checkpointer muda.
+_compiled_graph: CompiledStateGraph | None = None
+_compiled_key: tuple[int, int] | None = None
+# Lock de thread, não de event loop: a compilação é síncrona e o grafo é compartilhado por
+# loops diferentes (API, `asyncio.run` do chat.py, benchmarks).
+_compile_lock = threading.Lock()
+
+
 def create_call_llm_node(tools: list):
     """
     Factory function que cria o nó call_llm com as ferramentas.
@@ -33,59 +65,33 @@ def create_call_llm_node(tools: list):
         Função que executa o nó call_llm com as ferramentas fornecidas.
     """
 
-    def call_llm(state: ToolState) -> ToolState:
+    # O modelo e o bind das ferramentas são feitos uma única vez, e não a cada iteração do loop.
+    llm = chat_model("google_genai:gemini-2.5-flash-lite", role="math")
+    llm_with_tools = llm.bind_tools(tools)
+
+    async def call_llm(state: ToolState) -> ToolState:
         """
-        Node que carrega a llm com as ferramentas matemáticas.
+        Node que chama a llm com as ferramentas matemáticas.
         """
 
-        llm = init_chat_model(model="google_genai:gemini-2.5-flash-lite")
-        llm_with_tools = llm.bind_tools(tools)
-        llm_result = llm_with_tools.invoke(state["messages"])
+        llm_result = await llm_with_tools.ainvoke(state["messages"])
         return ToolState(messages=[llm_result])
 
     return call_llm
 
 
-@tool(args_schema=QuestionInputDTO)
-async def graph_tool(question: str, runtime: ToolRuntime[MainContext]) -> str:
+def build_math_graph(tools: list, checkpointer: BaseCheckpointSaver | None) -> CompiledStateGraph:
     """
-    Utilize esta ferramenta SEMPRE que o usuário pedir alguma conta matemática básica como
-    soma, multiplicação, divisão ou subtração.
+    Monta e compila o grafo call_llm <-> tools com as ferramentas do servidor MCP.
 
     Args:
-        question: A pergunta do usuário relacionada a operações matemáticas básicas.
-        runtime: O contexto de execução da ferramenta, fornecido pelo agente.
+        tools: Lista de ferramentas MCP.
+        checkpointer: Checkpointer usado para persistir o estado do subgrafo.
 
     Returns:
-        A resposta gerada pelo modelo de linguagem após processar a pergunta do usuário.
-
-    Ferramentas Disponíveis:
-        - multiply_subtool: Multiplica dois números.
-        - add_subtool: Soma dois números.
-        - subtract_subtool: Subtrai dois números.
-        - divide_subtool: Divide dois números.
+        Grafo compilado pronto para execução.
     """
 
-    print(f"Entrei na ferramenta 'graph_tool' com a pergunta: \"{question}\"")
-
-    context = runtime.context
-
-    client = MultiServerMCPClient(
-        {
-            # "math": {
-            #     "command": "python",
-            #     "args": ["mcp-server/server.py"],
-            #     "transport": "stdio",
-            # }
-            "math": {
-                "url": "http://localhost:8000/sse",
-                "transport": "sse",
-            }
-        }
-    )
-
-    tools = await client.get_tools()
-
     builder = StateGraph(ToolState, context_schema=MainContext)
 
     # Criar o nó call_llm com as ferramentas
@@ -106,31 +112,95 @@ async def graph_tool(question: str, runtime: ToolRuntime[MainContext]) -> str:
     # até o condition cair em __end__
     builder.add_edge(GraphType.TOOL_NODE.value, GraphType.CALL_LLM.value)
 
-    graph = builder.compile(checkpointer=runtime.context.checkpointer)
+    return builder.compile(checkpointer=checkpointer)
+
+
+async def get_math_graph(checkpointer: BaseCheckpointSaver | None) -> CompiledStateGraph:
+    """
+    Retorna o grafo matemático compilado, reaproveitando-o enquanto as ferramentas MCP e o
+    checkpointer forem os mesmos.
+
+    Args:
+        checkpointer: Checkpointer usado para persistir o estado do subgrafo.
+
+    Returns:
+        Grafo compilado pronto para execução.
+    """
+
+    global _compiled_graph, _compiled_key
+
+    manager = MCPSessionManager()
+    tools = await manager.get_tools()
+    key = (manager.version, id(checkpointer))
+
+    if _compiled_key == key:
+        return _compiled_graph
+
+    with _compile_lock:
+        if _compiled_key != key:
+            log_event("graph_compiled", tool="graph_tool")
+            _compiled_graph = build_math_graph(tools, checkpointer)
+            _compiled_key = key
+
+    return _compiled_graph
+
+
+async def warmup_graph_tool(checkpointer: BaseCheckpointSaver | None) -> None:
+    """
+    Abre a sessão MCP e compila o grafo antecipadamente, tirando esse custo da primeira pergunta.
+
+    Args:
+        checkpointer: Checkpointer que será usado pelo subgrafo.
+    """
+
+    await get_math_graph(checkpointer)
+
+
+@tool(args_schema=QuestionInputDTO)
+@concurrency_limited
+async def graph_tool(question: str, runtime: ToolRuntime[MainContext]) -> str:
+    """
+    Utilize esta ferramenta SEMPRE que o usuário pedir alguma conta matemática básica como
+    soma, multiplicação, divisão ou subtração, inclusive contas com várias etapas ou listas de valores.
+
+    Args:
+        question: A pergunta do usuário relacionada a operações matemáticas básicas.
+        runtime: O contexto de execução da ferramenta, fornecido pelo agente.
+
+    Returns:
+        A resposta gerada pelo modelo de linguagem após processar a pergunta do usuário.
+
+    Ferramentas Disponíveis:
+        - multiply_subtool: Multiplica dois números.
+        - add_subtool: Soma dois números.
+        - subtract_subtool: Subtrai dois números.
+        - divide_subtool: Divide dois números.
+        - batch_subtool: Aplica uma operação elemento a elemento em listas de números.
+        - evaluate_expression_subtool: Avalia uma expressão aritmética completa em uma única chamada.
+    """
+
+    log_event("tool_called", tool="graph_tool", question=question)
+
+    context = runtime.context
 
     # Usar thread_id isolado para evitar conflito de estrutura com o agente principal
-    config = RunnableConfig(
-        configurable={"thread_id": f"graph_tool_{context.session_id}"}
-    )
-
-    result = await graph.ainvoke(
-        {"messages": [
-            SystemMessage(content="""
-                Você é um assistente matemático. Após executar as ferramentas matemáticas,
-                SEMPRE responda com o resultado em linguagem natural, dizendo apenas o número
-                resultado sem explicações adicionais.
-
-                Ferramentas Disponíveis:
-                    - multiply_subtool: Multiplica dois números.
-                    - add_subtool: Soma dois números.
-                    - subtract_subtool: Subtrai dois números.
-                    - divide_subtool: Divide dois números.
-            """),
-            HumanMessage(question)
-        ]},
-        config=config,
-        context=context
-    )
+    thread_id = f"graph_tool_{context.session_id}"
+    config = RunnableConfig(configurable={"thread_id": thread_id})
+
+    messages = {"messages": [SystemMessage(content=MATH_SYSTEM_PROMPT), HumanMessage(question)]}
+
+    try:
+        graph = await get_math_graph(context.checkpointer)
+        result = await graph.ainvoke(messages, config=config, context=context)
+    except RECONNECT_ERRORS as e:
+        # A sessão SSE caiu: reabre a conexão, recompila o grafo e tenta novamente uma única vez.
+        log_event("mcp_reconnect", level=logging.WARNING, tool="graph_tool", reason=repr(e))
+        await MCPSessionManager().reconnect()
+        graph = await get_math_graph(context.checkpointer)
+        # A tentativa que falhou já gravou a pergunta na subthread: a nova roda em uma subthread
+        # própria (mesmo prefixo, então a retenção a poda) para não duplicar a mensagem.
+        retry_config = RunnableConfig(configurable={"thread_id": f"{thread_id}_retry_{uuid.uuid4().hex[:8]}"})
+        result = await graph.ainvoke(messages, config=retry_config, context=context)
 
     last_message = result["messages"][-1]
     answer = last_message.content if result["messages"] else "Desculpe, não consegui gerar uma resposta."
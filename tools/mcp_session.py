@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+from langchain_core.tools import BaseTool
+from utils import get_env_var
+from structured_logging import log_event
+from typing import TYPE_CHECKING
+import asyncio
+import httpx
+import anyio
+import time
+
+# O cliente MCP (e o SDK mcp) só é importado quando a primeira sessão é criada.
+if TYPE_CHECKING:
+    from langchain_mcp_adapters.client import MultiServerMCPClient
+    from mcp import ClientSession
+
+
+# Erros que indicam que a sessão SSE caiu e precisa ser reaberta.
+RECONNECT_ERRORS = (
+    ConnectionError,
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+    httpx.TransportError,
+)
+
+
+def get_mcp_connections() -> dict[str, dict]:
+    """
+    Configuração dos servidores MCP utilizados pelas ferramentas.
+
+    Returns:
+        Dicionário no formato esperado pelo MultiServerMCPClient.
+    """
+
+    return {
+        # "math": {
+        #     "command": "python",
+        #     "args": ["mcp-server/server.py"],
+        #     "transport": "stdio",
+        # }
+        "math": {
+            "url": get_env_var("MCP_MATH_URL", "http://localhost:8000/sse"),
+            "transport": "sse",
+        }
+    }
+
+
+class _ServerSession:
+    """
+    Mantém uma sessão MCP aberta com um único servidor.
+
+    A sessão é aberta e fechada dentro de uma task dedicada, pois os context managers
+    do cliente MCP (anyio) precisam ser encerrados na mesma task em que foram abertos.
+    """
+
+    def __init__(self, client: MultiServerMCPClient, server_name: str) -> None:
+        self.__client = client
+        self.__server_name = server_name
+        self.__session: ClientSession | None = None
+        self.__task: asyncio.Task | None = None
+        self.__ready: asyncio.Event | None = None
+        self.__closing: asyncio.Event | None = None
+        self.__error: BaseException | None = None
+
+    @property
+    def is_alive(self) -> bool:
+        return self.__session is not None and self.__task is not None and not self.__task.done()
+
+    async def __run(self) -> None:
+        """
+        Task dona da sessão: abre a conexão, sinaliza que está pronta e aguarda o encerramento.
+        """
+
+        try:
+            async with self.__client.session(self.__server_name) as session:
+                self.__session = session
+                self.__ready.set()
+                await self.__closing.wait()
+        except Exception as e:
+            self.__error = e
+        finally:
+            self.__session = None
+            self.__ready.set()
+
+    async def get(self) -> ClientSession:
+        """
+        Retorna a sessão aberta, (re)conectando caso necessário.
+
+        Raises:
+            ConnectionError: quando não for possível abrir a sessão com o servidor.
+        """
+
+        if not self.is_alive:
+            if self.__task is not None and not self.__task.done():
+                # Task ainda abrindo a conexão em outra corrotina.
+                await self.__ready.wait()
+            else:
+                log_event("mcp_session_opened", server=self.__server_name)
+                self.__error = None
+                self.__ready = asyncio.Event()
+                self.__closing = asyncio.Event()
+                self.__task = asyncio.create_task(self.__run())
+                await self.__ready.wait()
+
+        if self.__session is None:
+            raise ConnectionError(f"Não foi possível conectar ao servidor MCP '{self.__server_name}': {self.__error}")
+
+        return self.__session
+
+    async def close(self) -> None:
+        """
+        Encerra a sessão e aguarda a task dona finalizar.
+        """
+
+        if self.__task is None:
+            return
+
+        if not self.__task.done():
+            self.__closing.set()
+            try:
+                await self.__task
+            except Exception:
+                pass
+
+        self.__task = None
+        self.__session = None
+
+
+class MCPSessionManager:
+    """
+    Singleton que mantém uma sessão MCP "quente" por servidor e um cache da lista de ferramentas.
+
+    A lista de ferramentas é recarregada a cada `MCP_TOOLS_REFRESH_SECONDS` segundos e a
+    versão só muda quando a sessão é reaberta ou o conjunto de ferramentas muda, permitindo
+    que quem consome as ferramentas (ex.: grafo compilado) só seja reconstruído nesses casos.
+    """
+
+    __instance: "MCPSessionManager" = None
+
+    def __new__(cls):
+        """
+        Implementação do padrão singleton para garantir uma única sessão por servidor no processo.
+        """
+
+        if cls.__instance is None:
+            cls.__instance = super(MCPSessionManager, cls).__new__(cls)
+            cls.__instance.__setup()
+
+        return cls.__instance
+
+    def __setup(self) -> None:
+        from langchain_mcp_adapters.client import MultiServerMCPClient
+
+        self.__refresh_seconds = float(get_env_var("MCP_TOOLS_REFRESH_SECONDS", "300"))
+        self.__client = MultiServerMCPClient(get_mcp_connections())
+        self.__sessions: dict[str, _ServerSession] = {}
+        self.__loop: asyncio.AbstractEventLoop | None = None
+        self.__lock: asyncio.Lock | None = None
+        self.__tools: list[BaseTool] | None = None
+        self.__tools_loaded_at = 0.0
+        self.__version = 0
+
+    @property
+    def version(self) -> int:
+        """
+        Versão da lista de ferramentas, incrementada quando ela precisa ser revinculada.
+        """
+
+        return self.__version
+
+    def __bind_loop(self) -> None:
+        """
+        Sessões e locks pertencem a um event loop; se o loop mudou (ex.: novo asyncio.run), descarta o estado antigo.
+        """
+
+        loop = asyncio.get_running_loop()
+        if self.__loop is not loop:
+            self.__loop = loop
+            self.__lock = asyncio.Lock()
+            self.__sessions = {name: _ServerSession(self.__client, name) for name in get_mcp_connections()}
+            self.__tools = None
+
+    def __is_fresh(self) -> bool:
+        if self.__tools is None:
+            return False
+
+        if any(not session.is_alive for session in self.__sessions.values()):
+            return False
+
+        return time.monotonic() - self.__tools_loaded_at < self.__refresh_seconds
+
+    async def get_tools(self) -> list[BaseTool]:
+        """
+        Retorna as ferramentas de todos os servidores MCP, usando o cache enquanto estiver válido.
+        """
+
+        self.__bind_loop()
+
+        if self.__is_fresh():
+            return self.__tools
+
+        async with self.__lock:
+            if self.__is_fresh():
+                return self.__tools
+
+            from langchain_mcp_adapters.tools import load_mcp_tools
+
+            reconnected = any(not session.is_alive for session in self.__sessions.values())
+
+            tools: list[BaseTool] = []
+            for server in self.__sessions.values():
+                session = await server.get()
+                server_tools = await load_mcp_tools(session)
+                tools.extend(server_tools)
+
+            previous_names = sorted(tool.name for tool in self.__tools or [])
+            current_names = sorted(tool.name for tool in tools)
+
+            # Com a mesma sessão e as mesmas ferramentas, os objetos antigos continuam válidos.
+            if reconnected or self.__tools is None or previous_names != current_names:
+                self.__tools = tools
+                self.__version += 1
+
+            self.__tools_loaded_at = time.monotonic()
+
+            return self.__tools
+
+    async def reconnect(self) -> None:
+        """
+        Fecha todas as sessões e invalida o cache para que a próxima chamada reconecte.
+        """
+
+        self.__bind_loop()
+
+        async with self.__lock:
+            for session in self.__sessions.values():
+                await session.close()
+
+            self.__tools = None
+
+    async def close(self) -> None:
+        """
+        Encerra as sessões abertas (usado no shutdown da aplicação).
+        """
+
+        if self.__loop is None:
+            return
+
+        for session in self.__sessions.values():
+            await session.close()
+
+        self.__tools = None
@@ -0,0 +1,334 @@
+from collections import OrderedDict
+from typing import Callable
+from utils import get_env_var
+from pathlib import Path
+from urllib.parse import urlsplit
+import ipaddress
+import threading
+import tempfile
+import time
+import hashlib
+import base64
+import math
+import io
+import os
+import socket
+
+
+# Um fetcher recebe a URL do anexo e devolve os bytes do conteúdo.
+Fetcher = Callable[[str], bytes]
+
+# Tokens cobrados pelo Gemini por bloco de imagem de até 768x768 pixels.
+TOKENS_PER_TILE = 258
+TILE_SIZE = 768
+
+
+def _check_public_url(url: str) -> None:
+    """
+    Recusa URLs que não sejam http(s) ou cujo host resolva para um endereço que não é público
+    (loopback, rede privada, link-local, metadados da nuvem, reservados): a URL do anexo vem
+    do usuário e não pode alcançar serviços internos.
+
+    Raises:
+        ValueError: Se a URL não puder ser baixada.
+    """
+
+    parsed = urlsplit(url)
+    if parsed.scheme not in {"http", "https"} or not parsed.hostname:
+        raise ValueError("URL do anexo inválida: use http ou https.")
+
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(parsed.hostname, parsed.port or 0, proto=socket.IPPROTO_TCP)}
+    except socket.gaierror:
+        raise ValueError(f"Não foi possível resolver o host do anexo: {parsed.hostname}.")
+
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%", 1)[0])
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError(f"Endereço do anexo não permitido: {parsed.hostname}.")
+
+
+def http_fetcher(url: str) -> bytes:
+    """
+    Fetcher padrão: baixa o anexo via HTTP, respeitando o tamanho máximo configurado. A URL e
+    cada redirecionamento (até `MEDIA_MAX_REDIRECTS`) passam por `_check_public_url`.
+    """
+
+    import httpx
+
+    max_bytes = int(get_env_var("MEDIA_MAX_DOWNLOAD_MB", "50")) * 1024 * 1024
+    max_redirects = int(get_env_var("MEDIA_MAX_REDIRECTS", "5"))
+
+    with httpx.Client(timeout=30.0, follow_redirects=False) as client:
+        for _ in range(max_redirects + 1):
+            _check_public_url(url)
+            with client.stream("GET", url) as response:
+                if response.is_redirect:
+                    url = str(response.url.join(response.headers["location"]))
+                    continue
+
+                response.raise_for_status()
+                content = bytearray()
+                for chunk in response.iter_bytes():
+                    content.extend(chunk)
+                    if len(content) > max_bytes:
+                        raise ValueError("Anexo excede o tamanho máximo permitido.")
+
+                return bytes(content)
+
+    raise ValueError("Anexo com redirecionamentos demais.")
+
+
+def local_file_fetcher(base_dir: str) -> Fetcher:
+    """
+    Cria um fetcher que resolve a URL como caminho relativo a `base_dir` (útil em testes e desenvolvimento).
+    """
+
+    def fetch(url: str) -> bytes:
+        name = url.split("://", 1)[-1]
+        return (Path(base_dir) / name).read_bytes()
+
+    return fetch
+
+
+class MediaPreprocessor:
+    """
+    Singleton que prepara anexos para o modelo multimodal.
+
+    O conteúdo de cada URL é reduzido para caber no orçamento de tokens configurado,
+    recomprimido em JPEG e guardado em um cache endereçado pelo hash do conteúdo (em memória
+    e em disco). Perguntas seguintes sobre o mesmo anexo não baixam nem processam nada
+    novamente enquanto a associação URL -> hash estiver válida (`MEDIA_URL_TTL_SECONDS`);
+    depois disso a URL é baixada de novo, e um conteúdo alterado gera um hash novo.
+
+    O cache em disco é podado a cada gravação: saem os anexos sem uso há mais de
+    `MEDIA_CACHE_MAX_AGE_HOURS` e, acima de `MEDIA_CACHE_DISK_MB`, os menos usados.
+    """
+
+    __instance: "MediaPreprocessor" = None
+
+    def __new__(cls):
+        """
+        Implementação do padrão singleton para compartilhar o cache no processo.
+        """
+
+        if cls.__instance is None:
+            cls.__instance = super(MediaPreprocessor, cls).__new__(cls)
+            cls.__instance.__setup()
+
+        return cls.__instance
+
+    def __setup(self) -> None:
+        self.__fetcher: Fetcher = http_fetcher
+        self.__lock = threading.Lock()
+        # URL -> (hash do conteúdo, instante em que a associação expira).
+        self.__url_hashes: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self.__url_ttl = float(get_env_var("MEDIA_URL_TTL_SECONDS", "300"))
+        self.__disk_budget = int(float(get_env_var("MEDIA_CACHE_DISK_MB", "512")) * 1024 * 1024)
+        self.__max_age = float(get_env_var("MEDIA_CACHE_MAX_AGE_HOURS", "168")) * 3600
+        self.__processed: OrderedDict[str, list[bytes]] = OrderedDict()
+        self.__max_entries = int(get_env_var("MEDIA_CACHE_ENTRIES", "256"))
+        self.__cache_dir = Path(get_env_var("MEDIA_CACHE_DIR", "./media_cache"))
+        self.__token_budget = int(get_env_var("MEDIA_IMAGE_TOKEN_BUDGET", str(TOKENS_PER_TILE)))
+        self.__jpeg_quality = int(get_env_var("MEDIA_JPEG_QUALITY", "85"))
+        self.__max_frames = int(get_env_var("MEDIA_VIDEO_MAX_FRAMES", "8"))
+
+    def set_fetcher(self, fetcher: Fetcher) -> None:
+        """
+        Substitui a forma de baixar os anexos (ex.: `local_file_fetcher` em testes).
+        """
+
+        self.__fetcher = fetcher
+
+    def __remember(self, cache: OrderedDict, key: str, value) -> None:
+        with self.__lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > self.__max_entries:
+                cache.popitem(last=False)
+
+    def __fetch(self, url: str) -> tuple[str, bytes | None]:
+        """
+        Retorna o hash do conteúdo da URL; os bytes só são baixados se a URL não foi vista
+        dentro do TTL.
+        """
+
+        with self.__lock:
+            cached = self.__url_hashes.get(url)
+
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0], None
+
+        content = self.__fetcher(url)
+        content_hash = hashlib.sha256(content).hexdigest()
+        self.__remember(self.__url_hashes, url, (content_hash, time.monotonic() + self.__url_ttl))
+        return content_hash, content
+
+    def __target_size(self, width: int, height: int) -> tuple[int, int]:
+        """
+        Maior tamanho (mantendo a proporção) cujo número de blocos de 768px cabe no orçamento de tokens.
+        """
+
+        max_tiles = max(1, self.__token_budget // TOKENS_PER_TILE)
+        scale = 1.0
+        while math.ceil(width * scale / TILE_SIZE) * math.ceil(height * scale / TILE_SIZE) > max_tiles:
+            scale *= 0.9
+
+        return max(1, int(width * scale)), max(1, int(height * scale))
+
+    def __compress(self, image) -> bytes:
+        from PIL import Image, ImageOps
+
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        target = self.__target_size(*image.size)
+        if target != image.size:
+            image = image.resize(target, Image.Resampling.LANCZOS)
+
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=self.__jpeg_quality, optimize=True)
+        return buffer.getvalue()
+
+    def __preprocess_image(self, content: bytes) -> list[bytes]:
+        from PIL import Image
+
+        return [self.__compress(Image.open(io.BytesIO(content)))]
+
+    def __preprocess_video(self, content: bytes) -> list[bytes]:
+        """
+        Amostra até `MEDIA_VIDEO_MAX_FRAMES` quadros igualmente espaçados do vídeo.
+        """
+
+        try:
+            import cv2
+        except ImportError:
+            raise ValueError("Suporte a vídeo requer o pacote opencv-python-headless.")
+
+        from PIL import Image
+
+        with tempfile.NamedTemporaryFile(suffix=".video") as video_file:
+            video_file.write(content)
+            video_file.flush()
+
+            capture = cv2.VideoCapture(video_file.name)
+            try:
+                total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+                if total <= 0:
+                    raise ValueError("Não foi possível ler os quadros do vídeo.")
+
+                count = min(self.__max_frames, total)
+                indexes = sorted({int(i * total / count) for i in range(count)})
+
+                frames: list[bytes] = []
+                for index in indexes:
+                    capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+                    ok, frame = capture.read()
+                    if ok:
+                        frames.append(self.__compress(Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))))
+            finally:
+                capture.release()
+
+        if not frames:
+            raise ValueError("Não foi possível ler os quadros do vídeo.")
+
+        return frames
+
+    def __disk_paths(self, key: str) -> list[Path]:
+        return sorted(self.__cache_dir.glob(f"{key}-*.jpg"))
+
+    def __prune_disk(self, keep: str) -> None:
+        """
+        Remove do disco os anexos expirados e, acima do orçamento, os usados há mais tempo.
+
+        O anexo recém-gravado (`keep`) fica, mas conta no orçamento. Os quadros de um mesmo
+        anexo saem juntos. A data de modificação marca o último uso (é atualizada nas leituras
+        do disco); outros processos podem estar podando ao mesmo tempo.
+        """
+
+        # Chave do anexo -> [último uso, bytes, arquivos].
+        entries: dict[str, list] = {}
+        kept_bytes = 0
+        for path in self.__cache_dir.glob("*.jpg"):
+            try:
+                info = path.stat()
+            except FileNotFoundError:
+                continue
+            key = path.stem.rsplit("-", 1)[0]
+            if key == keep:
+                kept_bytes += info.st_size
+                continue
+            entry = entries.setdefault(key, [0.0, 0, []])
+            entry[0] = max(entry[0], info.st_mtime)
+            entry[1] += info.st_size
+            entry[2].append(path)
+
+        now = time.time()
+        total = kept_bytes + sum(size for _, size, _ in entries.values())
+        for last_used, size, paths in sorted(entries.values(), key=lambda entry: entry[0]):
+            if now - last_used <= self.__max_age and total <= self.__disk_budget:
+                break
+
+            for path in paths:
+                path.unlink(missing_ok=True)
+            total -= size
+
+    def prepare(self, url: str, attachment_type: str) -> list[bytes]:
+        """
+        Prepara o anexo para envio ao modelo.
+
+        Args:
+            url: URL do anexo.
+            attachment_type: 'image' ou 'video'.
+
+        Returns:
+            Lista de imagens JPEG (uma para imagens, alguns quadros para vídeos).
+        """
+
+        content_hash, content = self.__fetch(url)
+        key = f"{content_hash}-{attachment_type}-{self.__token_budget}-{self.__jpeg_quality}-{self.__max_frames}"
+
+        with self.__lock:
+            if key in self.__processed:
+                self.__processed.move_to_end(key)
+                return self.__processed[key]
+
+        disk_paths = self.__disk_paths(key)
+        if disk_paths:
+            try:
+                images = [path.read_bytes() for path in disk_paths]
+                for path in disk_paths:
+                    os.utime(path)
+            except FileNotFoundError:
+                # Podado por outro processo durante a leitura: processa de novo.
+                images = None
+
+            if images is not None:
+                self.__remember(self.__processed, key, images)
+                return images
+
+        if content is None:
+            # A URL já foi vista, mas o resultado saiu do cache: baixa novamente.
+            content = self.__fetcher(url)
+
+        if attachment_type == "video":
+            images = self.__preprocess_video(content)
+        else:
+            images = self.__preprocess_image(content)
+
+        self.__cache_dir.mkdir(parents=True, exist_ok=True)
+        for index, image in enumerate(images):
+            path = self.__cache_dir / f"{key}-{index:03d}.jpg"
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_bytes(image)
+            os.replace(tmp_path, path)
+
+        self.__prune_disk(keep=key)
+        self.__remember(self.__processed, key, images)
+        return images
+
+
+def to_data_url(image: bytes) -> str:
+    """
+    Codifica a imagem JPEG como data URL para envio ao modelo.
+    """
+
+    return f"data:image/jpeg;base64,{base64.b64encode(image).decode('ascii')}"
@@ -1,12 +1,16 @@
 from utils import get_env_var
 from typing import Literal
 from langchain.tools import tool, ToolRuntime
-from langchain_google_genai import ChatGoogleGenerativeAI
+from providers import chat_model
 from langchain_core.messages import HumanMessage
 from dtos import MainContext, AttachmentInputDTO
+from .media_preprocessing import MediaPreprocessor, to_data_url
+from structured_logging import log_event
+from tools.concurrency import concurrency_limited
 
 
 @tool(args_schema=AttachmentInputDTO)
+@concurrency_limited
 def multimodal_inputs_tool(
     question: str,
     attachment_type: Literal["image", "video"],
@@ -33,25 +37,32 @@ def multimodal_inputs_tool(
         runtime: O contexto de execução da ferramenta, fornecido pelo agente.
     """
 
-    print(f"Entrei na ferramenta 'multimodal_inputs_tool' com a pergunta: \"{question}\"")
+    log_event("tool_called", tool="multimodal_inputs_tool", question=question)
 
     context = runtime.context
 
-    if attachment_type != "image":
-        return "No momento, esta ferramenta suporta apenas anexos de imagem."
+    try:
+        images = MediaPreprocessor().prepare(attachment_url, attachment_type)
+    except Exception as e:
+        return f"Não foi possível processar o anexo: {e}"
 
     GEMINI_API_KEY = get_env_var('GEMINI_API_KEY')
 
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash-lite",
+    llm = chat_model(
+        "google_genai:gemini-2.5-flash-lite",
+        role="multimodal",
         temperature=0,
         api_key=GEMINI_API_KEY
     )
 
+    text = question
+    if attachment_type == "video":
+        text = f"{question}\n\nAs imagens a seguir são quadros amostrados do vídeo, em ordem cronológica."
+
     message = HumanMessage(
         content=[
-            {"type": "text", "text": question},
-            {"type": "image_url", "image_url": attachment_url}
+            {"type": "text", "text": text},
+            *[{"type": "image_url", "image_url": to_data_url(image)} for image in images]
         ]
     )
 
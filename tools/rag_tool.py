@@ -1,40 +1,54 @@
 from langchain.tools import tool, ToolRuntime
-from langchain_classic.chains.history_aware_retriever import create_history_aware_retriever
 from langchain_classic.chains.retrieval import create_retrieval_chain
 from langchain_classic.chains.combine_documents import create_stuff_documents_chain
 from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+from langchain_core.runnables import RunnableLambda
 from langchain_community.retrievers import BM25Retriever
 from langchain_classic.retrievers import EnsembleRetriever
-from rags.singleton_training import RagSingletonTraining
-from dtos import QuestionInputDTO, MainContext
+from dtos import RagQuestionInputDTO, MainContext
 from utils import get_prompt
-
-
-@tool(args_schema=QuestionInputDTO)
-def rag_tool(question: str, runtime: ToolRuntime[MainContext]) -> str:
+from observability import span
+from structured_logging import log_event
+from tools.concurrency import concurrency_limited
+
+
+@tool(args_schema=RagQuestionInputDTO)
+@concurrency_limited
+def rag_tool(
+    question: str,
+    runtime: ToolRuntime[MainContext],
+    source: str | None = None,
+    page_number: int | None = None,
+    categoria: str | None = None,
+    id_produto: str | None = None,
+    data_owner: str | None = None
+) -> str:
     """
     Utilize esta ferramenta para responder perguntas usando os documentos do RAG (conteúdo de PDFs e dados).
     Perguntas referentes os tópicos: Arquitera de RAG, Armazenamento Vetorial, Embeddings,
     Pipeline de dados, Cadeias de Conversação, LLMs, Avaliação com LangSmith e RAGAS,
     Hybrid Search e técnicas Avançadas de RAG devem ser respondidas utilizando esta ferramenta,
     que tem acesso ao conteúdo dos documentos.
+
+    Quando o usuário restringir a busca a um arquivo (ex.: "na aula 3"), página, categoria,
+    produto ou área dona dos dados, informe o filtro no argumento correspondente.
     """
 
-    print(f"Entrei na ferramenta 'rag_tool' com a pergunta: \"{question}\"")
+    log_event("tool_called", tool="rag_tool", question=question)
 
-    context = runtime.context
+    # Import tardio: o pipeline RAG (Chroma, embeddings do Gemini) só carrega na primeira pergunta.
+    from rags.singleton_training import RagSingletonTraining
+    from rags.query_rewrite import QueryRewriter
+    from rags.context_packing import pack_context
 
-    rag_singleton = RagSingletonTraining()
+    context = runtime.context
 
-    llm = rag_singleton.get_qa_llm()
-    vector_store = rag_singleton.get_vector_store()
-    documents = rag_singleton.get_documents()
+    with span("rag.load_index", kind="retrieval"):
+        rag_singleton = RagSingletonTraining()
 
-    # Prompt para reescrever a pergunta com base no histórico (sem responder).
-    contextualize_q_prompt = ChatPromptTemplate.from_messages([
-        ("system", get_prompt("contextualize_query.prompt.md")),
-        ("human", "{input}")
-    ])
+        llm = rag_singleton.get_qa_llm()
+        vector_store = rag_singleton.get_vector_store()
+        documents = rag_singleton.get_documents()
 
     # Prompt principal de QA: usa contexto recuperado e histórico de conversa.
     qa_prompt = ChatPromptTemplate.from_messages([
@@ -45,11 +59,31 @@ def rag_tool(question: str, runtime: ToolRuntime[MainContext]) -> str:
     # Prompt que define como cada documento aparece no contexto da resposta.
     document_prompt = PromptTemplate.from_template(get_prompt("doc_context.prompt.md"))
 
+    # Reescreve a pergunta com o histórico só quando ela depende dele (pronomes, "e o ...?"),
+    # reaproveitando reescritas já feitas; nas demais a recuperação sai sem a chamada extra ao LLM.
+    standalone_question = QueryRewriter().rewrite(question, runtime.state.get("messages", []), llm)
+
+    # Filtros de metadados: os informados pelo agente têm prioridade sobre os citados na pergunta.
+    metadata_index = rag_singleton.get_metadata_index()
+    arguments = {"source": source, "page_number": page_number, "categoria": categoria, "id_produto": id_produto, "data_owner": data_owner}
+    filters = {field: value for field, value in arguments.items() if value is not None}
+    filters = {**metadata_index.parse_filters(standalone_question), **filters}
+
+    search_kwargs = {"k": 3}
+    if filters:
+        positions = metadata_index.select(filters)
+        log_event("rag_filtered", filters=filters, matches=len(positions), corpus=len(metadata_index))
+        if len(positions) > 0:
+            # Busca vetorial e BM25 ficam restritas ao subconjunto que atende aos filtros.
+            search_kwargs.update(metadata_index.vector_search_kwargs(vector_store, filters, positions))
+            documents = metadata_index.documents(positions)
+
     # Recuperador semântico com top-k documentos mais relevantes.
-    semantic_retriever = vector_store.as_retriever(search_kwargs={"k": 3})
+    semantic_retriever = vector_store.as_retriever(search_kwargs=search_kwargs)
 
     # Lexical retriever (BM25) para complementar a busca semântica, especialmente útil para termos específicos.
-    lexical_retriever = BM25Retriever.from_documents(documents)
+    with span("bm25.build", kind="retrieval", documents=len(documents)):
+        lexical_retriever = BM25Retriever.from_documents(documents)
     lexical_retriever.k = 5  # Configura para retornar os 5 documentos mais relevantes.
 
     # Fazer o merge dos resultados dos dois recuperadores (semântico + lexical) para melhorar a cobertura.
@@ -59,9 +93,6 @@ def rag_tool(question: str, runtime: ToolRuntime[MainContext]) -> str:
         weights=[0.7, 0.3]  # Dá mais peso ao recuperador semântico, mas ainda considera o lexical.
     )
 
-    # Recuperador que reescreve a pergunta considerando o histórico.
-    history_aware_retriever = create_history_aware_retriever(llm, ensemble_retriever, contextualize_q_prompt)
-
     # Cadeia de QA que insere documentos no prompt de resposta.
     # Junta os documentos no prompt e faz a resposta
     question_answer_chain = create_stuff_documents_chain(
@@ -71,11 +102,15 @@ def rag_tool(question: str, runtime: ToolRuntime[MainContext]) -> str:
         document_variable_name="context"  # Nome esperado no prompt {context}.
     )
 
+    # Antes do prompt, une trechos sobrepostos da mesma página, remove sentenças repetidas e
+    # corta o contexto no orçamento de tokens, mantendo a ordem de relevância.
+    packed_retriever = (lambda inputs: inputs["input"]) | ensemble_retriever | RunnableLambda(pack_context)
+
     # Encadeia recuperação + resposta para formar o pipeline RAG.
-    rag_chain = create_retrieval_chain(history_aware_retriever, question_answer_chain)
+    rag_chain = create_retrieval_chain(packed_retriever, question_answer_chain)
 
     result = rag_chain.invoke(
-        {"input": question},
+        {"input": standalone_question},
         config={"configurable": {"session_id": context.session_id}},
         context=context
     )
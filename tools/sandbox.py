@@ -0,0 +1,612 @@
+from multiprocessing.connection import Connection
+from multiprocessing.reduction import recv_handle, send_handle
+from contextlib import redirect_stdout
+from dataclasses import dataclass
+from pathlib import Path
+from utils import get_env_var
+from structured_logging import log_event
+import multiprocessing
+import threading
+import logging
+import builtins
+import resource
+import tempfile
+import ctypes
+import errno
+import queue
+import mmap
+import ast
+import pwd
+import io
+import os
+
+
+# Constantes do seccomp (linux/seccomp.h, linux/filter.h) e das capabilities.
+PR_SET_NO_NEW_PRIVS = 38
+PR_SET_SECCOMP = 22
+SECCOMP_MODE_FILTER = 2
+SECCOMP_RET_ALLOW = 0x7FFF0000
+SECCOMP_RET_ERRNO = 0x00050000
+SECCOMP_RET_KILL_PROCESS = 0x80000000
+BPF_LD_W_ABS = 0x20
+BPF_JEQ_K = 0x15
+BPF_JGE_K = 0x35
+BPF_JSET_K = 0x45
+BPF_RET_K = 0x06
+CLONE_THREAD = 0x00010000
+# O_WRONLY | O_RDWR | O_CREAT | O_TRUNC
+OPEN_WRITE_FLAGS = 0x1 | 0x2 | 0x40 | 0x200
+_LINUX_CAPABILITY_VERSION_3 = 0x20080522
+
+# Arquitetura (AUDIT_ARCH_*) e números das syscalls filtradas pelo seccomp do worker.
+SYSCALL_NUMBERS: dict[str, tuple[int, dict[str, int]]] = {
+    "x86_64": (0xC000003E, {
+        "execve": 59, "execveat": 322, "fork": 57, "vfork": 58, "clone": 56, "clone3": 435,
+        "socket": 41, "io_uring_setup": 425, "open": 2, "openat": 257, "openat2": 437, "creat": 85,
+        "unlink": 87, "unlinkat": 263, "rename": 82, "renameat": 264, "renameat2": 316, "mkdir": 83,
+        "mkdirat": 258, "rmdir": 84, "truncate": 76, "chmod": 90, "fchmod": 91, "fchmodat": 268,
+        "chown": 92, "fchown": 93, "lchown": 94, "fchownat": 260, "link": 86, "linkat": 265,
+        "symlink": 88, "symlinkat": 266, "ptrace": 101, "process_vm_readv": 310,
+        "process_vm_writev": 311, "kill": 62, "tkill": 200, "tgkill": 234, "pidfd_open": 434,
+        "pidfd_send_signal": 424,
+    }),
+    "aarch64": (0xC00000B7, {
+        "execve": 221, "execveat": 281, "clone": 220, "clone3": 435, "socket": 198,
+        "io_uring_setup": 425, "openat": 56, "openat2": 437, "unlinkat": 35, "renameat": 38,
+        "renameat2": 276, "mkdirat": 34, "truncate": 45, "fchmod": 52, "fchmodat": 53, "fchown": 55,
+        "fchownat": 54, "linkat": 37, "symlinkat": 36, "ptrace": 117, "process_vm_readv": 270,
+        "process_vm_writev": 271, "kill": 129, "tkill": 130, "tgkill": 131, "pidfd_open": 434,
+        "pidfd_send_signal": 424,
+    }),
+}
+
+# Syscalls negadas com EPERM (as de `open`, `openat` e `clone` dependem das flags).
+DENIED_SYSCALLS = (
+    "execve", "execveat", "fork", "vfork", "io_uring_setup", "creat", "unlink", "unlinkat", "rename",
+    "renameat", "renameat2", "mkdir", "mkdirat", "rmdir", "truncate", "chmod", "fchmod", "fchmodat",
+    "chown", "fchown", "lchown", "fchownat", "link", "linkat", "symlink", "symlinkat", "ptrace",
+    "process_vm_readv", "process_vm_writev", "kill", "tkill", "tgkill", "pidfd_open", "pidfd_send_signal",
+)
+
+# Módulos que o código gerado pela LLM pode importar dentro do sandbox.
+ALLOWED_IMPORTS = {
+    "pandas", "numpy", "math", "statistics", "datetime", "re", "collections",
+    "itertools", "matplotlib", "matplotlib.pyplot", "seaborn",
+}
+
+# Builtins removidos do ambiente de execução (acesso a arquivos, processos e introspecção).
+# É só uma conveniência: `pd` e `np` expõem `os` e IO de arquivos, então a contenção real vem
+# das restrições do sistema operacional aplicadas ao worker (`_isolate_worker`).
+BLOCKED_BUILTINS = {"open", "exec", "eval", "compile", "input", "breakpoint", "exit", "quit", "globals", "vars"}
+
+
+class SandboxError(Exception):
+    """
+    Erro ao executar código no sandbox (timeout, memória, tamanho do resultado ou erro do próprio código).
+    """
+
+
+@dataclass
+class SandboxConfig:
+    """
+    Limites aplicados a cada execução no sandbox.
+    """
+
+    workers: int = 2
+    startup_timeout_seconds: float = 120.0
+    timeout_seconds: float = 30.0
+    memory_limit_mb: int = 1024
+    max_result_bytes: int = 2_000_000
+    user: str = "nobody"
+
+
+# DataFrames já mapeados dentro do processo worker: caminho do snapshot -> DataFrame.
+_worker_frames: dict[str, object] = {}
+
+
+def _load_frame(snapshot_path: str, fd: int | None = None):
+    """
+    Abre o snapshot com memory map e expõe como DataFrame apoiado nos buffers Arrow (sem cópia).
+
+    Depois do isolamento o worker não abre mais arquivos pelo caminho: datasets novos chegam
+    como descritor já aberto pelo processo da API (`fd`).
+    """
+
+    import pyarrow as pa
+    import pandas as pd
+
+    if snapshot_path not in _worker_frames:
+        if fd is None:
+            source = pa.memory_map(snapshot_path, "r")
+        else:
+            with os.fdopen(fd, "rb") as file:
+                source = pa.BufferReader(pa.py_buffer(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)))
+
+        table = pa.ipc.open_file(source).read_all()
+        _worker_frames[snapshot_path] = table.to_pandas(types_mapper=pd.ArrowDtype)
+
+    return _worker_frames[snapshot_path]
+
+
+def _readable_by(path: str, account: pwd.struct_passwd) -> bool:
+    """
+    Indica se o usuário consegue ler `path` (bits de permissão do arquivo e dos diretórios pais).
+    """
+
+    def allowed(target: str, bits: int) -> bool:
+        info = os.stat(target)
+        if info.st_uid == account.pw_uid:
+            mode = info.st_mode >> 6
+        elif info.st_gid == account.pw_gid:
+            mode = info.st_mode >> 3
+        else:
+            mode = info.st_mode
+        return mode & bits == bits
+
+    path = os.path.realpath(path)
+    own_bits = 0o4 | (0o1 if os.path.isdir(path) else 0)
+    return allowed(path, own_bits) and all(allowed(str(parent), 0o1) for parent in Path(path).parents)
+
+
+def _drop_capabilities() -> bool:
+    """
+    Remove todas as capabilities do processo (root sem CAP_DAC_OVERRIDE, CAP_SYS_ADMIN etc.).
+    """
+
+    libc = ctypes.CDLL(None, use_errno=True)
+    header = (ctypes.c_uint32 * 2)(_LINUX_CAPABILITY_VERSION_3, 0)
+    data = (ctypes.c_uint32 * 6)()
+    return libc.capset(header, data) == 0
+
+
+def _seccomp_filter(arch: int, numbers: dict[str, int]) -> list[tuple[int, int, int, int]]:
+    """
+    Programa BPF do seccomp: nega criação de processos e execução de programas, sockets,
+    escrita e alteração de arquivos e acesso a outros processos; o resto é permitido.
+    """
+
+    errno_eperm = SECCOMP_RET_ERRNO | errno.EPERM
+    program = [
+        (BPF_LD_W_ABS, 0, 0, 4),
+        (BPF_JEQ_K, 1, 0, arch),
+        (BPF_RET_K, 0, 0, SECCOMP_RET_KILL_PROCESS),
+        (BPF_LD_W_ABS, 0, 0, 0),
+        # Syscalls da ABI x32 (número com o bit 30) contornariam a lista abaixo.
+        (BPF_JGE_K, 0, 1, 0x40000000),
+        (BPF_RET_K, 0, 0, errno_eperm),
+    ]
+
+    def deny(name: str, code: int = errno.EPERM) -> None:
+        if name in numbers:
+            program.extend([(BPF_JEQ_K, 0, 1, numbers[name]), (BPF_RET_K, 0, 0, SECCOMP_RET_ERRNO | code)])
+
+    def check_flags(name: str, argument: int, mask: int, allow_when_set: bool) -> None:
+        # Carrega os 32 bits baixos do argumento e decide pelo `mask` (ex.: CLONE_THREAD, O_CREAT).
+        if name in numbers:
+            outcomes = [SECCOMP_RET_ALLOW, errno_eperm] if allow_when_set else [errno_eperm, SECCOMP_RET_ALLOW]
+            program.extend([
+                (BPF_JEQ_K, 0, 4, numbers[name]),
+                (BPF_LD_W_ABS, 0, 0, 16 + 8 * argument),
+                (BPF_JSET_K, 0, 1, mask),
+                (BPF_RET_K, 0, 0, outcomes[0]),
+                (BPF_RET_K, 0, 0, outcomes[1]),
+            ])
+
+    for name in DENIED_SYSCALLS:
+        deny(name)
+    # ENOSYS faz a glibc criar threads com `clone`, cujas flags o filtro consegue inspecionar.
+    deny("clone3", errno.ENOSYS)
+    deny("openat2", errno.ENOSYS)
+    deny("socket", errno.EACCES)
+    check_flags("clone", 0, CLONE_THREAD, allow_when_set=True)
+    check_flags("open", 1, OPEN_WRITE_FLAGS, allow_when_set=False)
+    check_flags("openat", 2, OPEN_WRITE_FLAGS, allow_when_set=False)
+    program.append((BPF_RET_K, 0, 0, SECCOMP_RET_ALLOW))
+
+    return program
+
+
+def _install_seccomp() -> bool:
+    machine = os.uname().machine
+    if machine not in SYSCALL_NUMBERS:
+        return False
+
+    arch, numbers = SYSCALL_NUMBERS[machine]
+    program = _seccomp_filter(arch, numbers)
+
+    class SockFilter(ctypes.Structure):
+        _fields_ = [("code", ctypes.c_uint16), ("jt", ctypes.c_uint8), ("jf", ctypes.c_uint8), ("k", ctypes.c_uint32)]
+
+    class SockFprog(ctypes.Structure):
+        _fields_ = [("len", ctypes.c_uint16), ("filter", ctypes.POINTER(SockFilter))]
+
+    filters = (SockFilter * len(program))(*[SockFilter(*instruction) for instruction in program])
+    fprog = SockFprog(len(program), filters)
+
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.prctl(PR_SET_NO_NEW_PRIVS, 1, 0, 0, 0) != 0:
+        return False
+
+    return libc.prctl(PR_SET_SECCOMP, SECCOMP_MODE_FILTER, ctypes.byref(fprog), 0, 0) == 0
+
+
+def _isolate_worker(user: str) -> list[str]:
+    """
+    Restringe o processo worker antes de executar código gerado pela LLM:
+
+    - diretório de trabalho em um diretório temporário vazio;
+    - usuário sem privilégios (`user`) quando o processo roda como root e esse usuário consegue
+      ler as bibliotecas; senão, root sem nenhuma capability;
+    - seccomp: sem criar processos nem executar programas (`os.system`, `subprocess`), sem
+      sockets (rede), sem criar, gravar, apagar ou renomear arquivos e sem sinalizar ou
+      inspecionar outros processos.
+
+    A leitura de arquivos segue as permissões do usuário do worker: arquivos legíveis por ele
+    (ex.: `/etc/hostname`, e os da aplicação quando o worker continua como root ou como o
+    mesmo usuário da API) continuam legíveis. Para isolar o sistema de arquivos por completo,
+    rode a API em um contêiner ou com `SANDBOX_USER` separado.
+
+    Returns:
+        Restrições que não puderam ser aplicadas neste ambiente.
+    """
+
+    import pandas
+    import matplotlib
+
+    missing: list[str] = []
+    workdir = tempfile.mkdtemp(prefix="sandbox-")
+    os.chdir(workdir)
+
+    if os.geteuid() == 0:
+        try:
+            account = pwd.getpwnam(user)
+            libraries = [os.path.dirname(os.__file__), os.path.dirname(pandas.__file__), matplotlib.get_data_path()]
+            if not all(_readable_by(path, account) for path in libraries):
+                raise PermissionError(f"'{user}' não consegue ler as bibliotecas do Python.")
+
+            os.chown(workdir, account.pw_uid, account.pw_gid)
+            os.setgroups([])
+            os.setgid(account.pw_gid)
+            os.setuid(account.pw_uid)
+        except (KeyError, OSError):
+            missing.append("user")
+            if not _drop_capabilities():
+                missing.append("capabilities")
+    else:
+        # O worker roda como o mesmo usuário da API e lê o que ela lê.
+        missing.append("user")
+
+    if not _install_seccomp():
+        missing.append("seccomp")
+
+    return missing
+
+
+def _restricted_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if name not in ALLOWED_IMPORTS:
+        raise ImportError(f"Import não permitido no sandbox: '{name}'.")
+
+    return builtins.__import__(name, globals, locals, fromlist, level)
+
+
+def _sandbox_globals(df) -> dict:
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    import pandas as pd
+    import numpy as np
+
+    safe_builtins = {name: value for name, value in vars(builtins).items() if name not in BLOCKED_BUILTINS}
+    safe_builtins["__import__"] = _restricted_import
+
+    return {"__builtins__": safe_builtins, "df": df.copy(deep=False), "pd": pd, "np": np, "plt": plt, "sns": sns}
+
+
+def _run_python(code: str, df) -> str:
+    """
+    Executa o código e retorna a saída padrão somada ao valor da última expressão (como um REPL).
+    """
+
+    tree = ast.parse(code, mode="exec")
+    last_expression = None
+    if tree.body and isinstance(tree.body[-1], ast.Expr):
+        last_expression = ast.Expression(tree.body.pop().value)
+
+    exec_globals = _sandbox_globals(df)
+    stdout = io.StringIO()
+    with redirect_stdout(stdout):
+        exec(compile(tree, "<sandbox>", "exec"), exec_globals)
+        if last_expression is not None:
+            value = eval(compile(last_expression, "<sandbox>", "eval"), exec_globals)
+            if value is not None:
+                stdout.write(value.to_string() if hasattr(value, "to_string") else repr(value))
+
+    return stdout.getvalue()
+
+
+def _render_png(code: str, df, dpi: int) -> bytes:
+    """
+    Executa o código de plotagem com uma figura própria e devolve o PNG, fechando todas as figuras ao final.
+    """
+
+    import matplotlib.pyplot as plt
+
+    plt.close("all")
+    fig = plt.figure(figsize=(8, 4))
+    try:
+        exec_globals = _sandbox_globals(df)
+        exec_globals["fig"] = fig
+        exec(compile(code, "<sandbox>", "exec"), exec_globals)
+
+        buffer = io.BytesIO()
+        plt.gcf().savefig(buffer, format="png", dpi=dpi, bbox_inches="tight")
+        return buffer.getvalue()
+    finally:
+        plt.close("all")
+
+
+def _current_data_bytes() -> int:
+    """
+    Tamanho atual do segmento de dados do processo (VmData), em bytes.
+    """
+
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmData:"):
+                return int(line.split()[1]) * 1024
+
+    return 0
+
+
+def _worker_main(conn: Connection, snapshot_paths: list[str], memory_limit_mb: int, max_result_bytes: int, user: str) -> None:
+    """
+    Loop do processo worker: pré-carrega bibliotecas e datasets, se isola (`_isolate_worker`)
+    e então atende tarefas até receber None.
+    """
+
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot  # noqa: F401
+    import seaborn  # noqa: F401
+
+    for snapshot_path in snapshot_paths:
+        _load_frame(snapshot_path)
+
+    # Renderiza uma figura vazia para carregar o backend Agg antes de aplicar o limite de memória.
+    matplotlib.pyplot.figure().savefig(io.BytesIO(), format="png")
+    matplotlib.pyplot.close("all")
+
+    # RLIMIT_DATA limita heap e mapeamentos anônimos, sem contar o dataset mapeado do disco.
+    # O limite é o uso atual (bibliotecas e alocadores já carregados) mais a folga configurada.
+    limit = _current_data_bytes() + memory_limit_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+
+    missing = _isolate_worker(user)
+
+    conn.send(("ready", missing))
+
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+
+        kind, code, snapshot_path, options = task
+        try:
+            fd = recv_handle(conn) if options.get("send_fd") else None
+            df = _load_frame(snapshot_path, fd)
+            if kind == "python":
+                payload = _run_python(code, df).encode("utf-8")
+            else:
+                payload = _render_png(code, df, options.get("dpi", 100))
+
+            if len(payload) > max_result_bytes:
+                conn.send(("error", f"Resultado excede o limite de {max_result_bytes} bytes."))
+            else:
+                conn.send(("ok", payload))
+        except MemoryError:
+            conn.send(("fatal", f"Execução excedeu o limite de memória de {memory_limit_mb} MB."))
+            break
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    """
+    Processo worker pré-iniciado e o canal de comunicação com ele.
+    """
+
+    def __init__(self, context, snapshot_paths: list[str], config: SandboxConfig) -> None:
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, snapshot_paths, config.memory_limit_mb, config.max_result_bytes, config.user),
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        # Snapshots que o worker já tem mapeados (os demais são enviados como descritor).
+        self.loaded = set(snapshot_paths)
+
+    def wait_ready(self, timeout: float) -> None:
+        if self.ready:
+            return
+
+        if not self.conn.poll(timeout):
+            raise SandboxError("Worker do sandbox não inicializou a tempo.")
+
+        _, missing = self.conn.recv()
+        if missing:
+            log_event("sandbox_isolation_incomplete", level=logging.WARNING, pid=self.process.pid, missing=missing)
+        self.ready = True
+
+    def send_task(self, kind: str, code: str, snapshot_path: str, options: dict) -> None:
+        if snapshot_path in self.loaded:
+            self.conn.send((kind, code, snapshot_path, options))
+            return
+
+        # O worker isolado não abre o arquivo pelo caminho: envia o descritor já aberto.
+        with open(snapshot_path, "rb") as file:
+            self.conn.send((kind, code, snapshot_path, {**options, "send_fd": True}))
+            send_handle(self.conn, file.fileno(), self.process.pid)
+        self.loaded.add(snapshot_path)
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+
+class SandboxPool:
+    """
+    Singleton com um pool de processos pré-iniciados para executar código gerado pela LLM.
+
+    Cada worker já sobe com as bibliotecas importadas e os datasets mapeados em memória,
+    então uma execução não paga o custo de recarregar nada. Toda execução tem timeout,
+    limite de memória e limite de tamanho do resultado; workers que estouram o tempo ou
+    a memória são mortos e substituídos.
+
+    Antes de receber código, o worker troca de usuário (`SANDBOX_USER`, quando a API roda
+    como root) e instala um filtro seccomp que bloqueia rede, criação de processos, gravação
+    de arquivos e acesso a outros processos (veja `_isolate_worker`). Restrições que o ambiente não permite são registradas no evento
+    `sandbox_isolation_incomplete`.
+    """
+
+    __instance: "SandboxPool" = None
+
+    def __new__(cls):
+        """
+        Implementação do padrão singleton para compartilhar o pool no processo.
+        """
+
+        if cls.__instance is None:
+            cls.__instance = super(SandboxPool, cls).__new__(cls)
+            cls.__instance.__setup()
+
+        return cls.__instance
+
+    def __setup(self) -> None:
+        self.__config = SandboxConfig(
+            workers=int(get_env_var("SANDBOX_WORKERS", "2")),
+            startup_timeout_seconds=float(get_env_var("SANDBOX_STARTUP_TIMEOUT", "120")),
+            timeout_seconds=float(get_env_var("SANDBOX_TIMEOUT", "30")),
+            memory_limit_mb=int(get_env_var("SANDBOX_MEMORY_MB", "1024")),
+            max_result_bytes=int(get_env_var("SANDBOX_MAX_RESULT_BYTES", "2000000")),
+            user=get_env_var("SANDBOX_USER", "nobody"),
+        )
+        # "spawn" evita herdar locks e threads do processo da API.
+        self.__context = multiprocessing.get_context("spawn")
+        self.__snapshot_paths: list[str] = []
+        self.__idle: queue.Queue[_Worker] = queue.Queue()
+        self.__lock = threading.Lock()
+        self.__started = False
+
+    def start(self, csv_paths: list[str]) -> None:
+        """
+        Pré-inicia os workers com os datasets informados já carregados.
+
+        Args:
+            csv_paths: Datasets que os workers devem carregar na inicialização.
+        """
+
+        from analytics.columnar import ensure_columnar
+
+        with self.__lock:
+            if self.__started:
+                return
+
+            self.__snapshot_paths = [ensure_columnar(path) for path in csv_paths]
+            log_event("sandbox_starting", workers=self.__config.workers)
+            for _ in range(self.__config.workers):
+                self.__idle.put(self.__spawn())
+
+            self.__started = True
+
+    def __spawn(self) -> _Worker:
+        return _Worker(self.__context, self.__snapshot_paths, self.__config)
+
+    def __execute(self, kind: str, code: str, csv_path: str, options: dict) -> bytes:
+        from analytics.columnar import ensure_columnar
+
+        if not self.__started:
+            self.start([csv_path])
+
+        snapshot_path = ensure_columnar(csv_path)
+        worker = self.__idle.get()
+        try:
+            worker.wait_ready(self.__config.startup_timeout_seconds)
+            worker.send_task(kind, code, snapshot_path, options)
+
+            if not worker.conn.poll(self.__config.timeout_seconds):
+                raise TimeoutError(f"Execução excedeu o tempo limite de {self.__config.timeout_seconds:.0f}s.")
+
+            status, payload = worker.conn.recv()
+        except (TimeoutError, EOFError, OSError, SandboxError) as e:
+            # Worker travado ou morto (ex.: limite de memória): mata e repõe no pool.
+            worker.kill()
+            self.__idle.put(self.__spawn())
+            raise SandboxError(str(e) or "Worker do sandbox encerrou inesperadamente.")
+
+        if status == "fatal":
+            worker.kill()
+            self.__idle.put(self.__spawn())
+            raise SandboxError(payload)
+
+        self.__idle.put(worker)
+
+        if status == "error":
+            raise SandboxError(payload)
+
+        return payload
+
+    def run_python(self, code: str, csv_path: str) -> str:
+        """
+        Executa código pandas sobre o dataset (exposto como `df`) e retorna a saída.
+
+        Args:
+            code: Código Python gerado pela LLM.
+            csv_path: Dataset exposto como `df`.
+
+        Returns:
+            Saída padrão da execução somada ao valor da última expressão.
+
+        Raises:
+            SandboxError: em caso de timeout, limite de memória, resultado grande demais ou erro no código.
+        """
+
+        return self.__execute("python", code, csv_path, {}).decode("utf-8")
+
+    def render_figure(self, code: str, csv_path: str, dpi: int = 100) -> bytes:
+        """
+        Executa código de plotagem sobre o dataset e retorna a figura em PNG.
+
+        Args:
+            code: Código de plotagem gerado pela LLM.
+            csv_path: Dataset exposto como `df`.
+            dpi: Resolução do PNG.
+
+        Returns:
+            Bytes do PNG renderizado.
+
+        Raises:
+            SandboxError: em caso de timeout, limite de memória, resultado grande demais ou erro no código.
+        """
+
+        return self.__execute("figure", code, csv_path, {"dpi": dpi})
+
+    def shutdown(self) -> None:
+        """
+        Encerra todos os workers do pool.
+        """
+
+        with self.__lock:
+            while not self.__idle.empty():
+                worker = self.__idle.get_nowait()
+                try:
+                    worker.conn.send(None)
+                    worker.process.join(timeout=1)
+                except OSError:
+                    pass
+                if worker.process.is_alive():
+                    worker.kill()
+
+            self.__started = False
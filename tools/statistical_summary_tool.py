@@ -2,12 +2,14 @@ from utils import get_prompt, get_env_var
 from langchain.tools import tool, ToolRuntime
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
-from langchain_groq import ChatGroq
+from providers import chat_model
 from dtos import MainContext, QuestionInputDTO
-import pandas as pd
+from structured_logging import log_event
+from tools.concurrency import concurrency_limited
 
 
 @tool(args_schema=QuestionInputDTO)
+@concurrency_limited
 def statistical_summary_tool(question: str, runtime: ToolRuntime[MainContext]) -> str:
     """
     Utilize esta ferramenta sempre que o usuário solicitar um resumo estatístico
@@ -19,21 +21,34 @@ def statistical_summary_tool(question: str, runtime: ToolRuntime[MainContext]) -
         question: A pergunta do usuário relacionada ao resumo estatístico do DataFrame.
     """
 
-    print(f"Entrei na ferramenta 'statistical_summary_tool' com a pergunta: \"{question}\"")
+    log_event("tool_called", tool="statistical_summary_tool", question=question)
+
+    # pandas/pyarrow só carregam quando uma ferramenta de dados é usada.
+    from analytics.profiling import profile_dataset, should_stream
+    from analytics.catalog import DatasetCatalog
 
     context = runtime.context
 
     GROQ_API_KEY = get_env_var('GROQ_API_KEY')
 
-    df = pd.read_csv('./assets/dados_entregas.csv')
-
-    llm = ChatGroq(
+    llm = chat_model(
+        "groq:llama-3.3-70b-versatile",
+        role="data_analysis",
         temperature=0,
-        groq_api_key=GROQ_API_KEY,
-        model='llama-3.3-70b-versatile'
+        api_key=GROQ_API_KEY
     )
 
-    descritive_statistics = df.describe(include='number').transpose().to_string()
+    # Arquivos grandes são perfilados em streaming (quantis aproximados), sem carregar tudo em memória.
+    catalog = DatasetCatalog()
+    dataset_path = catalog.path(context.dataset_id)
+
+    # Apenas as colunas numéricas são lidas da versão colunar do dataset.
+    columns = catalog.numeric_columns(context.dataset_id)
+    if should_stream(dataset_path):
+        descritive_statistics = profile_dataset(dataset_path, columns=columns).describe().to_string()
+    else:
+        df = catalog.get_frame(context.dataset_id, columns=columns)
+        descritive_statistics = df.describe(include='number').transpose().to_string()
 
     prompt = get_prompt('estatistica.prompt.md')
 
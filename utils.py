@@ -1,11 +1,29 @@
+from __future__ import annotations
+
 import os
 from dotenv import load_dotenv
 from jinja2 import Environment, FileSystemLoader
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Iterator, TYPE_CHECKING
 from rich import print
 from langgraph.checkpoint.memory import InMemorySaver
-from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
+from pathlib import Path
+import fcntl
+
+# O saver do Postgres (psycopg) só é importado quando o checkpointer é aberto.
+if TYPE_CHECKING:
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+
+
+@lru_cache(maxsize=1)
+def get_prompt_environment() -> Environment:
+    """
+    Ambiente Jinja2 da pasta de prompts, compartilhado para que cada template seja
+    compilado uma vez só (o Environment guarda os templates já compilados).
+    """
+
+    return Environment(loader=FileSystemLoader("prompts"))
 
 
 def get_prompt(template_name: str, context: dict = {}) -> str:
@@ -19,10 +37,8 @@ def get_prompt(template_name: str, context: dict = {}) -> str:
         String com o template renderizado.
     """
 
-    # Define o loader para a pasta de prompts do projeto.
-    env = Environment(loader=FileSystemLoader("prompts"))
     # Renderiza o template com as variáveis fornecidas no contexto.
-    return env.get_template(template_name).render(context)
+    return get_prompt_environment().get_template(template_name).render(context)
 
 
 def load_environment_variables() -> None:
@@ -49,22 +65,52 @@ def get_env_var(key: str, default: str | None = None) -> str | None:
     return os.getenv(key, default)
 
 
+@contextmanager
+def file_lock(path: str | Path) -> Iterator[None]:
+    """
+    Lock exclusivo entre processos (flock), para que só um worker do uvicorn construa um
+    artefato compartilhado (índice, arquivo colunar) enquanto os outros esperam.
+
+    Args:
+        path: Arquivo usado como lock (criado se não existir).
+    """
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
 @asynccontextmanager
 async def db_checkpointer() -> AsyncGenerator[AsyncPostgresSaver | InMemorySaver, None]:
     """
     Lifespan para carregar variáveis de ambiente e realizar outras tarefas de setup.
     """
 
+    # Importado aqui porque o módulo de retenção depende deste.
+    from checkpoint_retention import ALLOWED_MSGPACK_MODULES, CheckpointRetention, CompressedSerializer
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
     print("Chatbot iniciado. Digite sua pergunta ou 'sair' para encerrar.")
 
     load_environment_variables()
 
     try:
-        async with AsyncPostgresSaver.from_conn_string(get_env_var("DB_DSN")) as checkpointer:
+        async with AsyncPostgresSaver.from_conn_string(get_env_var("DB_DSN"), serde=CompressedSerializer()) as checkpointer:
             await checkpointer.setup()
-            yield checkpointer
+            # Poda e expiração dos checkpoints em segundo plano enquanto o saver estiver aberto.
+            retention = CheckpointRetention(checkpointer)
+            retention.start()
+            try:
+                yield checkpointer
+            finally:
+                await retention.stop()
     except Exception as e:
         print(f"Erro ao conectar ao banco de dados: {e}")
-        yield InMemorySaver()  # Fallback para um saver em memória
+        yield InMemorySaver(serde=JsonPlusSerializer(allowed_msgpack_modules=ALLOWED_MSGPACK_MODULES))  # Fallback para um saver em memória
 
     print("Finalizando chatbot")
\ No newline at end of file
@@ -0,0 +1,172 @@
+from langgraph.pregel.main import BaseCheckpointSaver
+from dtos import DEFAULT_DATASET_ID
+from utils import get_env_var, get_prompt_environment
+from structured_logging import log_event
+from typing import Awaitable, Callable
+import logging
+import asyncio
+import sys
+import time
+
+
+# Etapas executadas por padrão (WARMUP_STEPS). "agent" é obrigatória: sem ela a API não responde.
+DEFAULT_STEPS = "prompts,agent,rag,datasets,mcp"
+REQUIRED_STEPS = {"agent"}
+
+# Sessão usada pela consulta sintética, separada das conversas reais.
+WARMUP_SESSION_ID = "__warmup__"
+
+
+class Warmup:
+    """
+    Singleton com o aquecimento da API: tudo o que antes era criado na primeira requisição
+    (prompts compilados, agente e clientes de LLM, índice do RAG, datasets e sandbox, sessão
+    MCP) é preparado no startup, e `ready` só fica verdadeiro quando esse trabalho termina.
+
+    Variáveis de ambiente:
+    - WARMUP_STEPS: etapas executadas, separadas por vírgula (padrão: todas).
+    - WARMUP_DATASETS: datasets do catálogo carregados no aquecimento (padrão: dataset padrão).
+    - WARMUP_QUERY: pergunta sintética respondida pelo agente ao final (vazio desliga).
+    """
+
+    __instance: "Warmup" = None
+
+    def __new__(cls):
+        if cls.__instance is None:
+            cls.__instance = super(Warmup, cls).__new__(cls)
+            cls.__instance.__setup()
+
+        return cls.__instance
+
+    def __setup(self) -> None:
+        self.__steps: dict[str, dict] = {}
+        self.__finished = False
+        self.__started_mcp = False
+        self.__started_sandbox = False
+
+    @property
+    def ready(self) -> bool:
+        """
+        Verdadeiro quando o aquecimento terminou e nenhuma etapa obrigatória falhou.
+        """
+
+        return self.__finished and all(
+            step["ok"] for name, step in self.__steps.items() if name in REQUIRED_STEPS
+        )
+
+    def report(self) -> dict:
+        """
+        Estado de cada etapa (ok, duração e erro), exposto pelo `/ready`.
+        """
+
+        return {"ready": self.ready, "finished": self.__finished, "steps": self.__steps}
+
+    async def __step(self, name: str, action: Callable[[], Awaitable[None]]) -> None:
+        start = time.perf_counter()
+        try:
+            await action()
+            self.__steps[name] = {"ok": True, "duration_ms": int((time.perf_counter() - start) * 1000)}
+            log_event("warmup_step", step=name, duration_ms=self.__steps[name]["duration_ms"])
+        except Exception as e:
+            self.__steps[name] = {"ok": False, "duration_ms": int((time.perf_counter() - start) * 1000), "error": str(e)}
+            log_event("warmup_step_failed", level=logging.WARNING, step=name, error=str(e))
+
+    async def run(self, checkpointer: BaseCheckpointSaver) -> None:
+        """
+        Executa o aquecimento. Prompts e agente vêm primeiro; RAG, datasets e MCP são
+        independentes e rodam em paralelo; a consulta sintética, se configurada, fecha o ciclo.
+
+        Args:
+            checkpointer: Checkpointer compartilhado pela API (o mesmo usado nas requisições).
+        """
+
+        steps = {name.strip() for name in get_env_var("WARMUP_STEPS", DEFAULT_STEPS).split(",") if name.strip()}
+        start = time.perf_counter()
+
+        async def prompts() -> None:
+            environment = get_prompt_environment()
+            for template_name in environment.list_templates():
+                environment.get_template(template_name)
+
+        async def agent() -> None:
+            from agent import Agent
+
+            # Cria o agente, os clientes de LLM e importa as ferramentas fora do event loop, sem
+            # trocar a sessão do singleton (a API já pode estar respondendo).
+            await asyncio.to_thread(Agent.build, checkpointer)
+
+        async def rag() -> None:
+            from rags.singleton_training import RagSingletonTraining
+
+            await asyncio.to_thread(RagSingletonTraining)
+
+        async def datasets() -> None:
+            from analytics.catalog import DatasetCatalog
+            from tools.sandbox import SandboxPool
+
+            catalog = DatasetCatalog()
+            names = get_env_var("WARMUP_DATASETS", DEFAULT_DATASET_ID).split(",")
+            dataset_ids = [name.strip() for name in names if name.strip() in catalog.datasets()]
+            if not dataset_ids:
+                return
+
+            paths = [catalog.path(dataset_id) for dataset_id in dataset_ids]
+            for dataset_id in dataset_ids:
+                await asyncio.to_thread(catalog.get_frame, dataset_id)
+
+            # Sobe os workers do sandbox com os datasets já carregados.
+            await asyncio.to_thread(SandboxPool().start, paths)
+            self.__started_sandbox = True
+
+        async def mcp() -> None:
+            from tools.graph_tool import warmup_graph_tool
+
+            self.__started_mcp = True
+            await warmup_graph_tool(checkpointer)
+
+        actions = {"prompts": prompts, "agent": agent, "rag": rag, "datasets": datasets, "mcp": mcp}
+
+        for name in ["prompts", "agent"]:
+            if name in steps:
+                await self.__step(name, actions[name])
+
+        await asyncio.gather(*[
+            self.__step(name, actions[name]) for name in ["rag", "datasets", "mcp"] if name in steps
+        ])
+
+        query = get_env_var("WARMUP_QUERY", "")
+        if query and self.__steps.get("agent", {}).get("ok"):
+            async def synthetic_query() -> None:
+                from agent import Agent
+
+                await Agent.get_instance(WARMUP_SESSION_ID, checkpointer).invoke(query)
+
+            await self.__step("query", synthetic_query)
+
+        self.__finished = True
+        log_event(
+            "warmup_finished",
+            ready=self.ready,
+            duration_ms=int((time.perf_counter() - start) * 1000),
+            failed=[name for name, step in self.__steps.items() if not step["ok"]],
+        )
+
+    async def shutdown(self) -> None:
+        """
+        Fecha o que o aquecimento e as ferramentas abriram (sessão MCP, workers do sandbox e
+        pool de perfilamento).
+        """
+
+        if self.__started_mcp:
+            from tools.mcp_session import MCPSessionManager
+
+            await MCPSessionManager().close()
+
+        if self.__started_sandbox:
+            from tools.sandbox import SandboxPool
+
+            SandboxPool().shutdown()
+
+        # O pool de perfilamento só existe se alguma ferramenta já o usou.
+        if "analytics.profiling" in sys.modules:
+            sys.modules["analytics.profiling"].shutdown_pool()